@@ -1,3 +1,5 @@
+import datetime
+
 from rest_framework import serializers
 
 
@@ -36,6 +38,12 @@ class DebugArticleSerializer(serializers.Serializer):
 class FindSimilarArticlesSerializer(serializers.Serializer):
     userId = serializers.IntegerField(required=True)
     limit = serializers.IntegerField(required=False, default=10, min_value=1, max_value=50)
+    category = serializers.CharField(required=False)
+    since = serializers.DateTimeField(required=False)
+
+    def validate_since(self, value):
+        # Compared with stored createdAt values, which are naive UTC
+        return value.astimezone(datetime.timezone.utc) if value.tzinfo else value.replace(tzinfo=datetime.timezone.utc)
 
 
 class ArticleResponseSerializer(serializers.Serializer):
@@ -7,6 +7,15 @@ import re
 from config.mongo_utils import get_collection
 from bson import ObjectId
 import os
+from concurrent.futures import ThreadPoolExecutor
+from ai.utils.simhash import (
+    shingles, simhash_features, simhash_bands, simhash_probe_bands, hamming_distance, to_signed64, from_signed64
+)
+from ai.utils.chunking import chunk_text, pool_embeddings
+from articles.utils.text_extraction import delta_to_text, html_to_text, extract_text
+from iTech import settings
+from search.utils.history import decode_embedding
+from search.utils.vector_index import recommendation_vector_index
 
 # تنظیم لاگ‌گذاری
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -22,6 +31,7 @@ articles = get_collection('articles')
 user_profiles = get_collection('user_profiles')
 saved_articles = get_collection('saved')
 search_history = get_collection('search')
+article_passages = get_collection('article_passages')
 
 
 class EmbeddingService:
@@ -43,6 +53,91 @@ class EmbeddingService:
             logger.error(f"Error getting embedding: {str(e)}")
             return []
 
+    @staticmethod
+    def _post_batch(batch, timeout):
+        """ارسال یک دسته متن به سرویس embedding؛ در صورت خطا یا پاسخ ناقص، لیست خالی برای هر متن"""
+        try:
+            logger.debug(f"Getting embeddings for batch of {len(batch)} texts")
+            response = requests.post(
+                embed_api_url,
+                headers={'Content-Type': 'application/json'},
+                json={'texts': batch},
+                timeout=timeout
+            )
+            response.raise_for_status()
+            raw_embeddings = response.json().get('embeddings', [])
+        except requests.RequestException as e:
+            logger.error(f"Error getting batch embeddings: {str(e)}")
+            raw_embeddings = []
+
+        if len(raw_embeddings) != len(batch):
+            # پاسخ ناقص؛ کل دسته را ناموفق در نظر می‌گیریم
+            raw_embeddings = [[] for _ in batch]
+
+        return [EmbeddingService.normalize_embedding(e) for e in raw_embeddings]
+
+    @staticmethod
+    def get_embeddings(texts, batch_size=32, timeout=60, max_workers=1):
+        """درخواست embedding برای چند متن به صورت دسته‌ای (با max_workers > 1 دسته‌ها موازی ارسال می‌شوند)"""
+        batches = [texts[start:start + batch_size] for start in range(0, len(texts), batch_size)]
+        if max_workers > 1 and len(batches) > 1:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(batches))) as executor:
+                results = list(executor.map(lambda batch: EmbeddingService._post_batch(batch, timeout), batches))
+        else:
+            results = [EmbeddingService._post_batch(batch, timeout) for batch in batches]
+
+        return [embedding for batch_embeddings in results for embedding in batch_embeddings]
+
+    @staticmethod
+    def embed_documents(texts):
+        """
+        embedding متن‌های بلند: هر متن به پنجره‌های هم‌پوشان تقسیم می‌شود، تکه‌های همه‌ی
+        متن‌ها در دسته‌های موازی ارسال می‌شوند و بردار هر متن از میانگین وزن‌دار تکه‌هایش ساخته می‌شود.
+        خروجی برای هر متن: {'embedding': [...], 'passages': [...]}؛ اگر تکه‌ای ناموفق باشد embedding خالی است.
+        """
+        chunked = [
+            chunk_text(
+                text,
+                window=settings.EMBED_CHUNK_TOKENS,
+                overlap=settings.EMBED_CHUNK_OVERLAP,
+                max_chunks=settings.EMBED_MAX_CHUNKS
+            )
+            for text in texts
+        ]
+        vectors = EmbeddingService.get_embeddings(
+            [chunk['text'] for chunks in chunked for chunk in chunks],
+            batch_size=settings.EMBED_CHUNK_BATCH_SIZE,
+            timeout=settings.EMBED_CHUNK_TIMEOUT,
+            max_workers=settings.EMBED_CHUNK_WORKERS
+        )
+
+        results = []
+        position = 0
+        for chunks in chunked:
+            chunk_vectors = vectors[position:position + len(chunks)]
+            position += len(chunks)
+
+            if not chunks or not all(chunk_vectors):
+                results.append({'embedding': [], 'passages': []})
+                continue
+
+            passages = []
+            if settings.EMBED_STORE_PASSAGES:
+                passages = [
+                    {'index': i, 'start': chunk['start'], 'end': chunk['end'], 'embedding': vector}
+                    for i, (chunk, vector) in enumerate(zip(chunks, chunk_vectors))
+                ]
+            results.append({
+                'embedding': pool_embeddings(chunk_vectors, [chunk['tokens'] for chunk in chunks]),
+                'passages': passages
+            })
+        return results
+
+    @staticmethod
+    def embed_document(text):
+        """embedding یک متن بلند؛ معادل embed_documents برای یک متن"""
+        return EmbeddingService.embed_documents([text])[0]
+
     @staticmethod
     def normalize_embedding(embedding):
         """نرمالایز کردن embedding با استفاده از L2 norm"""
@@ -60,65 +155,99 @@ class EmbeddingService:
 
 
 class TextProcessingService:
+    """رابط سرویس‌های ai به استخراج‌کننده‌ی مشترک متن در articles.utils.text_extraction"""
+
     @staticmethod
     def delta_to_plain_text(delta):
         """تبدیل دلتا (Quill Delta) به متن ساده"""
-        text = ""
-
-        # بررسی اینکه آیا delta یک دیکشنری با کلید ops است یا مستقیماً یک آرایه
-        ops = []
-        if isinstance(delta, dict) and "ops" in delta:
-            ops = delta.get("ops", [])
-        elif isinstance(delta, list):
-            ops = delta
-        else:
-            ops = []
-
-        for op in ops:
-            if isinstance(op, dict):
-                insert = op.get("insert", "")
-                if isinstance(insert, str):
-                    text += insert
-                elif isinstance(insert, dict):
-                    # اگر خواستی اینجا آبجکت‌ها رو مدیریت کن، الان حذف می‌کنیم
-                    pass
-
-        return text
+        return delta_to_text(delta)
 
     @staticmethod
     def clean_html_tags(text):
         """پاک کردن تگ‌های HTML از متن"""
-        clean = re.compile('<.*?>')
-        return re.sub(clean, '', text)
+        return html_to_text(text)
 
     @staticmethod
     def process_text_field(text_delta):
         """پردازش فیلد text و تبدیل به متن ساده"""
-        cleaned_text = ""
         try:
-            if isinstance(text_delta, dict):
-                # اگر text یک دیکشنری باشد
-                cleaned_text = TextProcessingService.delta_to_plain_text(text_delta)
-            elif isinstance(text_delta, str):
-                # اگر text یک رشته است، بررسی می‌کنیم که آیا JSON است یا HTML
-                try:
-                    # تلاش برای تبدیل رشته به JSON
-                    json_data = json.loads(text_delta)
-                    cleaned_text = TextProcessingService.delta_to_plain_text(json_data)
-                except json.JSONDecodeError:
-                    # اگر JSON نیست، فرض می‌کنیم HTML است
-                    cleaned_text = TextProcessingService.clean_html_tags(text_delta)
-            else:
-                cleaned_text = ""
-
+            cleaned_text = extract_text(text_delta)
             logger.debug(f"Cleaned text length: {len(cleaned_text)}")
         except Exception as e:
             logger.error(f"Error cleaning text: {str(e)}")
             cleaned_text = ""
-        
+
         return cleaned_text
 
 
+class NearDuplicateService:
+    # متن‌های خیلی کوتاه اثرانگشت قابل اعتمادی ندارند
+    min_shingles = 20
+
+    @staticmethod
+    def fingerprint(cleaned_text):
+        """محاسبه SimHash متن تمیزشده؛ برای متن‌های خیلی کوتاه None برمی‌گرداند"""
+        features = shingles(cleaned_text or "")
+        if len(features) < NearDuplicateService.min_shingles:
+            return None
+        return simhash_features(features)
+
+    @staticmethod
+    def find_near_duplicates(fingerprints, max_distance=6):
+        """
+        بررسی تکراری‌بودن تقریبی نسبت به مقالات ذخیره‌شده و نسبت به اقلام قبلی همین دسته.
+        ورودی: لیست fingerprint (یا None)
+        خروجی: dict از اندیس ورودی به {'article_id': ...} یا {'batch_index': ...}
+        """
+        # باندهای همسایه هم جستجو می‌شوند تا هر جفت تا فاصله max_distance حتماً کاندید شود
+        probes = [simhash_probe_bands(fp, max_distance) if fp is not None else [] for fp in fingerprints]
+        bands = {band for fp_probes in probes for band in fp_probes}
+        if not bands:
+            return {}
+
+        stored_by_band = {}
+        for doc in articles.find({'simhash_bands': {'$in': list(bands)}}, {'simhash': 1, 'simhash_bands': 1}):
+            stored = (str(doc['_id']), from_signed64(doc['simhash']))
+            for band in doc.get('simhash_bands', []):
+                stored_by_band.setdefault(band, []).append(stored)
+
+        duplicates = {}
+        batch_by_band = {}
+        for index, fp in enumerate(fingerprints):
+            if fp is None:
+                continue
+
+            match = None
+            for band in probes[index]:
+                for article_id, stored_fp in stored_by_band.get(band, []):
+                    if hamming_distance(fp, stored_fp) <= max_distance:
+                        match = {'article_id': article_id}
+                        break
+                if match:
+                    break
+                for batch_index, batch_fp in batch_by_band.get(band, []):
+                    if hamming_distance(fp, batch_fp) <= max_distance:
+                        match = {'batch_index': batch_index}
+                        break
+                if match:
+                    break
+
+            if match:
+                duplicates[index] = match
+            else:
+                for band in simhash_bands(fp):
+                    batch_by_band.setdefault(band, []).append((index, fp))
+
+        return duplicates
+
+    @staticmethod
+    def fingerprint_fields(fp):
+        """فیلدهای ذخیره‌شده روی سند مقاله برای جستجوی LSH"""
+        if fp is None:
+            return {}
+        return {'simhash': to_signed64(fp), 'simhash_bands': simhash_bands(fp)}
+
+
 class WeightCalculationService:
     @staticmethod
     def calculate_article_weight(read=None, like=None, saved=None):
@@ -336,7 +465,7 @@ class UserEmbeddingService:
             # پردازش سرچ‌های اخیر کاربر
             for search in user_searches:
                 try:
-                    search_embedding = search.get("embedding")
+                    search_embedding = decode_embedding(search.get("embedding"))
                     created_at_raw = search.get("created_at")
                     
                     if search_embedding:
@@ -433,6 +562,35 @@ class UserEmbeddingService:
             return {"error": f"Error creating user embedding: {str(e)}"}
 
 
+class PassageService:
+    """نگهداری embedding تکه‌های مقاله در کالکشن article_passages برای جستجوی سطح پاراگراف"""
+    _indexes_ready = False
+
+    @staticmethod
+    def _ensure_indexes():
+        if PassageService._indexes_ready:
+            return
+        article_passages.create_index([('articleId', 1), ('index', 1)], name='articleId_1_index_1')
+        PassageService._indexes_ready = True
+
+    @staticmethod
+    def replace_passages(article_id, passages, source='articles'):
+        """جایگزینی تکه‌های ذخیره‌شده‌ی یک مقاله؛ خطاها فقط لاگ می‌شوند چون بردار اصلی مقاله جدا ذخیره شده است"""
+        if not settings.EMBED_STORE_PASSAGES:
+            return
+        try:
+            PassageService._ensure_indexes()
+            article_id = ObjectId(article_id)
+            article_passages.delete_many({'articleId': article_id})
+            if passages:
+                article_passages.insert_many([
+                    {'articleId': article_id, 'source': source, **passage}
+                    for passage in passages
+                ], ordered=False)
+        except Exception as e:
+            logger.error(f"Error storing passages for article {article_id}: {str(e)}")
+
+
 class ArticleProcessingService:
     @staticmethod
     def process_single_article(article):
@@ -448,14 +606,18 @@ class ArticleProcessingService:
         # گرفتن embedding برای عنوان
         title_embedding = EmbeddingService.get_embedding(title)
         
-        # گرفتن embedding برای متن با timeout بیشتر
-        text_embedding = EmbeddingService.get_embedding(cleaned_text, timeout=60)
+        # embedding متن به صورت تکه‌تکه تا حجم درخواست و زمان پاسخ محدود بماند
+        text_result = EmbeddingService.embed_document(cleaned_text)
 
         # ایجاد یک کپی از مقاله و اضافه کردن فیلدهای جدید
         processed_article = article.copy()
         processed_article['title_embedding'] = title_embedding
-        processed_article['text_embedding'] = text_embedding
+        processed_article['text_embedding'] = text_result['embedding']
         processed_article['cleaned_text'] = cleaned_text
+        # تکه‌ها فقط در کالکشن article_passages نگه داشته می‌شوند، نه در پاسخ crawler
+        article_id = article.get('articleId')
+        if text_result['passages'] and article_id and ObjectId.is_valid(article_id):
+            PassageService.replace_passages(article_id, text_result['passages'])
 
         logger.debug(f"Processed article: {title[:30]}")
         return processed_article
@@ -483,72 +645,30 @@ class SimilarityService:
         )
 
     @staticmethod
-    def find_similar_articles(user_id, limit=10):
-        """یافتن مقالات مشابه بر اساس embedding کاربر"""
+    def find_similar_articles(user_id, limit=10, category=None, since=None):
+        """
+        یافتن مقالات مشابه بر اساس embedding کاربر؛ رتبه‌بندی با ایندکس برداری
+        توصیه‌ها انجام می‌شود و فیلتر دسته‌بندی/تاریخ داخل همان ایندکس اعمال می‌شود
+        """
         # دریافت امبدینگ کاربر
         user_profile = user_profiles.find_one({"userId": user_id})
         if not user_profile or "embedding" not in user_profile:
             raise ValueError(f"No embedding found for user {user_id}")
-            
+
         user_embedding = user_profile["embedding"]
         logger.debug(f"Found user embedding for user {user_id}, length: {len(user_embedding)}")
-        
-        # دریافت همه مقالات با امبدینگ
-        all_articles = list(articles.find({
-            "$or": [
-                {"title_embedding": {"$exists": True}, "text_embedding": {"$exists": True}},
-                {"titleEmbedding": {"$exists": True}, "textEmbedding": {"$exists": True}}
-            ]
-        }))
-        logger.debug(f"Found {len(all_articles)} articles with both title and text embeddings")
-        
-        # محاسبه شباهت کسینوسی
-        similar_articles = []
-        for article in all_articles:
-            # بررسی وجود امبدینگ عنوان و متن
-            title_embedding = None
-            text_embedding = None
-            
-            # بررسی امبدینگ عنوان
-            if "title_embedding" in article:
-                title_embedding = article["title_embedding"]
-            elif "titleEmbedding" in article:
-                title_embedding = article["titleEmbedding"]
-                
-            # بررسی امبدینگ متن
-            if "text_embedding" in article:
-                text_embedding = article["text_embedding"]
-            elif "textEmbedding" in article:
-                text_embedding = article["textEmbedding"]
-            
-            # فقط اگر هر دو امبدینگ موجود باشند، مقاله را در نظر می‌گیریم
-            if title_embedding and text_embedding:
-                # ترکیب امبدینگ‌ها با وزن 50-50
-                title_embedding_np = np.array(title_embedding)
-                text_embedding_np = np.array(text_embedding)
-                
-                # بررسی سازگاری ابعاد
-                if len(title_embedding_np) == len(text_embedding_np):
-                    combined_embedding = 0.5 * title_embedding_np + 0.5 * text_embedding_np
-                    
-                    # محاسبه شباهت کسینوسی
-                    similarity = SimilarityService.calculate_cosine_similarity(
-                        user_embedding, combined_embedding
-                    )
-                    
-                    # اضافه کردن به لیست مقالات مشابه
-                    article_info = {
-                        "articleId": article.get("articleId") or str(article.get("_id")),
-                        "title": article.get("title", "Unknown Title"),
-                        "similarity": float(similarity)
-                    }
-                    similar_articles.append(article_info)
-        
-        # مرتب‌سازی بر اساس شباهت (نزولی)
-        similar_articles.sort(key=lambda x: x["similarity"], reverse=True)
-        
-        # محدود کردن تعداد نتایج
-        return similar_articles[:limit]
+
+        _, hits = recommendation_vector_index.search(
+            user_embedding, limit, min_similarity=-1.0, category=category, since=since
+        )
+        return [
+            {
+                "articleId": hit["article_id"],
+                "title": hit.get("title") or "Unknown Title",
+                "similarity": hit["similarity"]
+            }
+            for hit in hits or []
+        ]
 
 
 class DebugService:
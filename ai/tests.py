@@ -1,3 +1,61 @@
-from django.test import TestCase
+from django.test import SimpleTestCase
 
-# Create your tests here.
+from ai.utils.chunking import chunk_text, pool_embeddings
+from ai.utils.simhash import (
+    simhash, simhash_bands, simhash_probe_bands, hamming_distance, to_signed64, from_signed64
+)
+
+
+class SimHashTests(SimpleTestCase):
+
+    def setUp(self):
+        self.article = " ".join(
+            f"sentence {i} about the central bank raising interest rates again this quarter"
+            for i in range(20)
+        )
+
+    def test_light_edit_is_near_duplicate(self):
+        edited = self.article.replace("sentence 3 about", "sentence 3 regarding", 1)
+        self.assertLessEqual(hamming_distance(simhash(self.article), simhash(edited)), 6)
+
+    def test_unrelated_text_is_far(self):
+        other = " ".join(f"match {i} report the home team won on penalties after extra time" for i in range(20))
+        self.assertGreater(hamming_distance(simhash(self.article), simhash(other)), 6)
+
+    def test_bands_and_signed_round_trip(self):
+        fp = simhash(self.article)
+        self.assertEqual(len(simhash_bands(fp)), 4)
+        self.assertEqual(from_signed64(to_signed64(fp)), fp)
+
+    def test_probes_reach_pairs_that_share_no_band(self):
+        fp = simhash(self.article)
+        # Distance 6 spread over all four 16-bit bands: no exact band in common
+        near = fp ^ (1 << 0) ^ (1 << 1) ^ (1 << 16) ^ (1 << 17) ^ (1 << 32) ^ (1 << 48)
+        self.assertEqual(hamming_distance(fp, near), 6)
+        self.assertFalse(set(simhash_bands(fp)) & set(simhash_bands(near)))
+        self.assertTrue(set(simhash_probe_bands(fp, 6)) & set(simhash_bands(near)))
+        self.assertEqual(len(simhash_probe_bands(fp, 6)), 4 * 17)
+
+
+class ChunkingTests(SimpleTestCase):
+
+    def test_windows_overlap_and_cover_text(self):
+        text = " ".join(f"w{i}" for i in range(1000))
+        chunks = chunk_text(text, window=100, overlap=20)
+        self.assertTrue(all(c["tokens"] <= 100 for c in chunks))
+        self.assertEqual(chunks[0]["start"], 0)
+        self.assertEqual(chunks[-1]["end"], len(text))
+        # consecutive windows share `overlap` tokens
+        self.assertEqual(chunks[1]["text"].split()[:20], chunks[0]["text"].split()[-20:])
+        self.assertEqual(text[chunks[1]["start"]:chunks[1]["end"]], chunks[1]["text"])
+
+    def test_max_chunks_samples_whole_text(self):
+        text = " ".join(f"w{i}" for i in range(5000))
+        chunks = chunk_text(text, window=50, overlap=0, max_chunks=8)
+        self.assertEqual(len(chunks), 8)
+        self.assertEqual(chunks[-1]["end"], len(text))
+
+    def test_pool_is_weighted_and_normalized(self):
+        pooled = pool_embeddings([[1.0, 0.0], [0.0, 1.0], []], [3, 1, 5])
+        self.assertAlmostEqual(pooled[0], 0.9487, places=3)
+        self.assertAlmostEqual(sum(v * v for v in pooled), 1.0, places=5)
@@ -0,0 +1,66 @@
+"""
+تقسیم متن‌های بلند به پنجره‌های هم‌پوشان برای ارسال به سرویس embedding.
+
+توکن‌ها با الگوی کلمه/علامت نگارشی تخمین زده می‌شوند که به توکنایزرهای
+subword نزدیک‌تر از شمارش فاصله‌هاست. هر تکه برشی از متن اصلی است (با
+offset شروع و پایان)، پس برای جستجوی سطح پاراگراف قابل نمایش است.
+"""
+
+import re
+from typing import Dict, List
+
+import numpy as np
+
+TOKEN_RE = re.compile(r'\w+|[^\w\s]', re.UNICODE)
+
+
+def chunk_text(text: str, window: int = 256, overlap: int = 32, max_chunks: int = 0) -> List[Dict]:
+    """
+    برش متن به تکه‌هایی با حداکثر `window` توکن و `overlap` توکن هم‌پوشانی.
+    خروجی: [{'text', 'start', 'end', 'tokens'}, ...]
+    اگر max_chunks > 0 باشد، تکه‌ها به صورت یکنواخت در طول متن نمونه‌برداری می‌شوند.
+    """
+    if window <= 0:
+        raise ValueError("window must be positive")
+    overlap = min(max(overlap, 0), window - 1)
+
+    spans = [match.span() for match in TOKEN_RE.finditer(text)]
+    if not spans:
+        return []
+
+    step = window - overlap
+    chunks = []
+    for first in range(0, len(spans), step):
+        last = min(first + window, len(spans)) - 1
+        start, end = spans[first][0], spans[last][1]
+        chunks.append({
+            'text': text[start:end],
+            'start': start,
+            'end': end,
+            'tokens': last - first + 1
+        })
+        if last == len(spans) - 1:
+            break
+
+    if max_chunks and len(chunks) > max_chunks:
+        # نمونه‌برداری یکنواخت تا بردار نهایی نماینده‌ی کل مقاله باشد، نه فقط ابتدای آن
+        picks = np.linspace(0, len(chunks) - 1, max_chunks).round().astype(int)
+        chunks = [chunks[i] for i in sorted(set(picks.tolist()))]
+
+    return chunks
+
+
+def pool_embeddings(embeddings: List[List[float]], weights: List[float] = None) -> List[float]:
+    """میانگین وزن‌دار embeddingهای تکه‌ها و نرمال‌سازی L2 نتیجه؛ تکه‌های ناموفق (خالی) نادیده گرفته می‌شوند."""
+    rows = [(e, w) for e, w in zip(embeddings, weights or [1.0] * len(embeddings)) if e]
+    if not rows:
+        return []
+
+    matrix = np.asarray([e for e, _ in rows], dtype=np.float32)
+    row_weights = np.asarray([w for _, w in rows], dtype=np.float32)
+    pooled = (matrix * row_weights[:, None]).sum(axis=0) / row_weights.sum()
+
+    norm = np.linalg.norm(pooled)
+    if norm == 0:
+        return pooled.tolist()
+    return (pooled / norm).tolist()
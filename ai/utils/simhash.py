@@ -0,0 +1,101 @@
+"""
+SimHash fingerprints for near-duplicate article detection.
+
+A 64-bit fingerprint is built from hashed word shingles. Two texts whose
+fingerprints differ in at most a few bits are near-duplicates. Fingerprints
+are split into SIMHASH_BANDS bands of 16 bits and stored with those band
+keys. Exact band matches alone only guarantee pairs within distance 3, so
+lookups probe every stored band value within `probe_radius` bits of each
+query band: two fingerprints d bits apart always have a band that differs
+in at most d // SIMHASH_BANDS bits, so with radius 1 (17 keys per band)
+every pair up to distance 7 becomes a candidate. Unrelated articles are
+typically 18+ bits apart.
+"""
+
+import hashlib
+import itertools
+import re
+from typing import List
+
+import numpy as np
+
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 4
+BAND_BITS = SIMHASH_BITS // SIMHASH_BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def shingles(text: str, size: int = 3) -> List[str]:
+    """Lowercased word n-grams of `text`; falls back to single words for very short texts."""
+    tokens = TOKEN_RE.findall(text.lower())
+    if len(tokens) < size:
+        return tokens
+    return [' '.join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)]
+
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """Return the unsigned 64-bit SimHash of `text` (0 for empty text)."""
+    return simhash_features(shingles(text, shingle_size))
+
+
+def simhash_features(features: List[str]) -> int:
+    """Return the unsigned 64-bit SimHash of precomputed features."""
+    if not features:
+        return 0
+
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(f.encode('utf-8'), digest_size=8).digest(), 'little') for f in features),
+        dtype='<u8',
+        count=len(features)
+    )
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder='little')
+    ones = bits.sum(axis=0, dtype=np.int64)
+    fingerprint_bits = ones * 2 > len(features)
+    return int(np.packbits(fingerprint_bits, bitorder='little').view('<u8')[0])
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two fingerprints."""
+    return ((a ^ b) & 0xFFFFFFFFFFFFFFFF).bit_count()
+
+
+def simhash_bands(fingerprint: int) -> List[str]:
+    """Band keys used for the LSH candidate lookup, e.g. ['0:4f1a', '1:00c3', ...]."""
+    fingerprint &= 0xFFFFFFFFFFFFFFFF
+    return [
+        f'{band}:{(fingerprint >> (band * BAND_BITS)) & BAND_MASK:04x}'
+        for band in range(SIMHASH_BANDS)
+    ]
+
+
+def probe_radius(max_distance: int) -> int:
+    """Bits to flip per band so every pair within `max_distance` shares a probed band."""
+    return max(max_distance, 0) // SIMHASH_BANDS
+
+
+def simhash_probe_bands(fingerprint: int, max_distance: int) -> List[str]:
+    """Band keys of `fingerprint` and of every band value within probe_radius(max_distance) bits."""
+    fingerprint &= 0xFFFFFFFFFFFFFFFF
+    radius = probe_radius(max_distance)
+    keys = []
+    for band in range(SIMHASH_BANDS):
+        value = (fingerprint >> (band * BAND_BITS)) & BAND_MASK
+        for flips in range(radius + 1):
+            for positions in itertools.combinations(range(BAND_BITS), flips):
+                probe = value
+                for position in positions:
+                    probe ^= 1 << position
+                keys.append(f'{band}:{probe:04x}')
+    return keys
+
+
+def to_signed64(fingerprint: int) -> int:
+    """Map an unsigned fingerprint to the signed int64 range MongoDB stores."""
+    return fingerprint - (1 << 64) if fingerprint >= (1 << 63) else fingerprint
+
+
+def from_signed64(value: int) -> int:
+    """Inverse of to_signed64."""
+    return value & 0xFFFFFFFFFFFFFFFF
@@ -16,6 +16,7 @@ from ai.services.ai_services import (
     DebugService,
     SimilarityService
 )
+from search.utils.history import decode_embedding
 
 logger = logging.getLogger(__name__)
 
@@ -118,7 +119,11 @@ class FindSimilarArticlesView(APIView):
             limit = serializer.validated_data['limit']
             
             try:
-                similar_articles = SimilarityService.find_similar_articles(user_id, limit)
+                similar_articles = SimilarityService.find_similar_articles(
+                    user_id, limit,
+                    category=serializer.validated_data.get('category'),
+                    since=serializer.validated_data.get('since')
+                )
                 
                 return Response({
                     "userId": user_id,
@@ -248,7 +253,7 @@ def generate_user_embedding(user_id: int) -> dict:
         # پردازش سرچ‌های اخیر کاربر (مثل قبل)
         for search in user_searches:
             try:
-                search_embedding = search.get("embedding")
+                search_embedding = decode_embedding(search.get("embedding"))
                 created_at_raw = search.get("created_at")
                 
                 if search_embedding:
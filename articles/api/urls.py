@@ -1,6 +1,7 @@
 from django.urls import path
 from articles.views.article import (
     FilterLinksAPIView,
+    IngestArticlesAPIView,
     RecommendedArticlesListAPIView,
     BreakingArticlesListAPIView,
     ArticleDetailAPIView,
@@ -8,6 +9,7 @@ from articles.views.article import (
     UpdateArticleAPIView,
     UploadImageForArticleAPIView,
     DeleteArticleAPIView,
+    ArticleNotificationFanOutAPIView,
     ToggleArticleLikeAPIView,
     ToggleArticleSavedAPIView,
     TrackArticleReadAPIView,
@@ -24,6 +26,7 @@ from articles.views.article import (
 
 urlpatterns = [
     path('filter-links/', FilterLinksAPIView.as_view(), name='filter_links'),
+    path('ingest/', IngestArticlesAPIView.as_view(), name='ingest_articles'),
     path('get-recommended-articles/', RecommendedArticlesListAPIView.as_view(), name='get_articles'),
     path('get-breaking-articles/', BreakingArticlesListAPIView.as_view(), name='get_articles'),
     path('detail/<str:article_id>/', ArticleDetailAPIView.as_view(), name='get_article_detail'),
@@ -31,6 +34,7 @@ urlpatterns = [
     path('update/<str:article_id>/', UpdateArticleAPIView.as_view(), name='update_article'),
     path('upload-image/', UploadImageForArticleAPIView.as_view(), name='upload_image_for_article'),
     path('delete/<str:article_id>/', DeleteArticleAPIView.as_view(), name='delete_article'),
+    path('notification-fanout/<str:task_id>/', ArticleNotificationFanOutAPIView.as_view(), name='article_notification_fanout'),
     path('like/<str:article_id>/', ToggleArticleLikeAPIView.as_view(), name='toggle_article_like'),
     path('save/<str:article_id>/', ToggleArticleSavedAPIView.as_view(), name='toggle_article_saved'),
     path('track-read/', TrackArticleReadAPIView.as_view(), name='track_article_read'),
@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class ArticlesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'articles'
\ No newline at end of file
+    name = 'articles'
+
+    def ready(self):
+        import articles.tasks.tasks
@@ -1,19 +1,11 @@
 import json
 import asyncio
 from channels.generic.websocket import AsyncWebsocketConsumer
-from channels.db import database_sync_to_async
-from django.contrib.auth.models import User
-from config.mongo_utils import get_collection
-from bson import ObjectId
+from articles.repositories import article_repository
 import logging
 
 logger = logging.getLogger(__name__)
 
-# دریافت مجموعه MongoDB یک بار در سطح ماژول
-articles_users_collection = get_collection('articles_users')
-likes_collection = get_collection('likes')
-comments_collection = get_collection('comments')
-
 class ChengArticlesConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         """Handle WebSocket connection"""
@@ -87,22 +79,16 @@ class ChengArticlesConsumer(AsyncWebsocketConsumer):
                 'message': 'Failed to fetch articles'
             }))
 
-    @database_sync_to_async
-    def get_user_articles(self):
-        """Fetch user's articles from MongoDB"""
+    async def get_user_articles(self):
+        """Fetch user's articles from MongoDB (async driver; counts for all articles in one aggregation)"""
         try:
-            cursor = articles_users_collection.find({'userId': self.user_id})
+            user_articles = await article_repository.list_by_user(self.user_id)
+            counts = await article_repository.counts([article['_id'] for article in user_articles])
             articles = []
-            
-            for article in cursor:
-                article_id = article['_id']
-                
-                # Get like count for this article
-                like_count = likes_collection.count_documents({'articleId': article_id})
-                
-                # Get comment count for this article
-                comment_count = comments_collection.count_documents({'article_id': str(article_id)})
-                
+
+            for article in user_articles:
+                article_counts = counts[str(article['_id'])]
+
                 # Convert ObjectId to string and format dates
                 article_data = {
                     '_id': str(article['_id']),
@@ -112,16 +98,16 @@ class ChengArticlesConsumer(AsyncWebsocketConsumer):
                     'imgCover': article.get('imgCover', ''),
                     'category': article.get('category', ''),
                     'userId': article.get('userId'),
-                    'likes_count': like_count,
-                    'comments_count': comment_count,
+                    'likes_count': article_counts['likes_count'],
+                    'comments_count': article_counts['comments_count'],
                     'createdAt': article.get('createdAt').isoformat() if article.get('createdAt') else None,
                     'updatedAt': article.get('updatedAt').isoformat() if article.get('updatedAt') else None
                 }
                 articles.append(article_data)
-            
+
             # Sort by creation date (newest first)
             articles.sort(key=lambda x: x['createdAt'] if x['createdAt'] else '', reverse=True)
-            
+
             return articles
         except Exception as e:
             logger.error(f"Error fetching user articles from MongoDB: {str(e)}")
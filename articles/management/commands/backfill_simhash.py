@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from pymongo import UpdateOne
+
+from ai.services.ai_services import NearDuplicateService
+from articles.utils.text_extraction import extract_text
+from config.mongo_utils import get_collection
+
+
+class Command(BaseCommand):
+    help = "Set simhash and simhash_bands on crawler articles stored before near-duplicate detection"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        collection = get_collection('articles')
+        updated = skipped = 0
+        operations = []
+        cursor = collection.find(
+            {'simhash_bands': {'$exists': False}},
+            {'cleaned_text': 1, 'text': 1}
+        )
+        for doc in cursor:
+            cleaned_text = doc.get('cleaned_text') or extract_text(doc.get('text', ''))
+            fields = NearDuplicateService.fingerprint_fields(NearDuplicateService.fingerprint(cleaned_text))
+            if not fields:
+                # Too short for a reliable fingerprint, same as at ingestion
+                skipped += 1
+                continue
+            operations.append(UpdateOne({'_id': doc['_id']}, {'$set': fields}))
+            if len(operations) >= options['batch_size']:
+                collection.bulk_write(operations, ordered=False)
+                updated += len(operations)
+                operations = []
+        if operations:
+            collection.bulk_write(operations, ordered=False)
+            updated += len(operations)
+        self.stdout.write(f"Updated {updated} articles, skipped {skipped} too short to fingerprint")
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from pymongo import ASCENDING
+
+from config.mongo_utils import get_collection
+
+LINK_KEY = [('link', ASCENDING)]
+
+
+class Command(BaseCommand):
+    help = "Create the unique index on articles.link that ingestion relies on for duplicates"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--show', type=int, default=20, help="Duplicate links to list when some are found")
+
+    def handle(self, *args, **options):
+        collection = get_collection('articles')
+        link_indexes = {
+            name: info for name, info in collection.index_information().items()
+            if info['key'] == LINK_KEY
+        }
+        if any(info.get('unique') for info in link_indexes.values()):
+            self.stdout.write("Unique link index already exists")
+            return
+        if not link_indexes:
+            collection.create_index(LINK_KEY, name='link_1', unique=True)
+            self.stdout.write("Created unique index link_1")
+            return
+
+        # Converted in place (MongoDB 6.0+), so lookups by link are never left without an index:
+        # prepareUnique makes new duplicates fail first, then the conversion checks the stored ones
+        name = next(iter(link_indexes))
+        database = collection.database
+        database.command('collMod', collection.name, index={'name': name, 'prepareUnique': True})
+        duplicates = list(collection.aggregate([
+            {'$match': {'link': {'$exists': True}}},
+            {'$group': {'_id': '$link', 'count': {'$sum': 1}}},
+            {'$match': {'count': {'$gt': 1}}},
+            {'$limit': options['show']},
+        ], allowDiskUse=True))
+        if duplicates:
+            for duplicate in duplicates:
+                self.stdout.write(f"{duplicate['count']}x {duplicate['_id']}")
+            raise CommandError(
+                f"Duplicate links are stored; remove them and run again ({name} already rejects new ones)"
+            )
+        database.command('collMod', collection.name, index={'name': name, 'unique': True})
+        self.stdout.write(f"Converted {name} to a unique index")
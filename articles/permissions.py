@@ -0,0 +1,19 @@
+import hmac
+
+from rest_framework.permissions import BasePermission
+
+from iTech import settings
+
+
+class IsStaffOrIngestToken(BasePermission):
+    """
+    Staff users, or callers (the crawler) sending the shared INGEST_API_TOKEN
+    in the X-Ingest-Token header. An empty token setting disables token access.
+    """
+
+    def has_permission(self, request, view):
+        if request.user and request.user.is_staff:
+            return True
+        expected = settings.INGEST_API_TOKEN
+        provided = request.headers.get('X-Ingest-Token', '')
+        return bool(expected) and hmac.compare_digest(provided.encode('utf-8'), expected.encode('utf-8'))
@@ -0,0 +1,35 @@
+import logging
+from typing import Dict, List
+
+from bson import ObjectId
+
+from config.mongo_utils import get_async_collection
+from articles.utils.article_utils import (
+    articles_counts_pipeline, empty_articles_counts, apply_articles_counts
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncArticleRepository:
+    """
+    Non-blocking access to user articles and their engagement counts for
+    Channels consumers, on the shared AsyncMongoClient (no thread-pool hops).
+    """
+
+    async def list_by_user(self, user_id: int) -> List[Dict]:
+        return await get_async_collection('articles_users').find({'userId': user_id}).to_list(None)
+
+    async def count_by_user(self, user_id: int) -> int:
+        return await get_async_collection('articles_users').count_documents({'userId': user_id})
+
+    async def counts(self, article_ids: List[ObjectId]) -> Dict[str, Dict]:
+        """Async get_articles_counts: likes, comments and reads in one aggregation."""
+        counts = empty_articles_counts(article_ids)
+        if not article_ids:
+            return counts
+        cursor = await get_async_collection('likes').aggregate(articles_counts_pipeline(article_ids))
+        return apply_articles_counts(counts, await cursor.to_list(None))
+
+
+article_repository = AsyncArticleRepository()
@@ -9,6 +9,15 @@ class FilterLinksSerializer(serializers.Serializer):
     category = serializers.CharField(max_length=100)
 
 
+class IngestArticleSerializer(serializers.Serializer):
+    """Serializer for one NDJSON line of a crawler ingestion batch"""
+    link = serializers.URLField()
+    title = serializers.CharField(max_length=500)
+    category = serializers.CharField(max_length=100)
+    text = serializers.JSONField()
+    imgCover = serializers.CharField(required=False, allow_blank=True, default='')
+
+
 class ArticleListSerializer(serializers.Serializer):
     """Serializer for article list response"""
     id = serializers.CharField()
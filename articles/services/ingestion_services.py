@@ -0,0 +1,173 @@
+import datetime
+import logging
+from typing import Dict, List
+
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from iTech import settings
+from config.mongo_utils import get_collection
+from ai.services.ai_services import EmbeddingService, NearDuplicateService, PassageService
+from articles.utils.link_filter import known_link_filter
+from articles.utils.text_extraction import extract_article_text
+from search.utils.vector_index import record_index_changes
+
+logger = logging.getLogger(__name__)
+
+
+class ArticleIngestionService:
+    """Bulk ingestion of crawler (AI) articles into the `articles` collection."""
+
+    def __init__(self):
+        self.articles_collection = get_collection('articles')
+        try:
+            self.articles_collection.create_index([('simhash_bands', ASCENDING)], name='simhash_bands_1')
+        except Exception as e:
+            logger.error(f"Failed to ensure simhash index on articles: {str(e)}")
+
+    def ingest(self, items: List[Dict]) -> List[Dict]:
+        """
+        Dedup, embed and upsert a batch of validated crawler items.
+        Returns one outcome per item, in the same order as `items`.
+        """
+        outcomes = [{'link': item['link'], 'status': None} for item in items]
+
+        # Duplicates inside the batch itself: keep the first occurrence
+        first_index_by_link = {}
+        for index, item in enumerate(items):
+            if item['link'] in first_index_by_link:
+                outcomes[index]['status'] = 'duplicate'
+            else:
+                first_index_by_link[item['link']] = index
+
+        existing_links = known_link_filter.existing_links(list(first_index_by_link))
+        candidates = []
+        for link, index in first_index_by_link.items():
+            if link in existing_links:
+                outcomes[index]['status'] = 'duplicate'
+            else:
+                candidates.append(index)
+
+        # Near-duplicate stories from other sources are dropped before paying for embeddings
+        text_fields = {i: extract_article_text(items[i]['text']) for i in candidates}
+        fingerprints = [NearDuplicateService.fingerprint(text_fields[i]['cleaned_text']) for i in candidates]
+        near_duplicates = NearDuplicateService.find_near_duplicates(
+            fingerprints, settings.NEAR_DUPLICATE_MAX_DISTANCE
+        )
+
+        pending = []
+        # In-batch copies per original, in batch order; one stands in if the original fails to embed
+        copies_by_original = {}
+        for position, index in enumerate(candidates):
+            match = near_duplicates.get(position)
+            if match is None:
+                pending.append((index, fingerprints[position]))
+                continue
+            outcomes[index]['status'] = 'near_duplicate'
+            if 'article_id' in match:
+                outcomes[index]['duplicate_of'] = match['article_id']
+            else:
+                original = candidates[match['batch_index']]
+                outcomes[index]['duplicate_of'] = items[original]['link']
+                copies_by_original.setdefault(original, []).append((index, fingerprints[position]))
+
+        while pending:
+            failed = self._embed_and_write(items, pending, text_fields, outcomes)
+            pending = []
+            for original in failed:
+                copies = copies_by_original.pop(original, [])
+                if not copies:
+                    continue
+                (promoted, fingerprint), rest = copies[0], copies[1:]
+                outcomes[promoted]['status'] = None
+                outcomes[promoted].pop('duplicate_of', None)
+                for copy_index, _ in rest:
+                    outcomes[copy_index]['duplicate_of'] = items[promoted]['link']
+                if rest:
+                    copies_by_original[promoted] = rest
+                pending.append((promoted, fingerprint))
+
+        return outcomes
+
+    def _embed_and_write(self, items: List[Dict], pending: List, text_fields: Dict[int, Dict],
+                         outcomes: List[Dict]) -> List[int]:
+        """
+        Embed pending items in batches and write them with one unordered bulk_write.
+        Returns the indexes of the items that could not be embedded.
+        """
+        titles = [items[i]['title'] for i, _ in pending]
+        texts = [text_fields[i]['cleaned_text'] for i, _ in pending]
+
+        batch_size = settings.INGEST_EMBED_BATCH_SIZE
+        title_embeddings = EmbeddingService.get_embeddings(titles, batch_size=batch_size, timeout=30)
+        # Bodies are chunked; chunks of the whole batch share the parallel embedding requests
+        text_results = EmbeddingService.embed_documents(texts)
+
+        now = datetime.datetime.now()
+        failed = []
+        operations = []
+        operation_item_indexes = []
+        passages_by_item = {}
+        for position, (index, fingerprint) in enumerate(pending):
+            title_embedding = title_embeddings[position]
+            text_embedding = text_results[position]['embedding']
+            if not title_embedding or not text_embedding:
+                outcomes[index].update({'status': 'failed', 'error': 'Embedding service unavailable'})
+                failed.append(index)
+                continue
+
+            item = items[index]
+            article_doc = {
+                'link': item['link'],
+                'title': item['title'],
+                'text': item['text'],
+                'category': item['category'],
+                'imgCover': item.get('imgCover', ''),
+                **text_fields[index],
+                'title_embedding': title_embedding,
+                'text_embedding': text_embedding,
+                'createdAt': now,
+                'updatedAt': now,
+                **NearDuplicateService.fingerprint_fields(fingerprint)
+            }
+            operations.append(UpdateOne(
+                {'link': item['link']},
+                {'$setOnInsert': article_doc},
+                upsert=True
+            ))
+            operation_item_indexes.append(index)
+            passages_by_item[index] = text_results[position]['passages']
+
+        if not operations:
+            return failed
+
+        try:
+            result = self.articles_collection.bulk_write(operations, ordered=False)
+            upserted_ids = result.upserted_ids
+            write_errors = {}
+        except BulkWriteError as e:
+            details = e.details
+            upserted_ids = {u['index']: u['_id'] for u in details.get('upserted', [])}
+            write_errors = {err['index']: err for err in details.get('writeErrors', [])}
+            logger.error(f"Bulk ingestion finished with {len(write_errors)} write errors")
+
+        created_links = []
+        created_ids = []
+        for op_index, item_index in enumerate(operation_item_indexes):
+            if op_index in write_errors and write_errors[op_index].get('code') == 11000:
+                # Lost the race on the unique link index to a concurrent ingest
+                outcomes[item_index]['status'] = 'duplicate'
+            elif op_index in write_errors:
+                outcomes[item_index].update({'status': 'failed', 'error': write_errors[op_index].get('errmsg', 'Write failed')})
+            elif op_index in upserted_ids:
+                outcomes[item_index].update({'status': 'created', 'article_id': str(upserted_ids[op_index])})
+                created_links.append(items[item_index]['link'])
+                created_ids.append(upserted_ids[op_index])
+                PassageService.replace_passages(upserted_ids[op_index], passages_by_item[item_index])
+            else:
+                # Another writer inserted the same link between lookup and upsert
+                outcomes[item_index]['status'] = 'duplicate'
+
+        known_link_filter.add(created_links)
+        record_index_changes('articles', created_ids)
+        return failed
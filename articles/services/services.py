@@ -3,7 +3,6 @@ import json
 import datetime
 import logging
 import os
-import requests
 from typing import Dict, List, Optional, Tuple
 from bson import ObjectId
 from django.core.files.storage import default_storage
@@ -14,13 +13,17 @@ from config.mongo_utils import get_collection
 from profiles.models import Profile
 from following.models import Follow
 from articles.utils.article_utils import (
-    delta_to_plain_text, clean_html_tags, get_user_profile_data,
-    get_article_counts, send_websocket_notification, format_article_data,
+    get_user_profile_data, get_article_counts, send_websocket_notification, format_article_data,
     get_similar_articles, filter_articles_by_time, format_article_for_response
 )
+from ai.services.ai_services import EmbeddingService, PassageService
+from articles.utils.link_filter import known_link_filter
+from articles.utils.text_extraction import extract_article_text
+from search.utils.vector_index import bump_index_generation, record_index_changes
+from articles.utils.fan_out_outbox import article_fan_out_outbox
+from notifications.repositories import author_activity_repository
 
 logger = logging.getLogger(__name__)
-embed_api_url = os.getenv("EMBEDDING_SERVER_URL")
 base_url = os.getenv("BASE_URL")
 
 
@@ -39,11 +42,7 @@ class ArticleService:
         """Filter out existing links and return only new ones."""
         incoming_links = [item['link'] for item in data]
         
-        existing_links = self.articles_collection.find(
-            {'link': {'$in': incoming_links}},
-            {'link': 1, '_id': 0}
-        )
-        existing_links_set = {doc['link'] for doc in existing_links}
+        existing_links_set = known_link_filter.existing_links(incoming_links)
         
         new_links = [
             {
@@ -106,8 +105,12 @@ class ArticleService:
         
         return articles_list
 
-    def get_recommended_articles(self, user_id: int) -> List[Dict]:
-        """Get recommended articles for a user based on similarity, excluding already read articles."""
+    def get_recommended_articles(self, user_id: int, category: Optional[str] = None,
+                                 since: Optional[datetime.datetime] = None) -> List[Dict]:
+        """
+        Get recommended articles for a user based on similarity, excluding already read articles.
+        Optionally restricted to one `category` and to articles created `since`.
+        """
         articles_list = []
 
         # 1️⃣ Get articles user has read
@@ -115,7 +118,7 @@ class ArticleService:
         read_article_ids = {read["articleId"] for read in read_articles_cursor}
 
         # 2️⃣ Get similar articles for the user
-        similar_articles = get_similar_articles(user_id)
+        similar_articles = get_similar_articles(user_id, category=category, since=since)
         similar_article_ids = [str(article['_id']) for article in similar_articles if '_id' in article]
 
         if not similar_article_ids:
@@ -289,10 +292,11 @@ class ArticleService:
 
     def create_article(self, article_data: Dict, user_id: int, request) -> Tuple[Dict, int]:
         """Create a new article."""
-        # Generate embeddings
+        # Extract the plain text once; it feeds the embedding and is cached on the document
+        text_fields = extract_article_text(article_data['delta'])
         embeddings = self._generate_embeddings(
             article_data['title'],
-            article_data['delta']
+            text_fields['cleaned_text']
         )
         
         # Handle image upload
@@ -315,6 +319,7 @@ class ArticleService:
             'userId': user_id,
             'title_embedding': embeddings.get('title', []),
             'text_embedding': embeddings.get('text', []),
+            **text_fields,
             'createdAt': now,
             'updatedAt': now
         }
@@ -322,14 +327,17 @@ class ArticleService:
         # Insert article
         result = self.articles_users_collection.insert_one(article_doc)
         article_id = result.inserted_id
+        PassageService.replace_passages(article_id, embeddings.get('passages', []), 'articles_users')
+        record_index_changes('articles_users', [article_id])
         
         # Send notifications
-        self._send_article_notifications(article_id, user_id, request)
+        notification_task_id = self._send_article_notifications(article_id, user_id, request)
         
         return {
             'status': 'success',
             'message': 'Article created successfully',
-            'article_id': str(article_id)
+            'article_id': str(article_id),
+            'notification_task_id': notification_task_id
         }, 201
 
     def update_article(self, article_id: str, update_data: Dict, user_id: int) -> Tuple[Dict, int]:
@@ -358,14 +366,22 @@ class ArticleService:
         
         # Regenerate embeddings if content changed
         if 'title' in update_data or 'delta' in update_data:
+            # The body is only re-chunked and re-embedded when it actually changed
+            cleaned_text = None
+            if 'delta' in update_data or 'cleaned_text' not in article:
+                text_fields = extract_article_text(update_data.get('delta', article.get('delta')))
+                update_doc.update(text_fields)
+                cleaned_text = text_fields['cleaned_text']
             embeddings = self._generate_embeddings(
                 update_data.get('title', article.get('title')),
-                update_data.get('delta', article.get('delta'))
+                cleaned_text
             )
             update_doc.update({
                 'title_embedding': embeddings.get('title', article.get('title_embedding', [])),
                 'text_embedding': embeddings.get('text', article.get('text_embedding', []))
             })
+            if 'text' in embeddings:
+                PassageService.replace_passages(article_id, embeddings['passages'], 'articles_users')
         
         update_doc['updatedAt'] = datetime.datetime.now()
         
@@ -374,6 +390,7 @@ class ArticleService:
             {'_id': ObjectId(article_id)},
             {'$set': update_doc}
         )
+        record_index_changes('articles_users', [article_id])
         
         # Send WebSocket notification
         updated_article = self.articles_users_collection.find_one({'_id': ObjectId(article_id)})
@@ -402,6 +419,10 @@ class ArticleService:
         result = self.articles_users_collection.delete_one({'_id': ObjectId(article_id)})
         
         if result.deleted_count == 1:
+            record_index_changes('articles_users', [article_id])
+            # Cached rankings may still list the article
+            bump_index_generation()
+
             # Send WebSocket notification for article deletion
             send_websocket_notification(
                 f"articles_user_{user_id}",
@@ -512,8 +533,10 @@ class ArticleService:
         read_articles_cursor = self.reads_collection.find({"userId": user_id}, {"articleId": 1})
         read_article_ids = {read["articleId"] for read in read_articles_cursor}
         
-        # Get similar articles
-        similar_articles = get_similar_articles(user_id)
+        # Get similar articles; nothing older than the fallback window can pass the time filter
+        similar_articles = get_similar_articles(
+            user_id, since=datetime.datetime.now() - datetime.timedelta(hours=hours_fallback)
+        )
         
         # Filter by time and read status
         filtered_articles = filter_articles_by_time(
@@ -526,39 +549,26 @@ class ArticleService:
             for article in filtered_articles[:5]
         ]
 
-    def _generate_embeddings(self, title: str, delta: str) -> Dict:
-        """Generate embeddings for title and text."""
+    def _generate_embeddings(self, title: str, cleaned_text: Optional[str]) -> Dict:
+        """
+        Generate embeddings for the title and, unless `cleaned_text` is None,
+        the already-extracted article text. The body is embedded in bounded
+        chunks and pooled into one vector.
+        """
         embeddings = {}
-        
-        try:
-            # Title embedding
-            title_response = requests.post(
-                embed_api_url,
-                json={'texts': [title]},
-                timeout=30
-            )
-            if title_response.status_code == 200:
-                embeddings['title'] = title_response.json().get('embeddings', [[]])[0]
-            
-            # Text embedding
-            cleaned_text = ""
-            try:
-                delta_json = json.loads(delta)
-                cleaned_text = delta_to_plain_text(delta_json)
-            except (json.JSONDecodeError, TypeError):
-                cleaned_text = clean_html_tags(delta)
-            
-            text_response = requests.post(
-                embed_api_url,
-                json={'texts': [cleaned_text]},
-                timeout=60
-            )
-            if text_response.status_code == 200:
-                embeddings['text'] = text_response.json().get('embeddings', [[]])[0]
-            
-        except requests.RequestException as e:
-            logger.error(f"Error generating embeddings: {str(e)}")
-        
+
+        title_embedding = EmbeddingService.get_embedding(title, timeout=30)
+        if title_embedding:
+            embeddings['title'] = title_embedding
+
+        if cleaned_text is not None:
+            text_result = EmbeddingService.embed_document(cleaned_text)
+            if text_result['embedding']:
+                embeddings['text'] = text_result['embedding']
+                embeddings['passages'] = text_result['passages']
+            else:
+                logger.error("Error generating text embedding: embedding service unavailable")
+
         return embeddings
 
     def _handle_image_upload(self, image_file) -> Optional[str]:
@@ -628,13 +638,14 @@ class ArticleService:
         except Exception as e:
             logger.error(f"Failed to send like notification: {str(e)}")
 
-    def _send_article_notifications(self, article_id: ObjectId, user_id: int, request):
-        """Send notifications when new article is created."""
+    def _send_article_notifications(self, article_id: ObjectId, user_id: int, request) -> Optional[str]:
+        """Send notifications when new article is created; returns the follower fan-out task id, if any."""
+        task_id = None
         try:
             # Get article
             article = self.articles_users_collection.find_one({'_id': article_id})
             if not article:
-                return
+                return None
             
             # Notify author
             send_websocket_notification(
@@ -643,31 +654,32 @@ class ArticleService:
                 {'article': format_article_data(article)}
             )
             
-            # Notify followers
-            followers = Follow.objects.filter(followed_id=user_id).select_related('follower')
-            if followers:
+            # Notify followers: a Celery task writes inbox documents in chunks, or for
+            # authors above NOTIFICATIONS_FANOUT_READ_THRESHOLD one author_activity
+            # record is merged into each follower's feed when it is read
+            follower_count = Follow.objects.filter(followed_id=user_id).count()
+            if follower_count:
                 actor_user = User.objects.get(id=user_id)
                 user_data = get_user_profile_data(user_id)
                 now = datetime.datetime.now()
-                
-                # Save notifications for followers
-                notifications_to_save = []
-                for follow in followers:
-                    notifications_to_save.append({
-                        "user_id": follow.follower.id,
-                        "type": "new_article",
-                        "actor_id": user_id,
-                        "target": {"type": "new_article", "article_id": article_id},
-                        "created_at": now,
-                        "is_read": False,
-                        "extra_data": {
-                            "title": article.get('title', ''),
-                            "imgCover": article.get('imgCover', '')
-                        }
-                    })
-                
-                if notifications_to_save:
-                    self.notifications_collection.insert_many(notifications_to_save)
+                extra_data = {
+                    "title": article.get('title', ''),
+                    "imgCover": article.get('imgCover', '')
+                }
+
+                if follower_count >= settings.NOTIFICATIONS_FANOUT_READ_THRESHOLD:
+                    author_activity_repository.record(
+                        user_id, "new_article", {"type": "new_article", "article_id": article_id}, now, extra_data
+                    )
+                else:
+                    fan_out_kwargs = {
+                        'article_id': str(article_id),
+                        'author_id': user_id,
+                        'created_at': now.isoformat(),
+                        'extra_data': extra_data
+                    }
+                    # Queued by the dispatch_article_fan_outs beat task: never waits on the broker
+                    task_id = article_fan_out_outbox.add(fan_out_kwargs)
                 
                 # Send real-time notification
                 notification_payload = {
@@ -678,10 +690,7 @@ class ArticleService:
                     "target_id": {"type": "new_article", "article_id": str(article_id)},
                     "created_at": now.isoformat(),
                     "read": False,
-                    "extra_data": {
-                        "title": article.get('title', ''),
-                        "imgCover": article.get('imgCover', '')
-                    }
+                    "extra_data": extra_data
                 }
                 
                 send_websocket_notification(
@@ -706,6 +715,7 @@ class ArticleService:
             
         except Exception as e:
             logger.error(f"Failed to send article notifications: {str(e)}")
+        return task_id
 
 
 class SaveService:
@@ -0,0 +1,95 @@
+import datetime
+import logging
+from bson import ObjectId
+from celery import shared_task
+from iTech import settings
+from articles.utils.fan_out_outbox import article_fan_out_outbox
+from following.models import Follow
+from notifications.repositories import notification_repository
+
+logger = logging.getLogger(__name__)
+
+
+def new_article_notification(follower_id, author_id, article_id, created_at, extra_data):
+    return {
+        "user_id": follower_id,
+        "type": "new_article",
+        "actor_id": author_id,
+        "target": {"type": "new_article", "article_id": article_id},
+        "created_at": created_at,
+        "is_read": False,
+        "extra_data": extra_data
+    }
+
+
+def report_progress(task, meta):
+    """PROGRESS state for the status endpoint; best effort, so an unreachable result backend never stops a fan-out."""
+    if task.request.called_directly or task.request.is_eager:
+        return
+    try:
+        task.update_state(state='PROGRESS', meta=meta)
+    except Exception as e:
+        logger.error(f"Could not report fan-out progress: {str(e)}")
+
+
+@shared_task(bind=True, max_retries=5, default_retry_delay=10)
+def fan_out_article_notifications(self, article_id, author_id, created_at, extra_data, after_id=0, written=0):
+    """
+    Write one 'new_article' inbox notification per follower of `author_id`.
+    Followers are read in keyset chunks of ARTICLE_FANOUT_CHUNK_SIZE (by
+    Follow id, never materializing the whole queryset) and each chunk is
+    one bounded bulk of upserts, so a retried or redelivered task never
+    duplicates a follower's notification. Progress is reported as a
+    PROGRESS state with {'written', 'total'} from the first chunk on; a
+    failed chunk is retried from the last one that was written.
+    """
+    followers = Follow.objects.filter(followed_id=author_id)
+    total = followers.count()
+    report_progress(self, {'article_id': article_id, 'author_id': author_id, 'written': written, 'total': total})
+    article_object_id = ObjectId(article_id)
+    created_at_dt = datetime.datetime.fromisoformat(created_at)
+
+    while True:
+        chunk = list(
+            followers.filter(id__gt=after_id).order_by('id')
+            .values_list('id', 'follower_id')[:settings.ARTICLE_FANOUT_CHUNK_SIZE]
+        )
+        if not chunk:
+            break
+        try:
+            notification_repository.add_new_article_notifications([
+                new_article_notification(follower_id, author_id, article_object_id, created_at_dt, extra_data)
+                for _, follower_id in chunk
+            ])
+        except Exception as e:
+            logger.error(f"Article {article_id} fan-out failed after {written} of {total}: {str(e)}")
+            raise self.retry(exc=e, args=[], kwargs={
+                'article_id': article_id, 'author_id': author_id, 'created_at': created_at,
+                'extra_data': extra_data, 'after_id': after_id, 'written': written
+            })
+
+        after_id = chunk[-1][0]
+        written += len(chunk)
+        report_progress(self, {'article_id': article_id, 'author_id': author_id, 'written': written, 'total': total})
+
+    logger.info(f"Article {article_id} fan-out wrote {written} notifications")
+    return {'article_id': article_id, 'author_id': author_id, 'written': written, 'total': total}
+
+
+@shared_task
+def dispatch_article_fan_outs():
+    """Queue the fan-outs waiting in the outbox under their stored task ids."""
+    entries = article_fan_out_outbox.take(settings.ARTICLE_FANOUT_DISPATCH_BATCH)
+    for position, entry in enumerate(entries):
+        try:
+            # Stored before publishing so the worker's first PROGRESS always wins; lets the
+            # status endpoint tell the author's waiting task from an unknown id
+            fan_out_article_notifications.backend.store_result(entry['task_id'], {
+                'article_id': entry['kwargs']['article_id'], 'author_id': entry['author_id'], 'written': 0, 'total': None
+            }, 'QUEUED')
+            fan_out_article_notifications.apply_async(kwargs=entry['kwargs'], task_id=entry['task_id'])
+        except Exception as e:
+            logger.error(f"Could not queue article fan-out {entry['task_id']}, keeping it: {str(e)}")
+            article_fan_out_outbox.restore(entries[position:])
+            return position
+    return len(entries)
@@ -0,0 +1,164 @@
+import time
+from unittest import mock
+
+from bson import ObjectId
+from django.test import SimpleTestCase
+from kombu.exceptions import OperationalError
+
+from articles.services.services import ArticleService
+from articles.tasks.tasks import dispatch_article_fan_outs, fan_out_article_notifications
+from articles.utils.link_filter import KnownLinkFilter, bloom_parameters, bloom_positions
+from articles.utils.text_extraction import extract_article_text, extract_text
+
+
+class KnownLinkFilterTests(SimpleTestCase):
+
+    def test_bloom_parameters_for_one_percent(self):
+        bits, hashes = bloom_parameters(1000000, 0.01)
+        # ~9.59 bits per item and 7 hash functions for a 1% false-positive rate
+        self.assertAlmostEqual(bits / 1000000, 9.59, places=1)
+        self.assertEqual(hashes, 7)
+
+    def test_bloom_positions_are_stable_and_in_range(self):
+        link = "https://example.com/news/1"
+        positions = bloom_positions(link, 1000, 7)
+        self.assertEqual(positions, bloom_positions(link, 1000, 7))
+        self.assertEqual(len(positions), 7)
+        self.assertTrue(all(0 <= p < 1000 for p in positions))
+        self.assertNotEqual(positions, bloom_positions("https://example.com/news/2", 1000, 7))
+
+    def test_only_filter_positives_are_confirmed_against_mongo(self):
+        collection = mock.Mock()
+        collection.find.return_value = [{'link': 'https://example.com/old'}]
+        link_filter = KnownLinkFilter(collection)
+        with mock.patch('articles.utils.link_filter.get_redis_client'), \
+                mock.patch.object(KnownLinkFilter, '_meta', return_value=(1000, 7, time.time())), \
+                mock.patch.object(KnownLinkFilter, '_might_contain', side_effect=[['https://example.com/old'], []]):
+            found = link_filter.existing_links(['https://example.com/old', 'https://example.com/new'])
+            self.assertEqual(found, {'https://example.com/old'})
+            collection.find.assert_called_once_with({'link': {'$in': ['https://example.com/old']}}, {'link': 1, '_id': 0})
+
+            self.assertEqual(link_filter.existing_links(['https://example.com/other']), set())
+            collection.find.assert_called_once()
+
+
+class TextExtractionTests(SimpleTestCase):
+
+    def test_delta_json_with_embeds(self):
+        delta = '{"ops": [{"insert": "Intro "}, {"insert": {"formula": "e=mc^2"}}, ' \
+                '{"insert": {"image": "cover.png"}}, {"insert": "\\nBody\\n"}]}'
+        self.assertEqual(extract_text(delta), "Intro e=mc^2\nBody")
+
+    def test_html_skips_scripts_and_decodes_entities(self):
+        html = "<p>Fish &amp; chips</p><script>track()</script><ul><li>one</li><li>two</li></ul>"
+        self.assertEqual(extract_text(html), "Fish & chips\n\none\n\ntwo")
+
+    def test_html_tags_are_case_insensitive_and_keep_alt_text(self):
+        html = '<DIV>Cover<IMG SRC="a.png" ALT="A &quot;red&quot; car"></DIV><STYLE>p {}</STYLE><P>Text<BR>more</P>'
+        self.assertEqual(extract_text(html), 'Cover A "red" car\n\nText\nmore')
+
+    def test_article_fields(self):
+        fields = extract_article_text({"ops": [{"insert": "word " * 100}]})
+        self.assertEqual(fields["word_count"], 100)
+        self.assertLessEqual(len(fields["excerpt"]), 201)
+        self.assertTrue(fields["excerpt"].endswith("…"))
+
+
+class ArticleNotificationFanOutTests(SimpleTestCase):
+
+    def send_article_notifications(self, follower_count):
+        article_id = ObjectId()
+        service = ArticleService.__new__(ArticleService)
+        service.articles_users_collection = mock.Mock()
+        service.articles_users_collection.find_one.return_value = {'_id': article_id, 'title': 'T', 'imgCover': ''}
+        service.articles_users_collection.count_documents.return_value = 1
+        with mock.patch('articles.services.services.Follow') as follow, \
+                mock.patch('articles.services.services.User'), \
+                mock.patch('articles.services.services.get_user_profile_data', return_value={'profilePicture': None}), \
+                mock.patch('articles.services.services.format_article_data', return_value={}), \
+                mock.patch('articles.services.services.send_websocket_notification'), \
+                mock.patch('articles.services.services.article_fan_out_outbox') as outbox, \
+                mock.patch('articles.services.services.author_activity_repository') as activity:
+            follow.objects.filter.return_value.count.return_value = follower_count
+            outbox.add.return_value = 'task-1'
+            task_id = service._send_article_notifications(article_id, 7, None)
+        return task_id, outbox, activity
+
+    def test_article_creation_never_waits_on_the_broker(self):
+        with mock.patch.object(fan_out_article_notifications, 'apply_async', side_effect=OperationalError) as apply_async:
+            task_id, outbox, _ = self.send_article_notifications(3)
+        self.assertEqual(task_id, 'task-1')
+        self.assertEqual(outbox.add.call_args[0][0]['author_id'], 7)
+        apply_async.assert_not_called()
+
+    @mock.patch('iTech.settings.NOTIFICATIONS_FANOUT_READ_THRESHOLD', 100)
+    def test_followers_below_the_threshold_get_a_fan_out(self):
+        task_id, outbox, activity = self.send_article_notifications(99)
+        self.assertEqual(task_id, 'task-1')
+        outbox.add.assert_called_once()
+        activity.record.assert_not_called()
+
+    @mock.patch('iTech.settings.NOTIFICATIONS_FANOUT_READ_THRESHOLD', 100)
+    def test_large_audiences_get_one_author_activity_record(self):
+        task_id, outbox, activity = self.send_article_notifications(100)
+        self.assertIsNone(task_id)
+        outbox.add.assert_not_called()
+        self.assertEqual(activity.record.call_args[0][:2], (7, 'new_article'))
+
+    def test_dispatch_keeps_fan_outs_while_the_broker_is_down(self):
+        entries = [{'task_id': f'task-{i}', 'author_id': 7, 'kwargs': {'article_id': 'a', 'author_id': 7}} for i in range(2)]
+        with mock.patch('articles.tasks.tasks.article_fan_out_outbox') as outbox, \
+                mock.patch.object(fan_out_article_notifications.backend, 'store_result'), \
+                mock.patch.object(fan_out_article_notifications, 'apply_async', side_effect=OperationalError):
+            outbox.take.return_value = entries
+            self.assertEqual(dispatch_article_fan_outs.run(), 0)
+        outbox.restore.assert_called_once_with(entries)
+
+
+class FakeFollows:
+    """Follow queryset over (id, follower_id) rows, for the fan-out task's keyset reads."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def filter(self, followed_id=None, id__gt=0):
+        return FakeFollows([row for row in self.rows if row[0] > id__gt])
+
+    def order_by(self, field):
+        return FakeFollows(sorted(self.rows))
+
+    def values_list(self, *fields):
+        return self.rows
+
+    def count(self):
+        return len(self.rows)
+
+
+class FanOutTaskTests(SimpleTestCase):
+
+    def run_fan_out(self, rows, update_state=None):
+        fan_out_article_notifications.push_request(id='task-1', called_directly=False)
+        try:
+            with mock.patch('articles.tasks.tasks.Follow') as follow, \
+                    mock.patch('articles.tasks.tasks.notification_repository') as repository, \
+                    mock.patch.object(fan_out_article_notifications, 'update_state', update_state or mock.Mock()) as state:
+                follow.objects = FakeFollows(rows)
+                result = fan_out_article_notifications.run(str(ObjectId()), 7, '2025-01-01T00:00:00', {'title': 'T'})
+        finally:
+            fan_out_article_notifications.pop_request()
+        return result, repository, state
+
+    def test_unreachable_result_backend_does_not_stop_the_fan_out(self):
+        result, repository, _ = self.run_fan_out([(1, 10), (2, 11)], mock.Mock(side_effect=OperationalError))
+        self.assertEqual((result['written'], result['total']), (2, 2))
+        repository.add_new_article_notifications.assert_called_once()
+
+    @mock.patch('iTech.settings.ARTICLE_FANOUT_CHUNK_SIZE', 2)
+    def test_followers_are_written_in_keyset_chunks_with_progress(self):
+        result, repository, state = self.run_fan_out([(5, 12), (1, 10), (3, 11)])
+        chunks = [[n['user_id'] for n in call[0][0]] for call in repository.add_new_article_notifications.call_args_list]
+        self.assertEqual(chunks, [[10, 11], [12]])
+        self.assertEqual([(call.kwargs['state'], call.kwargs['meta']['written'], call.kwargs['meta']['total'])
+                          for call in state.call_args_list], [('PROGRESS', 0, 3), ('PROGRESS', 2, 3), ('PROGRESS', 3, 3)])
+        self.assertEqual(state.call_args.kwargs['meta']['author_id'], 7)
+        self.assertEqual((result['written'], result['total']), (3, 3))
@@ -7,9 +7,11 @@ from bson import ObjectId
 from config.mongo_utils import get_collection, get_database
 from django.contrib.auth.models import User
 from profiles.models import Profile
+from following.models import Follow
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
-import numpy as np
+from articles.utils.text_extraction import delta_to_text, html_to_text
+from search.utils.vector_index import recommendation_vector_index
 import os
 
 logger = logging.getLogger(__name__)
@@ -33,25 +35,11 @@ def format_article_data(document: Dict) -> Dict:
 
 def delta_to_plain_text(delta) -> str:
     """Converts Quill Delta to plain text."""
-    text = ""
-    ops = []
-    if isinstance(delta, dict) and "ops" in delta:
-        ops = delta.get("ops", [])
-    elif isinstance(delta, list):
-        ops = delta
-    
-    for op in ops:
-        insert = op.get("insert", "")
-        if isinstance(insert, str):
-            text += insert
-    return text
+    return delta_to_text(delta)
 
 def clean_html_tags(html_text: str) -> str:
     """Removes HTML tags from text."""
-    if not html_text:
-        return ""
-    clean_text = re.sub(r'<[^>]+>', '', html_text)
-    return clean_text.strip()
+    return html_to_text(html_text)
 
 def get_absolute_img_cover_url(img_cover_path: str, request) -> str:
     """Converts a relative image cover path to an absolute URL."""
@@ -87,26 +75,95 @@ def get_user_profile_data(user_id: int) -> Dict:
 
 def get_article_counts(article_id: ObjectId) -> Dict:
     """Get likes, comments, and reads count for an article."""
-    likes_collection = get_collection('likes')
-    comments_collection = get_collection('comments')
-    reads_collection = get_collection('articleReads')
-    
-    likes_count = likes_collection.count_documents({'articleId': article_id})
-    
-    # Count comments with different field variations
-    comments_count_str = comments_collection.count_documents({'article_id': str(article_id)})
-    comments_count_obj = comments_collection.count_documents({'article_id': article_id})
-    comments_count_camel = comments_collection.count_documents({'articleId': article_id})
-    comments_count = comments_count_str + comments_count_obj + comments_count_camel
-    
-    reads_count = reads_collection.count_documents({'articleId': article_id})
-    
+    return get_articles_counts([article_id])[str(article_id)]
+
+def articles_counts_pipeline(article_ids: List[ObjectId]) -> List[Dict]:
+    """
+    Aggregation (run on `likes`) that counts likes, comments and reads of
+    `article_ids`, grouped by ({key: str id, kind: '<kind>_count'}).
+    Comments are matched on all three stored variants (article_id as str or
+    ObjectId, articleId as ObjectId), like get_article_counts.
+    """
+    str_ids = [str(article_id) for article_id in article_ids]
+    key = {'$toString': {'$ifNull': ['$articleId', '$article_id']}}
+    return [
+        {'$match': {'articleId': {'$in': article_ids}}},
+        {'$project': {'_id': 0, 'key': key, 'kind': 'likes_count'}},
+        {'$unionWith': {'coll': 'comments', 'pipeline': [
+            {'$match': {'$or': [
+                {'article_id': {'$in': str_ids}},
+                {'article_id': {'$in': article_ids}},
+                {'articleId': {'$in': article_ids}}
+            ]}},
+            {'$project': {'_id': 0, 'key': key, 'kind': 'comments_count'}}
+        ]}},
+        {'$unionWith': {'coll': 'articleReads', 'pipeline': [
+            {'$match': {'articleId': {'$in': article_ids}}},
+            {'$project': {'_id': 0, 'key': key, 'kind': 'reads_count'}}
+        ]}},
+        {'$group': {'_id': {'key': '$key', 'kind': '$kind'}, 'count': {'$sum': 1}}}
+    ]
+
+def empty_articles_counts(article_ids: List[ObjectId]) -> Dict[str, Dict]:
     return {
-        'likes_count': likes_count,
-        'comments_count': comments_count,
-        'reads_count': reads_count
+        str(article_id): {'likes_count': 0, 'comments_count': 0, 'reads_count': 0}
+        for article_id in article_ids
     }
 
+def apply_articles_counts(counts: Dict[str, Dict], rows) -> Dict[str, Dict]:
+    """Fill `counts` from the rows of articles_counts_pipeline."""
+    for row in rows:
+        article_counts = counts.get(row['_id']['key'])
+        if article_counts is not None:
+            article_counts[row['_id']['kind']] = row['count']
+    return counts
+
+def get_articles_counts(article_ids: List[ObjectId]) -> Dict[str, Dict]:
+    """
+    Likes, comments and reads counts for many articles in one aggregation.
+    Returns {str(article_id): {'likes_count', 'comments_count', 'reads_count'}}.
+    """
+    counts = empty_articles_counts(article_ids)
+    if not article_ids:
+        return counts
+    return apply_articles_counts(counts, get_collection('likes').aggregate(articles_counts_pipeline(article_ids)))
+
+def _int_ids(values) -> set:
+    ids = set()
+    for value in values:
+        try:
+            ids.add(int(value))
+        except (TypeError, ValueError):
+            continue
+    return ids
+
+def get_users_profile_data(user_ids) -> Dict[int, Dict]:
+    """Batched get_user_profile_data: one User query with the profile joined in."""
+    user_ids = _int_ids(user_ids)
+    if not user_ids:
+        return {}
+
+    data = {}
+    for user in User.objects.filter(id__in=user_ids).select_related('profile'):
+        profile = getattr(user, 'profile', None)
+        profile_picture = profile.profile_picture.url if profile and profile.profile_picture else ''
+        data[user.id] = {
+            'username': user.username,
+            'profilePicture': f'{base_url}{profile_picture}' if profile_picture else 'http://localhost:8001/media/profile_pics/default.png',
+            'bio': (profile.bio or '') if profile else ''
+        }
+    return data
+
+def get_followed_user_ids(follower, user_ids) -> set:
+    """Subset of `user_ids` that `follower` follows, in one query."""
+    user_ids = _int_ids(user_ids)
+    if not user_ids:
+        return set()
+    return set(
+        Follow.objects.filter(follower=follower, followed_id__in=user_ids)
+        .values_list('followed_id', flat=True)
+    )
+
 def send_websocket_notification(group_name: str, message_type: str, data: Dict):
     """Send notification via WebSocket."""
     try:
@@ -125,39 +182,32 @@ def validate_object_id(object_id: str) -> bool:
     """Validate if string is a valid ObjectId."""
     return ObjectId.is_valid(object_id)
 
-def get_similar_articles(user_id: int, limit: int = 50) -> List[Dict]:
-    """Get similar articles based on user profile embedding."""
+def get_similar_articles(user_id: int, limit: int = 50, category: Optional[str] = None,
+                         since: Optional[datetime.datetime] = None) -> List[Dict]:
+    """
+    Get similar articles based on user profile embedding, most similar first.
+    Ranking uses the in-process recommendation index; `category` and `since`
+    are applied inside it, so filtered requests only touch matching articles.
+    """
     articles_collection = get_collection('articles')
     user_profiles = db["user_profiles"]
-    
+
     user_profile = user_profiles.find_one({"userId": user_id})
     if not user_profile or "embedding" not in user_profile:
         return []
 
-    user_embedding = np.array(user_profile["embedding"])
+    _, hits = recommendation_vector_index.search(
+        user_profile["embedding"], limit, min_similarity=-1.0, category=category, since=since
+    )
+    if not hits:
+        return []
 
-    all_articles = list(articles_collection.find({
-        "$or": [
-            {"title_embedding": {"$exists": True}, "text_embedding": {"$exists": True}},
-            {"titleEmbedding": {"$exists": True}, "textEmbedding": {"$exists": True}}
-        ]
-    }))
-
-    similar_articles = []
-    for article in all_articles:
-        title_embedding = article.get("title_embedding") or article.get("titleEmbedding")
-        text_embedding = article.get("text_embedding") or article.get("textEmbedding")
-
-        if title_embedding and text_embedding and len(title_embedding) == len(text_embedding):
-            combined = 0.5 * np.array(title_embedding) + 0.5 * np.array(text_embedding)
-            similarity = np.dot(user_embedding, combined) / (np.linalg.norm(user_embedding) * np.linalg.norm(combined))
-            similar_articles.append({
-                "article": article,
-                "similarity": float(similarity)
-            })
-
-    similar_articles.sort(key=lambda x: x["similarity"], reverse=True)
-    return [item["article"] for item in similar_articles[:limit]]
+    article_ids = [ObjectId(hit['article_id']) for hit in hits]
+    articles_by_id = {
+        article['_id']: article
+        for article in articles_collection.find({'_id': {'$in': article_ids}})
+    }
+    return [articles_by_id[article_id] for article_id in article_ids if article_id in articles_by_id]
 
 def filter_articles_by_time(articles: List[Dict], read_article_ids: set, hours_primary: int = 12, hours_fallback: int = 72) -> List[Dict]:
     """Filter articles by time and read status."""
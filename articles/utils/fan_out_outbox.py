@@ -0,0 +1,58 @@
+import logging
+import uuid
+from typing import Dict, List, Optional
+
+from pymongo import ASCENDING
+
+from config.mongo_utils import get_collection
+
+logger = logging.getLogger(__name__)
+
+
+class ArticleFanOutOutbox:
+    """
+    New-article fan-outs waiting to be queued. Creating an article only
+    inserts an entry here, under the task id the fan-out will run with, so
+    the request never waits on the Celery broker or result backend; the
+    articles.tasks.tasks.dispatch_article_fan_outs beat task queues the
+    entries and removes them. Entries stay put while the broker is down.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+        try:
+            self.collection.create_index([('task_id', ASCENDING)], name='task_id_1', unique=True)
+        except Exception as e:
+            logger.error(f"Failed to ensure article fan-out outbox indexes: {str(e)}")
+
+    def add(self, fan_out_kwargs: Dict) -> str:
+        """Store a fan-out and return the task id it will run under."""
+        task_id = str(uuid.uuid4())
+        self.collection.insert_one({
+            'task_id': task_id,
+            'author_id': fan_out_kwargs['author_id'],
+            'kwargs': fan_out_kwargs
+        })
+        return task_id
+
+    def pending(self, task_id: str) -> Optional[Dict]:
+        """The entry of a fan-out that has not been queued yet, if any."""
+        return self.collection.find_one({'task_id': task_id})
+
+    def take(self, limit: int) -> List[Dict]:
+        """Remove and return up to `limit` entries, oldest first; each is taken by one dispatcher only."""
+        entries = []
+        for _ in range(limit):
+            entry = self.collection.find_one_and_delete({}, sort=[('_id', ASCENDING)])
+            if entry is None:
+                break
+            entries.append(entry)
+        return entries
+
+    def restore(self, entries: List[Dict]):
+        """Put back entries that could not be queued."""
+        if entries:
+            self.collection.insert_many(entries, ordered=False)
+
+
+article_fan_out_outbox = ArticleFanOutOutbox(get_collection('article_fanout_outbox'))
@@ -0,0 +1,211 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+from typing import Iterable, List, Set, Tuple
+
+from redis.exceptions import WatchError
+
+from iTech import settings
+from config.mongo_utils import get_collection
+from config.redis_utils import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+def bloom_parameters(capacity: int, error_rate: float) -> Tuple[int, int]:
+    """Return (bits, hashes) for a Bloom filter sized for `capacity` items at `error_rate`."""
+    capacity = max(capacity, 1)
+    bits = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+    hashes = max(1, round(bits / capacity * math.log(2)))
+    return bits, hashes
+
+
+def bloom_positions(link: str, bits: int, hashes: int) -> List[int]:
+    """Bit offsets for `link` using double hashing over one 128-bit blake2b digest."""
+    digest = hashlib.blake2b(link.encode('utf-8'), digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], 'little')
+    h2 = int.from_bytes(digest[8:], 'little') | 1
+    return [(h1 + i * h2) % bits for i in range(hashes)]
+
+
+class KnownLinkFilter:
+    """
+    Bloom filter of known crawler article links, stored as a Redis bitmap.
+
+    Only filter positives are confirmed against Mongo; negatives are
+    trusted. Every insert goes through `add`, which also writes into a
+    filter that is being rebuilt, so a swap cannot lose a link. A link that
+    is still missed (Redis failing during `add`) is reported as new once
+    and then rejected as a duplicate by the unique `link` index on
+    ingestion, until the next rebuild covers it; rebuilds run when the
+    filter is older than KNOWN_LINKS_FILTER_MAX_AGE_HOURS. When the filter
+    is not built yet (or Redis is unreachable) lookups fall back to an
+    indexed `$in` query on `articles.link`. That unique index is created by
+    the ensure_link_index management command, never at import.
+    """
+    key = 'articles:known_links:bloom'
+    building_key = 'articles:known_links:bloom:building'
+    meta_key = 'articles:known_links:bloom:meta'
+    lock_key = 'articles:known_links:bloom:lock'
+    rebuild_chunk_size = 5000
+    rebuild_retry_seconds = 60
+    add_attempts = 5
+
+    def __init__(self, collection):
+        self.collection = collection
+        self._last_rebuild_attempt = 0.0
+
+    def _meta(self, redis_client):
+        """(bits, hashes, built_at) of the current filter, or None before the first build."""
+        meta = redis_client.hgetall(self.meta_key)
+        if not meta or b'built_at' not in meta:
+            return None
+        return int(meta[b'bits']), int(meta[b'hashes']), float(meta[b'built_at'])
+
+    def _is_stale(self, built_at: float) -> bool:
+        return time.time() - built_at > settings.KNOWN_LINKS_FILTER_MAX_AGE_HOURS * 3600
+
+    def existing_links(self, links: List[str]) -> Set[str]:
+        """Return the subset of `links` that is already stored in the articles collection."""
+        if not links:
+            return set()
+
+        query_links = links
+        try:
+            redis_client = get_redis_client()
+            meta = self._meta(redis_client)
+            if meta is None:
+                self.rebuild_in_background()
+            else:
+                bits, hashes, built_at = meta
+                if self._is_stale(built_at):
+                    self.rebuild_in_background()
+                query_links = self._might_contain(redis_client, links, bits, hashes)
+        except Exception as e:
+            logger.error(f"Known-link filter unavailable, falling back to Mongo: {str(e)}")
+
+        if not query_links:
+            return set()
+        cursor = self.collection.find({'link': {'$in': query_links}}, {'link': 1, '_id': 0})
+        return {doc['link'] for doc in cursor}
+
+    def _might_contain(self, redis_client, links: List[str], bits: int, hashes: int) -> List[str]:
+        pipe = redis_client.pipeline(transaction=False)
+        for link in links:
+            for position in bloom_positions(link, bits, hashes):
+                pipe.getbit(self.key, position)
+        flags = pipe.execute()
+
+        return [
+            link for i, link in enumerate(links)
+            if all(flags[i * hashes:(i + 1) * hashes])
+        ]
+
+    def add(self, links: Iterable[str]):
+        """
+        Record newly inserted links in the filter and, while a rebuild is
+        scanning, in the filter being built. The bits are written in a
+        transaction watching the meta, so a swap in between reading the
+        parameters and writing the bits makes it retry with the new ones.
+        """
+        links = list(links)
+        if not links:
+            return
+        try:
+            redis_client = get_redis_client()
+            with redis_client.pipeline(transaction=True) as pipe:
+                for _ in range(self.add_attempts):
+                    try:
+                        pipe.watch(self.meta_key)
+                        meta = pipe.hgetall(self.meta_key)
+                        targets = [
+                            (key, int(meta[bits_field]), int(meta[hashes_field]))
+                            for key, bits_field, hashes_field in (
+                                (self.key, b'bits', b'hashes'),
+                                (self.building_key, b'building_bits', b'building_hashes'),
+                            )
+                            if bits_field in meta
+                        ]
+                        if not targets:
+                            pipe.unwatch()
+                            return
+                        pipe.multi()
+                        for key, bits, hashes in targets:
+                            for link in links:
+                                for position in bloom_positions(link, bits, hashes):
+                                    pipe.setbit(key, position, 1)
+                        pipe.execute()
+                        return
+                    except WatchError:
+                        continue
+            logger.error(f"Known-link filter kept changing; {len(links)} links wait for the next rebuild")
+        except Exception as e:
+            logger.error(f"Failed to add links to known-link filter: {str(e)}")
+
+    def rebuild(self):
+        """Rebuild the filter from the articles collection and swap it in atomically."""
+        redis_client = get_redis_client()
+        if not redis_client.set(self.lock_key, 1, nx=True, ex=600):
+            logger.info("Known-link filter rebuild already running elsewhere")
+            return False
+
+        try:
+            count = self.collection.estimated_document_count()
+            capacity = max(settings.KNOWN_LINKS_FILTER_CAPACITY, count * 2)
+            bits, hashes = bloom_parameters(capacity, settings.KNOWN_LINKS_FILTER_ERROR_RATE)
+
+            redis_client.delete(self.building_key)
+            # Allocate the whole bitmap up front so the pipelined setbit calls never resize it
+            redis_client.setbit(self.building_key, bits - 1, 0)
+            # From here on `add` writes into the new bitmap too, covering links the scan misses
+            redis_client.hset(self.meta_key, mapping={'building_bits': bits, 'building_hashes': hashes})
+
+            pipe = redis_client.pipeline(transaction=False)
+            pending = 0
+            added = 0
+            for doc in self.collection.find({'link': {'$exists': True}}, {'link': 1, '_id': 0}):
+                for position in bloom_positions(doc['link'], bits, hashes):
+                    pipe.setbit(self.building_key, position, 1)
+                pending += 1
+                added += 1
+                if pending >= self.rebuild_chunk_size:
+                    pipe.execute()
+                    pending = 0
+            if pending:
+                pipe.execute()
+
+            # Bitmap and meta change together, so readers never pair one with the other's parameters
+            swap = redis_client.pipeline(transaction=True)
+            swap.rename(self.building_key, self.key)
+            swap.hset(self.meta_key, mapping={
+                'bits': bits, 'hashes': hashes, 'count': added, 'built_at': time.time()
+            })
+            swap.hdel(self.meta_key, 'building_bits', 'building_hashes', 'watermark')
+            swap.execute()
+            logger.info(f"Known-link filter rebuilt with {added} links ({bits} bits, {hashes} hashes)")
+            return True
+        except Exception:
+            redis_client.hdel(self.meta_key, 'building_bits', 'building_hashes')
+            raise
+        finally:
+            redis_client.delete(self.lock_key)
+
+    def rebuild_in_background(self):
+        """Start a rebuild on a daemon thread; lookups use the Mongo fallback meanwhile."""
+        now = time.monotonic()
+        if self._last_rebuild_attempt and now - self._last_rebuild_attempt < self.rebuild_retry_seconds:
+            return
+        self._last_rebuild_attempt = now
+
+        def run():
+            try:
+                self.rebuild()
+            except Exception as e:
+                logger.error(f"Known-link filter rebuild failed: {str(e)}")
+
+        threading.Thread(target=run, name='known-link-filter-rebuild', daemon=True).start()
+
+
+known_link_filter = KnownLinkFilter(get_collection('articles'))
@@ -0,0 +1,186 @@
+"""
+Plain-text extraction for article bodies.
+
+Article text arrives either as a Quill delta (dict, list of ops or a JSON
+string of either) or as HTML. Delta ops are appended to a list and joined
+once; HTML is tokenized in one streaming pass by html.parser (which also
+decodes entities and lower-cases tag names), skipping invisible elements,
+keeping image alt text and breaking lines at block tags. Both stay linear in
+the size of the input. This is the single
+implementation behind articles.utils.article_utils and
+ai.services.ai_services.TextProcessingService.
+"""
+
+import json
+from html import unescape
+from html.parser import HTMLParser
+from typing import Dict, List
+
+# Tags whose content is never visible text
+SKIP_TAGS = frozenset({'script', 'style', 'head', 'noscript', 'template', 'svg'})
+
+# Tags that start a new line in the extracted text
+BLOCK_TAGS = frozenset({
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt',
+    'figcaption', 'figure', 'footer', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header',
+    'hr', 'li', 'main', 'nav', 'ol', 'p', 'pre', 'section', 'table', 'td', 'th',
+    'tr', 'ul',
+})
+
+# Quill embeds that carry readable text, keyed by embed type
+TEXT_EMBEDS = ('formula', 'mention', 'emoji', 'text')
+
+EXCERPT_LENGTH = 200
+
+
+class _TextExtractor(HTMLParser):
+    """Collects visible text; tag names arrive lower-cased, entities already decoded."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self.skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self.skip_depth += 1
+        elif self.skip_depth:
+            return
+        elif tag in BLOCK_TAGS:
+            self.parts.append('\n')
+        elif tag == 'img':
+            alt = dict(attrs).get('alt')
+            if alt:
+                self.parts.append(f' {alt} ')
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self.skip_depth = max(self.skip_depth - 1, 0)
+        elif not self.skip_depth and tag in BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_data(self, data):
+        if not self.skip_depth:
+            self.parts.append(data)
+
+
+def _collect_ops(ops, parts: List[str]):
+    """Append the text of delta ops to `parts`, descending into nested deltas inside embeds."""
+    for op in ops:
+        if not isinstance(op, dict):
+            continue
+        insert = op.get('insert')
+        if isinstance(insert, str):
+            parts.append(insert)
+        elif isinstance(insert, dict):
+            _collect_embed(insert, parts)
+
+
+def _collect_embed(embed: Dict, parts: List[str]):
+    for embed_type, value in embed.items():
+        if isinstance(value, dict) and 'ops' in value:
+            # Nested delta, e.g. table cells or custom block embeds
+            _collect_ops(value['ops'], parts)
+            parts.append('\n')
+        elif isinstance(value, list):
+            _collect_ops(value, parts)
+        elif embed_type in TEXT_EMBEDS:
+            if isinstance(value, dict):
+                value = value.get('value') or value.get('denotationChar', '') + value.get('text', '')
+            if isinstance(value, str):
+                parts.append(value)
+        elif embed_type == 'divider':
+            parts.append('\n')
+        # images, videos and other media carry no text
+
+
+def _delta_ops(delta):
+    if isinstance(delta, dict):
+        return delta.get('ops', [])
+    if isinstance(delta, list):
+        return delta
+    return None
+
+
+def _normalize(text: str) -> str:
+    """Collapse runs of whitespace inside lines and keep at most one blank line between paragraphs."""
+    lines = []
+    blank = False
+    for line in text.split('\n'):
+        line = ' '.join(line.split())
+        if not line:
+            blank = True
+            continue
+        if blank and lines:
+            lines.append('')
+        blank = False
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def delta_to_text(delta) -> str:
+    """Plain text of a Quill delta (dict with 'ops' or a list of ops)."""
+    parts = []
+    _collect_ops(_delta_ops(delta) or [], parts)
+    return ''.join(parts)
+
+
+def html_to_text(html: str) -> str:
+    """Visible text of an HTML fragment with block elements separated by newlines."""
+    if not html:
+        return ''
+    if '<' not in html:
+        return _normalize(unescape(html))
+    extractor = _TextExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return _normalize(''.join(extractor.parts))
+
+
+def extract_text(value) -> str:
+    """
+    Plain text of an article body in any supported shape: delta dict, list of
+    ops, JSON string of either, HTML string or plain string.
+    """
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return _normalize(delta_to_text(value))
+    if not isinstance(value, str):
+        return ''
+
+    stripped = value.lstrip()
+    if stripped[:1] in ('{', '['):
+        try:
+            ops = _delta_ops(json.loads(value))
+        except json.JSONDecodeError:
+            ops = None
+        if ops is not None:
+            parts = []
+            _collect_ops(ops, parts)
+            return _normalize(''.join(parts))
+    return html_to_text(value)
+
+
+def make_excerpt(text: str, length: int = EXCERPT_LENGTH) -> str:
+    """First `length` characters of `text`, cut back to a word boundary."""
+    text = ' '.join(text[:length * 2].split())
+    if len(text) <= length:
+        return text
+    cut = text.rfind(' ', 0, length)
+    return text[:cut if cut > 0 else length].rstrip() + '…'
+
+
+def count_words(text: str) -> int:
+    """Number of whitespace-separated words in `text`."""
+    return len(text.split())
+
+
+def extract_article_text(value) -> Dict:
+    """Cached text fields stored on article documents."""
+    cleaned_text = extract_text(value)
+    return {
+        'cleaned_text': cleaned_text,
+        'excerpt': make_excerpt(cleaned_text),
+        'word_count': count_words(cleaned_text),
+    }
@@ -25,15 +25,20 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
 from django.utils.decorators import method_decorator
+from celery.result import AsyncResult
 from articles.services.services import ArticleService, SaveService
+from articles.services.ingestion_services import ArticleIngestionService
+from articles.utils.fan_out_outbox import article_fan_out_outbox
+from articles.permissions import IsStaffOrIngestToken
 from articles.serializers.serializers import (
-    FilterLinksSerializer, ArticleListSerializer, ToggleLikeSerializer,
+    FilterLinksSerializer, IngestArticleSerializer, ArticleListSerializer, ToggleLikeSerializer,
     ArticleDetailSerializer, CreateArticleSerializer, UpdateArticleSerializer,
     TrackReadSerializer, UploadImageSerializer, CreateSaveDirectorySerializer,
     SaveDirectorySerializer, ToggleSaveSerializer, SavedItemSerializer,
     CheckSavedSerializer, UpdateSaveDirectorySerializer, TimeBasedArticleSerializer
 )
 from articles.utils.article_utils import get_absolute_img_cover_url
+from search.utils.vector_index import parse_since
 
 logger = logging.getLogger(__name__)
 channel_layer = get_channel_layer()
@@ -41,6 +46,7 @@ channel_layer = get_channel_layer()
 # Initialize services
 article_service = ArticleService()
 save_service = SaveService()
+ingestion_service = ArticleIngestionService()
 
 class FilterLinksAPIView(APIView):
     @method_decorator(csrf_exempt)
@@ -75,12 +81,89 @@ class FilterLinksAPIView(APIView):
                 'message': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+class IngestArticlesAPIView(APIView):
+    """
+    Crawler ingestion endpoint. Accepts an NDJSON body (one article per line),
+    dedups against stored links, embeds new items in batches and upserts them.
+    """
+    permission_classes = [IsStaffOrIngestToken]
+
+    @method_decorator(csrf_exempt)
+    def post(self, request):
+        try:
+            results = []
+            pending = []
+            pending_lines = []
+
+            def flush():
+                outcomes = ingestion_service.ingest(pending)
+                for line_number, outcome in zip(pending_lines, outcomes):
+                    results.append({'line': line_number, **outcome})
+                pending.clear()
+                pending_lines.clear()
+
+            for line_number, raw_line in enumerate(request.stream or [], start=1):
+                raw_line = raw_line.strip()
+                if not raw_line:
+                    continue
+
+                try:
+                    item = json.loads(raw_line)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    results.append({'line': line_number, 'status': 'invalid', 'error': 'Invalid JSON line'})
+                    continue
+
+                serializer = IngestArticleSerializer(data=item)
+                if not serializer.is_valid():
+                    results.append({
+                        'line': line_number,
+                        'link': item.get('link') if isinstance(item, dict) else None,
+                        'status': 'invalid',
+                        'error': serializer.errors
+                    })
+                    continue
+
+                pending.append(serializer.validated_data)
+                pending_lines.append(line_number)
+                if len(pending) >= settings.INGEST_BATCH_SIZE:
+                    flush()
+
+            if pending:
+                flush()
+
+            results.sort(key=lambda r: r['line'])
+            summary = {}
+            for result in results:
+                summary[result['status']] = summary.get(result['status'], 0) + 1
+
+            return Response({
+                'status': 'success',
+                'summary': summary,
+                'results': results
+            })
+        except Exception as e:
+            logger.error(f"Error in ingest_articles: {str(e)}")
+            return Response({
+                'status': 'error',
+                'message': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 class RecommendedArticlesListAPIView(APIView):
     permission_classes = [IsAuthenticated]
     @method_decorator(csrf_exempt)
     def get(self, request):
         try:
-            articles = article_service.get_recommended_articles(user_id=request.user.id)
+            category = request.query_params.get('category') or None
+            try:
+                since = parse_since(request.query_params.get('since'))
+            except ValueError:
+                return Response({
+                    'status': 'error',
+                    'message': 'since must be an ISO date or datetime'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            articles = article_service.get_recommended_articles(
+                user_id=request.user.id, category=category, since=since
+            )
             serializer = ArticleListSerializer(articles, many=True)
             return Response({
                 'status': 'success',
@@ -273,6 +356,43 @@ class DeleteArticleAPIView(APIView):
                 'message': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+class ArticleNotificationFanOutAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, task_id):
+        """
+        پیشرفت ارسال اعلان مقاله جدید به دنبال‌کنندگان (notification_task_id پاسخ ساخت مقاله).
+        """
+        queued = article_fan_out_outbox.pending(task_id)
+        if queued is not None:
+            if queued['author_id'] != request.user.id:
+                return Response({
+                    'status': 'error',
+                    'message': 'Task not found'
+                }, status=status.HTTP_404_NOT_FOUND)
+            return Response({
+                'status': 'success',
+                'state': 'QUEUED',
+                'written': 0,
+                'total': None
+            }, status=status.HTTP_200_OK)
+
+        result = AsyncResult(task_id)
+        info = result.info if isinstance(result.info, dict) else {}
+        # Unknown, not yet started and other authors' tasks all look the same
+        if info.get('author_id') != request.user.id:
+            return Response({
+                'status': 'error',
+                'message': 'Task not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({
+            'status': 'success',
+            'state': result.state,
+            'written': info.get('written', 0),
+            'total': info.get('total')
+        }, status=status.HTTP_200_OK)
+
 class TrackArticleReadAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -0,0 +1,76 @@
+"""
+Throughput benchmark for SimHash near-duplicate detection.
+
+Measures fingerprinting and band-lookup speed in documents per second on a
+synthetic corpus, and reports how many lightly edited copies are caught.
+
+    python benchmarks/bench_simhash.py --docs 5000 --words 800
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.utils.simhash import simhash, simhash_bands, simhash_probe_bands, hamming_distance  # noqa: E402
+
+
+def make_corpus(docs, words, vocabulary_size, seed):
+    rng = random.Random(seed)
+    vocabulary = [f'w{i}' for i in range(vocabulary_size)]
+    return [' '.join(rng.choices(vocabulary, k=words)) for _ in range(docs)]
+
+
+def perturb(text, edits, rng):
+    tokens = text.split()
+    for _ in range(edits):
+        tokens[rng.randrange(len(tokens))] = f'edit{rng.randrange(1000)}'
+    return ' '.join(tokens)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--docs', type=int, default=5000)
+    parser.add_argument('--words', type=int, default=800)
+    parser.add_argument('--vocabulary', type=int, default=20000)
+    parser.add_argument('--edits', type=int, default=3)
+    parser.add_argument('--max-distance', type=int, default=6)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus = make_corpus(args.docs, args.words, args.vocabulary, args.seed)
+
+    start = time.perf_counter()
+    fingerprints = [simhash(text) for text in corpus]
+    fingerprint_seconds = time.perf_counter() - start
+
+    index = {}
+    for doc_id, fp in enumerate(fingerprints):
+        for band in simhash_bands(fp):
+            index.setdefault(band, []).append((doc_id, fp))
+
+    copies = [perturb(text, args.edits, rng) for text in corpus]
+    start = time.perf_counter()
+    detected = 0
+    for doc_id, text in enumerate(copies):
+        fp = simhash(text)
+        found = any(
+            hamming_distance(fp, stored_fp) <= args.max_distance
+            for band in simhash_probe_bands(fp, args.max_distance)
+            for _, stored_fp in index.get(band, [])
+        )
+        detected += found
+    detect_seconds = time.perf_counter() - start
+
+    print(f"documents:            {args.docs} x {args.words} words")
+    print(f"fingerprint:          {args.docs / fingerprint_seconds:,.0f} docs/s")
+    print(f"fingerprint + lookup: {args.docs / detect_seconds:,.0f} docs/s")
+    print(f"near-duplicates caught ({args.edits} word edits): {detected}/{args.docs}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Microbenchmark for article text extraction on large inputs.
+
+Builds a Quill delta and an HTML document of roughly --size bytes and times
+the shared extractor against the previous string-concatenation / regex
+implementation.
+
+    python benchmarks/bench_text_extraction.py --size 1048576 --repeat 5
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from articles.utils.text_extraction import extract_article_text, extract_text  # noqa: E402
+
+
+def legacy_delta_to_plain_text(delta):
+    text = ""
+    ops = delta.get("ops", []) if isinstance(delta, dict) else delta
+    for op in ops:
+        insert = op.get("insert", "")
+        if isinstance(insert, str):
+            text += insert
+    return text
+
+
+def legacy_extract(value):
+    try:
+        return legacy_delta_to_plain_text(json.loads(value))
+    except json.JSONDecodeError:
+        return re.sub(r'<[^>]+>', '', value).strip()
+
+
+def make_words(rng, count):
+    return ' '.join(rng.choice(('news', 'model', 'release', 'chip', 'data', 'server', 'open', 'source'))
+                    for _ in range(count))
+
+
+def make_delta(size, rng):
+    # Many small ops, like a heavily formatted editor document
+    ops = []
+    length = 0
+    while length < size:
+        if rng.random() < 0.02:
+            ops.append({'insert': {'image': 'https://example.com/img.png'}})
+        elif rng.random() < 0.01:
+            ops.append({'insert': {'formula': 'x^2'}})
+        else:
+            text = make_words(rng, rng.randint(1, 6)) + ' '
+            ops.append({'insert': text, 'attributes': {'bold': True}} if rng.random() < 0.3 else {'insert': text})
+            if rng.random() < 0.05:
+                ops.append({'insert': '\n'})
+        length += 30
+    return json.dumps({'ops': ops})
+
+
+def make_html(size, rng):
+    parts = []
+    length = 0
+    while length < size:
+        paragraph = '<p>' + ' '.join(
+            f'<b>{make_words(rng, 3)}</b>' if rng.random() < 0.3 else make_words(rng, 5)
+            for _ in range(10)
+        ) + '</p>'
+        parts.append(paragraph)
+        length += len(paragraph)
+    return '<article>' + ''.join(parts) + '</article>'
+
+
+def best_of(func, value, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(value)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=1024 * 1024)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    inputs = {'delta': make_delta(args.size, rng), 'html': make_html(args.size, rng)}
+
+    for name, value in inputs.items():
+        mb = len(value.encode('utf-8')) / (1024 * 1024)
+        legacy = best_of(legacy_extract, value, args.repeat)
+        shared = best_of(extract_text, value, args.repeat)
+        cached = best_of(extract_article_text, value, args.repeat)
+        print(f"{name:5} {mb:.2f} MB  legacy {legacy * 1000:8.1f} ms  "
+              f"extract_text {shared * 1000:8.1f} ms ({mb / shared:.1f} MB/s)  "
+              f"with excerpt+word_count {cached * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
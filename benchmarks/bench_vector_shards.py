@@ -0,0 +1,191 @@
+"""
+Throughput benchmark for sharded scatter-gather vector search.
+
+Measures a single-threaded baseline first: the whole synthetic corpus in one
+in-process ArticleVectorIndex with FAISS limited to one thread, searched by
+the same client threads. Then starts 1, 2, 4, ... shard worker processes
+(also one FAISS thread each) over the same corpus (no Mongo or Redis needed),
+drives them through ShardedVectorIndex and reports queries per second,
+speedup over the baseline, latency percentiles and how many replies were
+partial (a shard missed the timeout). On a box with at least as many cores
+as shards, throughput should grow close to linearly with the shard count;
+with fewer cores the processes only share them.
+
+--rebuild-every N makes every shard rebuild its index in the background every
+N seconds during the run, to check that queries keep being served from the
+old snapshot within --timeout instead of returning partial results.
+
+    python benchmarks/bench_vector_shards.py --articles 200000 --dim 384 --max-shards 8
+    python benchmarks/bench_vector_shards.py --max-shards 4 --rebuild-every 2 --timeout 2
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from django.conf import settings  # noqa: E402
+
+if not settings.configured:
+    settings.configure(SEARCH_SHARDS=0, SEARCH_INDEX_REFRESH_INTERVAL=1.0)
+
+import faiss  # noqa: E402
+import multiprocessing  # noqa: E402
+import numpy as np  # noqa: E402
+
+from search.utils.shards import ShardServer, ShardedVectorIndex  # noqa: E402
+from search.utils.vector_index import ArticleVectorIndex, shard_of  # noqa: E402
+
+AUTHKEY = b'bench'
+CATEGORIES = ('ai', 'web', 'security', 'mobile')
+
+
+class SyntheticIndex(ArticleVectorIndex):
+    """ArticleVectorIndex over seeded random vectors, built once."""
+
+    def __init__(self, articles, dim, seed, shard=None):
+        super().__init__(shard=shard)
+        self.articles = articles
+        self.dim = dim
+        self.seed = seed
+
+    def _load_records(self, ids_by_collection=None):
+        rng = np.random.default_rng(self.seed)
+        vectors = rng.standard_normal((self.articles, self.dim), dtype=np.float32)
+        for i in range(self.articles):
+            article_id = f'{i:024x}'
+            if self.shard and shard_of(article_id, self.shard[1]) != self.shard[0]:
+                continue
+            yield float(i), vectors[i], {
+                'article_id': article_id, 'title': None, 'category': CATEGORIES[i % len(CATEGORIES)],
+                'imgCover': '', 'createdAt': None, 'userId': None
+            }
+
+    def _build(self, generation, sequence):
+        # No Redis here: every snapshot is generation 0, so only real timeouts count as partial
+        return super()._build(0, 0)
+
+    def refresh(self):
+        # No change log here; rebuilds only come from rebuild_in_background
+        if self._snapshot is None:
+            self._snapshot = self._build(0, 0)
+        return self._snapshot.cache_generation
+
+
+def serve(number, count, address, articles, dim, seed, rebuild_every):
+    # One FAISS thread per worker so scaling comes from the processes
+    faiss.omp_set_num_threads(1)
+    index = SyntheticIndex(articles, dim, seed, shard=(number, count))
+    if rebuild_every:
+        def rebuild():
+            while True:
+                time.sleep(rebuild_every)
+                index.rebuild_in_background()
+
+        threading.Thread(target=rebuild, daemon=True).start()
+    ShardServer({'articles': index}, address, AUTHKEY).serve_forever()
+
+
+def wait_for(addresses, timeout=600):
+    deadline = time.monotonic() + timeout
+    while not all(os.path.exists(address) for address in addresses):
+        if time.monotonic() > deadline:
+            raise RuntimeError("shard workers did not start")
+        time.sleep(0.1)
+
+
+def drive(search, args, queries):
+    """Run `search` from --clients threads for --seconds; (qps, latencies, partial replies)."""
+    search(queries[0])  # connect and warm up
+    latencies = [[] for _ in range(args.clients)]
+    partial = [0] * args.clients
+    stop = time.perf_counter() + args.seconds
+
+    def worker(slot):
+        i = slot
+        while time.perf_counter() < stop:
+            started = time.perf_counter()
+            generation, _ = search(queries[i % len(queries)])
+            latencies[slot].append(time.perf_counter() - started)
+            partial[slot] += generation is None
+            i += args.clients
+
+    threads = [threading.Thread(target=worker, args=(slot,)) for slot in range(args.clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    latencies = np.array([latency for slot in latencies for latency in slot])
+    return len(latencies) / elapsed, latencies, sum(partial)
+
+
+def run_baseline(args, queries):
+    faiss.omp_set_num_threads(1)
+    index = SyntheticIndex(args.articles, args.dim, args.seed)
+    index.refresh()
+    return drive(lambda query: index.search(query, args.k, -1.0), args, queries)
+
+
+def run(shards, args, queries):
+    socket_dir = tempfile.mkdtemp(prefix='bench-shards-')
+    addresses = ShardedVectorIndex.socket_paths(socket_dir, shards)
+    context = multiprocessing.get_context('spawn')
+    processes = [
+        context.Process(
+            target=serve, daemon=True,
+            args=(n, shards, addresses[n], args.articles, args.dim, args.seed, args.rebuild_every)
+        )
+        for n in range(shards)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        wait_for(addresses)
+        client = ShardedVectorIndex('articles', addresses, AUTHKEY, timeout=args.timeout)
+        return drive(lambda query: client.search(query, args.k, -1.0), args, queries)
+    finally:
+        for process in processes:
+            process.terminate()
+
+
+def report(label, result, baseline_qps):
+    qps, latencies, partial = result
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    print(f"{label:<22s} qps={qps:9.1f} speedup={qps / baseline_qps:5.2f}x "
+          f"p50_ms={p50:7.1f} p99_ms={p99:7.1f} max_ms={latencies.max() * 1000:7.1f} partial={partial}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--articles', type=int, default=100000)
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--k', type=int, default=20)
+    parser.add_argument('--max-shards', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--timeout', type=float, default=2.0, help="Per-query shard timeout (SEARCH_SHARD_TIMEOUT)")
+    parser.add_argument('--rebuild-every', type=float, default=0, help="Background rebuild interval in the shards")
+    args = parser.parse_args()
+
+    queries = np.random.default_rng(args.seed + 1).standard_normal((256, args.dim), dtype=np.float32)
+    print(f"articles={args.articles} dim={args.dim} k={args.k} clients={args.clients} cores={os.cpu_count()} "
+          f"timeout={args.timeout} rebuild_every={args.rebuild_every or '-'}")
+
+    baseline = run_baseline(args, queries)
+    report("in-process 1 thread", baseline, baseline[0])
+
+    shards = 1
+    while shards <= args.max_shards:
+        report(f"shards={shards}", run(shards, args, queries), baseline[0])
+        shards *= 2
+
+
+if __name__ == '__main__':
+    main()
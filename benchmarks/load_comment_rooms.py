@@ -0,0 +1,159 @@
+"""
+Load test for comment room fan-out over a local Redis channel layer.
+
+Opens --sockets sockets in one article room (channels WebsocketCommunicator,
+channels_redis against REDIS_HOST/REDIS_PORT from settings), fires a burst
+of --events comment events at the room and waits until every socket is up
+to date. The sockets use RoomEventOutbox, the writer CommentsConsumer is
+built on, without its Mongo-backed first page; Django is not set up, so
+only Redis is needed. It runs the burst twice:
+
+  direct   one chat_message group_send per event (the old send_to_group)
+  batched  events queued with RoomEventBatcher.queue and, per --window,
+           drained and sent as one chat_batch; an in-process timer stands
+           in for the flush_room_events countdown task
+
+and reports group_sends, Redis commands, frames delivered per socket and
+wall time. A --slow fraction of sockets write with --slow-delay per frame;
+with batching they receive collapsed batches (or a resync) instead of
+falling behind by one frame per event.
+
+    python benchmarks/load_comment_rooms.py --sockets 1000 --events 500 --window 0.25
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'iTech.settings')
+
+from bson import ObjectId  # noqa: E402
+from channels.generic.websocket import AsyncWebsocketConsumer  # noqa: E402
+from channels.layers import get_channel_layer  # noqa: E402
+from channels.testing import WebsocketCommunicator  # noqa: E402
+
+from comments.utils.room_events import RoomEventOutbox, room_event_batcher  # noqa: E402
+from config.redis_utils import get_redis_client  # noqa: E402
+
+
+class RoomConsumer(RoomEventOutbox, AsyncWebsocketConsumer):
+    """CommentsConsumer's room side without the Mongo-backed initial page."""
+
+    async def chat_message(self, event):
+        await self.send(text_data=json.dumps(event["message"]))
+
+    async def disconnect(self, close_code):
+        self.writer.cancel()
+        await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def connect(self):
+        self.article_id = self.scope["query_string"].decode().split("=", 1)[1]
+        self.group_name = f"chat_{self.article_id}"
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+        self.writer = asyncio.ensure_future(self.write_events())
+
+
+class SlowRoomConsumer(RoomConsumer):
+    delay = 0.05
+
+    async def send(self, *args, **kwargs):
+        await asyncio.sleep(self.delay)
+        await super().send(*args, **kwargs)
+
+
+def redis_commands():
+    return get_redis_client().info('stats')['total_commands_processed']
+
+
+def comment_event(i):
+    return {"type": "comment_updated" if i % 3 else "comment_created",
+            "comment": {"_id": f"c{i // 3}", "message": f"message {i}"}}
+
+
+async def open_sockets(article_id, count, slow):
+    sockets = []
+    for i in range(count):
+        consumer = SlowRoomConsumer if i < slow else RoomConsumer
+        communicator = WebsocketCommunicator(consumer.as_asgi(), f'/ws/comments/?article_id={article_id}')
+        connected, _ = await communicator.connect()
+        if not connected:
+            raise RuntimeError("consumer refused the connection")
+        sockets.append(communicator)
+    return sockets
+
+
+async def drain(communicator, quiet):
+    """Frames received until the socket stays silent for `quiet` seconds."""
+    frames = 0
+    while True:
+        try:
+            await communicator.receive_from(timeout=quiet)
+        except asyncio.TimeoutError:
+            return frames
+        frames += 1
+
+
+async def burst(mode, args, sockets, article_id):
+    layer = get_channel_layer()
+    events = [comment_event(i) for i in range(args.events)]
+    commands_before, sends = redis_commands(), 0
+    started = time.perf_counter()
+
+    if mode == 'direct':
+        for event in events:
+            await layer.group_send(f"chat_{article_id}", {"type": "chat_message", "message": event})
+            sends += 1
+            await asyncio.sleep(args.interval)
+    else:
+        loop, flushes = asyncio.get_running_loop(), []
+
+        async def flush():
+            nonlocal sends
+            await asyncio.sleep(args.window)
+            events = await asyncio.to_thread(room_event_batcher.drain, article_id)
+            if events:
+                await layer.group_send(f"chat_{article_id}", {"type": "chat_batch", "events": events})
+                sends += 1
+
+        for event in events:
+            if await asyncio.to_thread(room_event_batcher.queue, article_id, event, args.window):
+                flushes.append(loop.create_task(flush()))
+            await asyncio.sleep(args.interval)
+        await asyncio.gather(*flushes)
+
+    frames = await asyncio.gather(*(drain(communicator, args.quiet) for communicator in sockets))
+    elapsed = time.perf_counter() - started - args.quiet
+    fast, slow = frames[args.slow:], frames[:args.slow]
+    print(f"{mode:<8s} group_sends={sends:<5d} redis_commands={redis_commands() - commands_before:<7d} "
+          f"frames/socket={sum(fast) / max(len(fast), 1):7.1f} slow_frames/socket={sum(slow) / max(len(slow), 1):7.1f} "
+          f"seconds={elapsed:6.2f}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sockets', type=int, default=200)
+    parser.add_argument('--events', type=int, default=300)
+    parser.add_argument('--interval', type=float, default=0.002, help="Seconds between events in the burst")
+    parser.add_argument('--window', type=float, default=0.25)
+    parser.add_argument('--slow', type=int, default=10, help="How many of the sockets are slow writers")
+    parser.add_argument('--slow-delay', type=float, default=0.05)
+    parser.add_argument('--quiet', type=float, default=2.0, help="Silence that marks a socket as caught up")
+    args = parser.parse_args()
+    SlowRoomConsumer.delay = args.slow_delay
+
+    for mode in ('direct', 'batched'):
+        article_id = str(ObjectId())
+        sockets = await open_sockets(article_id, args.sockets, args.slow)
+        try:
+            await burst(mode, args, sockets, article_id)
+        finally:
+            await asyncio.gather(*(communicator.disconnect() for communicator in sockets))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
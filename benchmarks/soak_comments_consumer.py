@@ -0,0 +1,104 @@
+"""
+Soak test for CommentsConsumer connection handling.
+
+Opens increasing numbers of concurrent `ws/comments/` sockets in-process
+(channels WebsocketCommunicator, in-memory channel layer) against the real
+MongoDB from settings, and after each step prints the process thread count
+and mongod's current connection count. Both should stay flat as sockets
+grow: every consumer shares the per-loop async client from
+config.mongo_utils instead of opening its own MongoClient.
+
+It exits non-zero when mongod connections grow by more than
+--max-connection-growth or threads by more than --max-thread-growth over the
+run, so it can gate a deployment. It needs a reachable mongod at MONGODB_URI
+and checks for one before Django starts (app startup connects to Mongo).
+
+    python benchmarks/soak_comments_consumer.py --steps 10 100 500 1000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'iTech.settings')
+
+import django  # noqa: E402
+import pymongo  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+
+def require_mongod():
+    client = pymongo.MongoClient(settings.MONGODB_URI, directConnection=True, serverSelectionTimeoutMS=3000)
+    try:
+        client.admin.command('ping')
+    except pymongo.errors.PyMongoError as e:
+        sys.exit(f"soak test needs a running mongod at {settings.MONGODB_URI}: {e}")
+    finally:
+        client.close()
+
+
+require_mongod()
+django.setup()
+
+from bson import ObjectId  # noqa: E402
+from channels.testing import WebsocketCommunicator  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+
+from comments.consumers.consumers import CommentsConsumer  # noqa: E402
+from config.mongo_utils import get_async_mongo_client  # noqa: E402
+
+settings.CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+async def mongod_connections():
+    status = await get_async_mongo_client().admin.command('serverStatus')
+    return status['connections']['current']
+
+
+async def open_socket(article_id, user):
+    communicator = WebsocketCommunicator(CommentsConsumer.as_asgi(), f'/ws/comments/?article_id={article_id}')
+    communicator.scope['user'] = user
+    connected, _ = await communicator.connect()
+    if not connected:
+        raise RuntimeError("consumer refused the connection")
+    await communicator.receive_json_from(timeout=30)  # comments_list
+    return communicator
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--steps', type=int, nargs='+', default=[10, 100, 500, 1000])
+    parser.add_argument('--article-id', default=str(ObjectId()),
+                        help="Article whose comments are loaded (default: a fresh id with no comments)")
+    parser.add_argument('--max-connection-growth', type=int, default=10)
+    parser.add_argument('--max-thread-growth', type=int, default=10)
+    args = parser.parse_args()
+
+    user = User(id=1, username='soak')
+    baseline_connections = await mongod_connections()
+    baseline_threads = threading.active_count()
+    print(f"baseline threads={baseline_threads} mongod_connections={baseline_connections}")
+
+    sockets = []
+    for target in args.steps:
+        while len(sockets) < target:
+            batch = min(100, target - len(sockets))
+            sockets.extend(await asyncio.gather(*(open_socket(args.article_id, user) for _ in range(batch))))
+        print(f"sockets={len(sockets):<6d} threads={threading.active_count():<4d} "
+              f"mongod_connections={await mongod_connections()}")
+
+    connection_growth = await mongod_connections() - baseline_connections
+    thread_growth = threading.active_count() - baseline_threads
+    await asyncio.gather(*(communicator.disconnect() for communicator in sockets))
+
+    print(f"growth threads={thread_growth} mongod_connections={connection_growth}")
+    if connection_growth > args.max_connection_growth or thread_growth > args.max_thread_growth:
+        sys.exit("FAIL: resources grow with the number of sockets")
+    print("OK")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
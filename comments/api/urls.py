@@ -4,6 +4,9 @@ from ..views.comment_views import (
     UpdateCommentView,
     DeleteCommentView,
     SeenCommentsView,
+    ListCommentsView,
+    ListRepliesView,
+    CommentThreadView,
 )
 
 urlpatterns = [
@@ -11,4 +14,7 @@ urlpatterns = [
     path('update/<str:comment_id>/', UpdateCommentView.as_view(), name='update-comment'),
     path('delete/<str:comment_id>/', DeleteCommentView.as_view(), name='delete-comment'),
     path('seen/', SeenCommentsView.as_view(), name='seen-comments'),
+    path('list/', ListCommentsView.as_view(), name='list-comments'),
+    path('replies/<str:comment_id>/', ListRepliesView.as_view(), name='list-comment-replies'),
+    path('thread/<str:root_id>/', CommentThreadView.as_view(), name='comment-thread'),
 ]
\ No newline at end of file
@@ -1,23 +1,19 @@
+import asyncio
 import json
 import logging
 from channels.generic.websocket import AsyncWebsocketConsumer
 from django.contrib.auth.models import AnonymousUser
 from urllib.parse import parse_qs
-from comments.consumers.services.consumer_services import (
-    send_initial_comments,
-    close_mongo_connection,
-)
+from comments.consumers.services.consumer_services import send_initial_comments, load_comments, load_replies, load_thread
+from comments.utils.room_events import RoomEventOutbox
 
 logger = logging.getLogger(__name__)
 
-class CommentsConsumer(AsyncWebsocketConsumer):
+class CommentsConsumer(RoomEventOutbox, AsyncWebsocketConsumer):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.article_id = None
-        self.mongo_client = None
-        self.db = None
-        self.comments_collection = None
         self.user = None
         self.group_name = None
 
@@ -49,27 +45,41 @@ class CommentsConsumer(AsyncWebsocketConsumer):
 
         await self.accept()
         await send_initial_comments(self)
+        self.writer = asyncio.ensure_future(self.write_events())
 
     async def disconnect(self, close_code):
         """
         Handle WebSocket disconnection.
         Remove user from group.
         """
+        if self.writer:
+            self.writer.cancel()
         if self.group_name:
             await self.channel_layer.group_discard(
                 self.group_name,
                 self.channel_name
             )
 
-        if self.mongo_client:
-            close_mongo_connection(self.mongo_client)
-
     async def receive(self, text_data):
         """
         Handle messages received from WebSocket.
-        This is a read-only consumer, so we don't process any incoming messages.
+        Comments are written over REST; the socket only serves further
+        pages: load_comments (older top-level comments), load_replies and
+        load_thread.
         """
-        pass
+        try:
+            data = json.loads(text_data)
+        except (TypeError, json.JSONDecodeError):
+            return
+
+        if not isinstance(data, dict):
+            return
+        if data.get("type") == "load_comments":
+            await load_comments(self, data)
+        elif data.get("type") == "load_replies":
+            await load_replies(self, data)
+        elif data.get("type") == "load_thread":
+            await load_thread(self, data)
 
     async def chat_message(self, event):
         """
@@ -1,128 +1,85 @@
 import json
 import logging
-from django.conf import settings
-from bson import ObjectId
-import pymongo
-from django.contrib.auth.models import User
-from profiles.models import Profile
+from bson.errors import InvalidId
 from channels.db import database_sync_to_async
+from iTech import settings
+from comments.repositories import async_comment_repository
+from comments.services import comment_services
+from comments.services.comment_services import build_comment, missing_parent_ids, parent_summaries, page_size
 
 logger = logging.getLogger(__name__)
 
-def connect_to_mongo():
-    """
-    Connect to MongoDB.
-    """
-    try:
-        mongo_client = pymongo.MongoClient(settings.MONGODB_URI)
-        db_name = settings.MONGODB_URI.split('/')[-1].split('?')[0]
-        db = mongo_client[db_name]
-        comments_collection = db["comments"]
-        logger.info(f"Connected to MongoDB database: {db_name}")
-        return mongo_client, db, comments_collection
-    except Exception as e:
-        logger.error(f"Error connecting to MongoDB: {str(e)}")
-        return None, None, None
+get_users_info = database_sync_to_async(comment_services.get_users_info)
 
-def close_mongo_connection(mongo_client):
+async def format_comments(comments, with_reply_counts=False):
     """
-    Close MongoDB connection.
+    Format a list of comments for WebSocket with one parent query, one user
+    query and, for comments without a stored reply_count, one aggregation.
     """
-    if mongo_client:
-        mongo_client.close()
-
-@database_sync_to_async
-def get_user_info(user_id):
-    """Get user information (first name, last name, profile picture)"""
-    try:
-        user = User.objects.get(id=user_id)
-        try:
-            profile = Profile.objects.get(user=user)
-            profile_picture = profile.profile_picture.url if profile.profile_picture else None
-            return {
-                "first_name": profile.first_name or user.first_name,
-                "last_name": profile.last_name or user.last_name,
-                "profile_picture": profile_picture,
-                "username": user.username
-            }
-        except Profile.DoesNotExist:
-            return {
-                "first_name": user.first_name,
-                "last_name": user.last_name,
-                "profile_picture": None,
-                "username": user.username
-            }
-    except User.DoesNotExist:
-        return {
-            "first_name": "",
-            "last_name": "",
-            "profile_picture": None
-        }
-
-async def format_comment(comment, comments_collection):
-    """
-    Format comment for WebSocket.
-    """
-    comment["_id"] = str(comment["_id"])
-    comment["article_id"] = str(comment["article_id"])
-
-    user_id = comment["user_id"]
-    user_info = await get_user_info(user_id)
-    comment["user_info"] = user_info
-    comment["user_id"] = str(user_id)
-
-    if "seen" not in comment:
-        comment["seen"] = False
-
-    if comment.get("reply_to"):
-        reply_to_id = comment["reply_to"]
-        try:
-            parent_comment = comments_collection.find_one({"_id": reply_to_id})
-            if parent_comment:
-                parent_user_id = parent_comment["user_id"]
-                parent_user_info = await get_user_info(parent_user_id)
-                comment["reply_to"] = {
-                    "_id": str(reply_to_id),
-                    "message": parent_comment["message"],
-                    "user_id": str(parent_user_id),
-                    "user_info": parent_user_info
-                }
-            else:
-                comment["reply_to"] = str(reply_to_id)
-        except Exception as e:
-            logger.error(f"Error getting parent comment: {str(e)}")
-            comment["reply_to"] = str(reply_to_id)
-
-    if "created_at" in comment and comment["created_at"]:
-        comment["created_at"] = comment["created_at"].isoformat()
+    parents = parent_summaries(comments, await async_comment_repository.get_many(missing_parent_ids(comments)))
+    user_infos = await get_users_info(
+        [c["user_id"] for c in comments] + [parent["user_id"] for parent in parents.values()]
+    )
+    reply_counts = None
+    if with_reply_counts:
+        reply_counts = await async_comment_repository.reply_counts(
+            [c["_id"] for c in comments if "reply_count" not in c]
+        )
+    return [build_comment(comment, parents, user_infos, reply_counts) for comment in comments]
 
-    return comment
+async def send_comments_page(consumer, message_type, cursor=None):
+    """Send one page of the newest top-level comments (with reply counts) and the cursor for the next."""
+    comments, next_cursor = await async_comment_repository.page_top_level(
+        consumer.article_id, settings.COMMENTS_PAGE_SIZE, cursor
+    )
+    formatted_comments = await format_comments(comments, with_reply_counts=True)
+    await consumer.send(text_data=json.dumps({
+        "type": message_type,
+        "comments": formatted_comments,
+        "next_cursor": next_cursor
+    }))
+    return formatted_comments
 
 async def send_initial_comments(consumer):
     """
-    Send initial comments to client.
+    Send initial comments to client: the newest page of top-level comments.
+    Older pages and reply threads are requested with load_comments / load_replies.
     """
-    mongo_client, db, comments_collection = connect_to_mongo()
-    if not mongo_client:
+    try:
+        formatted_comments = await send_comments_page(consumer, "comments_list")
+        logger.info(f"Sent {len(formatted_comments)} comments to client for article {consumer.article_id}")
+    except Exception as e:
+        logger.error(f"Error sending initial comments: {str(e)}")
         await consumer.close()
-        return
 
-    consumer.mongo_client = mongo_client
-    consumer.db = db
-    consumer.comments_collection = comments_collection
+async def send_error(consumer, message):
+    await consumer.send(text_data=json.dumps({"type": "error", "message": message}))
 
+async def load_comments(consumer, data):
+    """Handle {"type": "load_comments", "cursor": ...}: the next page of top-level comments."""
     try:
-        comments = list(consumer.comments_collection.find({"article_id": ObjectId(consumer.article_id)}))
-        formatted_comments = []
-        for comment in comments:
-            formatted_comment = await format_comment(comment, consumer.comments_collection)
-            formatted_comments.append(formatted_comment)
+        await send_comments_page(consumer, "comments_page", data.get("cursor"))
+    except (InvalidId, ValueError):
+        await send_error(consumer, "Invalid cursor")
 
-        await consumer.send(text_data=json.dumps({
-            "type": "comments_list",
-            "comments": formatted_comments
-        }))
-        logger.info(f"Sent {len(formatted_comments)} comments to client for article {consumer.article_id}")
-    except Exception as e:
-        logger.error(f"Error sending initial comments: {str(e)}")
-        await consumer.close()
\ No newline at end of file
+async def send_thread_page(consumer, data, message_type, fetch):
+    comment_id = data.get("comment_id")
+    try:
+        comments, next_cursor = await fetch(comment_id, page_size(data.get("limit")), data.get("cursor"))
+    except (InvalidId, TypeError, ValueError):
+        await send_error(consumer, "Invalid comment_id or cursor")
+        return
+    await consumer.send(text_data=json.dumps({
+        "type": message_type,
+        "comment_id": comment_id,
+        "comments": await format_comments(comments, with_reply_counts=True),
+        "next_cursor": next_cursor
+    }))
+
+async def load_replies(consumer, data):
+    """Handle {"type": "load_replies", "comment_id": ..., "cursor": ..., "limit": ...}: direct replies."""
+    await send_thread_page(consumer, data, "replies_page", async_comment_repository.page_replies)
+
+async def load_thread(consumer, data):
+    """Handle {"type": "load_thread", "comment_id": <top-level id>, ...}: every nested reply, one query per page."""
+    await send_thread_page(consumer, data, "thread_page", async_comment_repository.page_thread)
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from pymongo import UpdateOne
+
+from comments.services.comment_services import ARTICLE_COLLECTIONS
+from config.mongo_utils import get_collection
+
+
+class Command(BaseCommand):
+    help = "Set comment_count on articles written before it was maintained"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--all', action='store_true',
+                            help="Recount every article, not only those without comment_count")
+
+    def handle(self, *args, **options):
+        # Run once before serving traffic with the $inc-only counter: a comment
+        # written between the count and the $set below is otherwise lost
+        counts = {
+            row['_id']: row['count']
+            for row in get_collection('comments').aggregate([
+                {'$group': {'_id': '$article_id', 'count': {'$sum': 1}}}
+            ])
+        }
+        query = {} if options['all'] else {'comment_count': {'$exists': False}}
+        updated = 0
+        for name in ARTICLE_COLLECTIONS:
+            collection = get_collection(name)
+            operations = [
+                UpdateOne({'_id': article['_id']}, {'$set': {'comment_count': counts.get(article['_id'], 0)}})
+                for article in collection.find(query, {'_id': 1})
+            ]
+            for start in range(0, len(operations), options['batch_size']):
+                collection.bulk_write(operations[start:start + options['batch_size']], ordered=False)
+            updated += len(operations)
+        self.stdout.write(f"Updated {updated} articles")
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from pymongo import UpdateOne
+
+from config.mongo_utils import get_collection
+
+
+def thread_fields(comments):
+    """
+    {_id: (root_id, depth, reply_count)} for one article's comments, given
+    their _id and reply_to. Replies whose parent is gone become roots.
+    """
+    by_id = {comment['_id']: comment.get('reply_to') for comment in comments}
+    reply_counts = {}
+    for parent_id in by_id.values():
+        if parent_id in by_id:
+            reply_counts[parent_id] = reply_counts.get(parent_id, 0) + 1
+
+    fields = {}
+    for comment_id in by_id:
+        chain = [comment_id]
+        seen = {comment_id}
+        while by_id[chain[-1]] in by_id and by_id[chain[-1]] not in seen and chain[-1] not in fields:
+            chain.append(by_id[chain[-1]])
+            seen.add(chain[-1])
+        root_id, depth = fields[chain[-1]][:2] if chain[-1] in fields else (chain[-1], 0)
+        for offset, _id in enumerate(reversed(chain)):
+            if _id not in fields:
+                fields[_id] = (root_id, depth + offset, reply_counts.get(_id, 0))
+    return fields
+
+
+class Command(BaseCommand):
+    help = "Set root_id, depth and reply_count on comments written before they were maintained"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        collection = get_collection('comments')
+        updated = 0
+        for article_id in collection.distinct('article_id'):
+            comments = list(collection.find({'article_id': article_id}, {'_id': 1, 'reply_to': 1}))
+            operations = [
+                UpdateOne({'_id': _id}, {'$set': {'root_id': root_id, 'depth': depth, 'reply_count': reply_count}})
+                for _id, (root_id, depth, reply_count) in thread_fields(comments).items()
+            ]
+            for start in range(0, len(operations), options['batch_size']):
+                collection.bulk_write(operations[start:start + options['batch_size']], ordered=False)
+            updated += len(operations)
+        self.stdout.write(f"Updated {updated} comments")
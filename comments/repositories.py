@@ -0,0 +1,151 @@
+import logging
+from typing import Dict, Iterable, List, Optional
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+
+from config.mongo_utils import get_collection, get_async_collection, keyset_filter, split_page
+
+logger = logging.getLogger(__name__)
+
+# Newest top-level comments of an article, and the replies of one comment in order
+TOP_LEVEL_INDEX = [('article_id', ASCENDING), ('reply_to', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)]
+REPLIES_INDEX = [('reply_to', ASCENDING), ('created_at', ASCENDING), ('_id', ASCENDING)]
+# Whole threads: every comment carries the _id of its top-level comment in root_id
+THREAD_INDEX = [('root_id', ASCENDING), ('created_at', ASCENDING), ('_id', ASCENDING)]
+
+NEWEST_FIRST = [('created_at', DESCENDING), ('_id', DESCENDING)]
+OLDEST_FIRST = [('created_at', ASCENDING), ('_id', ASCENDING)]
+
+
+def top_level_query(article_id, cursor: Optional[str] = None) -> Dict:
+    """Top-level comments of `article_id` older than `cursor` (InvalidId / ValueError on bad input)."""
+    return {'article_id': ObjectId(article_id), 'reply_to': None, **keyset_filter(cursor)}
+
+
+def replies_query(comment_id, cursor: Optional[str] = None) -> Dict:
+    """Direct replies of `comment_id` newer than `cursor` (InvalidId / ValueError on bad input)."""
+    return {'reply_to': ObjectId(comment_id), **keyset_filter(cursor, descending=False)}
+
+
+def thread_query(root_id, cursor: Optional[str] = None) -> Dict:
+    """All comments under top-level comment `root_id` (itself included) newer than `cursor`."""
+    return {'root_id': ObjectId(root_id), **keyset_filter(cursor, descending=False)}
+
+
+def descendant_ids(comment: Dict, thread: Iterable[Dict]) -> List[ObjectId]:
+    """_ids of every reply below `comment`, found by walking reply_to links within its thread."""
+    children = {}
+    for other in thread:
+        if other.get('reply_to'):
+            children.setdefault(other['reply_to'], []).append(other['_id'])
+    found, pending = [], [comment['_id']]
+    while pending:
+        for child_id in children.get(pending.pop(), []):
+            found.append(child_id)
+            pending.append(child_id)
+    return found
+
+
+def reply_counts_pipeline(comment_ids: List[ObjectId]) -> List[Dict]:
+    return [
+        {'$match': {'reply_to': {'$in': comment_ids}}},
+        {'$group': {'_id': '$reply_to', 'count': {'$sum': 1}}}
+    ]
+
+
+class CommentRepository:
+    """Comment reads for the REST services (blocking pymongo)."""
+
+    def __init__(self, collection):
+        self.collection = collection
+        try:
+            self.collection.create_index(TOP_LEVEL_INDEX, name='article_id_1_reply_to_1_created_at_-1__id_-1')
+            self.collection.create_index(REPLIES_INDEX, name='reply_to_1_created_at_1__id_1')
+            self.collection.create_index(THREAD_INDEX, name='root_id_1_created_at_1__id_1')
+        except Exception as e:
+            logger.error(f"Failed to ensure comment indexes: {str(e)}")
+
+    def page_top_level(self, article_id, limit: int, cursor: Optional[str] = None):
+        comments = list(self.collection.find(top_level_query(article_id, cursor)).sort(NEWEST_FIRST).limit(limit + 1))
+        return split_page(comments, limit)
+
+    def page_replies(self, comment_id, limit: int, cursor: Optional[str] = None):
+        comments = list(self.collection.find(replies_query(comment_id, cursor)).sort(OLDEST_FIRST).limit(limit + 1))
+        return split_page(comments, limit)
+
+    def page_thread(self, root_id, limit: int, cursor: Optional[str] = None):
+        comments = list(self.collection.find(thread_query(root_id, cursor)).sort(OLDEST_FIRST).limit(limit + 1))
+        return split_page(comments, limit)
+
+    def subtree_ids(self, comment: Dict) -> List[ObjectId]:
+        """`comment` and all of its replies, from one indexed query on its thread."""
+        if comment.get('depth', 0) == 0 and comment.get('root_id') == comment['_id']:
+            # A top-level comment owns the whole thread
+            return [c['_id'] for c in self.collection.find({'root_id': comment['_id']}, {'_id': 1})]
+        root_id = comment.get('root_id')
+        if root_id is None:
+            return self._legacy_subtree_ids(comment['_id'])
+        thread = self.collection.find({'root_id': root_id}, {'_id': 1, 'reply_to': 1})
+        return [comment['_id'], *descendant_ids(comment, thread)]
+
+    def _legacy_subtree_ids(self, comment_id: ObjectId) -> List[ObjectId]:
+        # Comments written before root_id existed: one reply_to query per level
+        found, level = [comment_id], [comment_id]
+        while level:
+            level = [c['_id'] for c in self.collection.find({'reply_to': {'$in': level}}, {'_id': 1})]
+            found.extend(level)
+        return found
+
+    def get_many(self, comment_ids: Iterable) -> Dict:
+        """{_id: comment} for `comment_ids`, in one query."""
+        comment_ids = list(set(comment_ids))
+        if not comment_ids:
+            return {}
+        return {comment['_id']: comment for comment in self.collection.find({'_id': {'$in': comment_ids}})}
+
+    def reply_counts(self, comment_ids: List[ObjectId]) -> Dict:
+        if not comment_ids:
+            return {}
+        return {row['_id']: row['count'] for row in self.collection.aggregate(reply_counts_pipeline(comment_ids))}
+
+
+class AsyncCommentRepository:
+    """Non-blocking comment reads for Channels consumers, on the shared AsyncMongoClient."""
+
+    @staticmethod
+    def _collection():
+        return get_async_collection('comments')
+
+    async def page_top_level(self, article_id, limit: int, cursor: Optional[str] = None):
+        cursor = self._collection().find(top_level_query(article_id, cursor)).sort(NEWEST_FIRST).limit(limit + 1)
+        return split_page(await cursor.to_list(None), limit)
+
+    async def page_replies(self, comment_id, limit: int, cursor: Optional[str] = None):
+        cursor = self._collection().find(replies_query(comment_id, cursor)).sort(OLDEST_FIRST).limit(limit + 1)
+        return split_page(await cursor.to_list(None), limit)
+
+    async def page_thread(self, root_id, limit: int, cursor: Optional[str] = None):
+        cursor = self._collection().find(thread_query(root_id, cursor)).sort(OLDEST_FIRST).limit(limit + 1)
+        return split_page(await cursor.to_list(None), limit)
+
+    async def get(self, comment_id) -> Optional[Dict]:
+        return await self._collection().find_one({'_id': comment_id})
+
+    async def get_many(self, comment_ids: Iterable) -> Dict:
+        """{_id: comment} for `comment_ids`, in one query."""
+        comment_ids = list(set(comment_ids))
+        if not comment_ids:
+            return {}
+        comments = await self._collection().find({'_id': {'$in': comment_ids}}).to_list(None)
+        return {comment['_id']: comment for comment in comments}
+
+    async def reply_counts(self, comment_ids: List[ObjectId]) -> Dict:
+        if not comment_ids:
+            return {}
+        cursor = await self._collection().aggregate(reply_counts_pipeline(comment_ids))
+        return {row['_id']: row['count'] for row in await cursor.to_list(None)}
+
+
+comment_repository = CommentRepository(get_collection('comments'))
+async_comment_repository = AsyncCommentRepository()
@@ -5,91 +5,181 @@ from asgiref.sync import async_to_sync
 from datetime import datetime
 import logging
 
+from iTech import settings
 from profiles.models import Profile
 from config.mongo_utils import get_collection
+from comments.repositories import comment_repository
+from comments.utils.room_events import room_event_batcher
+from comments.utils.seen_receipts import seen_receipt_buffer
 
 logger = logging.getLogger(__name__)
 
 
+def _user_info(user, profile):
+    if profile is not None:
+        return {
+            "first_name": profile.first_name or user.first_name,
+            "last_name": profile.last_name or user.last_name,
+            "profile_picture": profile.profile_picture.url if profile.profile_picture else None,
+            "username": user.username
+        }
+    return {
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "profile_picture": None,
+        "username": user.username
+    }
+
+UNKNOWN_USER_INFO = {
+    "first_name": "",
+    "last_name": "",
+    "profile_picture": None
+}
+
 def get_user_info(user_id):
     try:
         user = User.objects.get(id=user_id)
         try:
-            profile = Profile.objects.get(user=user)
-            profile_picture = profile.profile_picture.url if profile.profile_picture else None
-            return {
-                "first_name": profile.first_name or user.first_name,
-                "last_name": profile.last_name or user.last_name,
-                "profile_picture": profile_picture
-            }
+            return _user_info(user, Profile.objects.get(user=user))
         except Profile.DoesNotExist:
-            return {
-                "first_name": user.first_name,
-                "last_name": user.last_name,
-                "profile_picture": None
-            }
+            return _user_info(user, None)
     except User.DoesNotExist:
-        return {
-            "first_name": "",
-            "last_name": "",
-            "profile_picture": None
-        }
+        return dict(UNKNOWN_USER_INFO)
 
-def format_comment(comment):
-    comment['_id'] = str(comment['_id'])
+def get_users_info(user_ids):
+    """get_user_info for many users in one query: {user_id: info}"""
+    infos = {}
+    for user in User.objects.filter(id__in=set(user_ids)).select_related('profile'):
+        infos[user.id] = _user_info(user, getattr(user, 'profile', None))
+    return infos
+
+def parent_summaries(comments, fetched_parents):
+    """
+    {_id: {user_id, message}} for the parents of `comments`, from the list
+    itself and `fetched_parents`; copied so formatting can mutate in place.
+    """
+    parents = {comment['_id']: comment for comment in comments}
+    parents.update(fetched_parents)
+    return {
+        _id: {"user_id": parent["user_id"], "message": parent.get("message")}
+        for _id, parent in parents.items()
+    }
+
+def missing_parent_ids(comments):
+    by_id = {comment['_id'] for comment in comments}
+    return [c['reply_to'] for c in comments if c.get('reply_to') and c['reply_to'] not in by_id]
+
+def build_comment(comment, parents, user_infos, reply_counts=None):
+    """
+    Format one comment from prefetched lookups, without queries:
+    `parents` ({_id: {user_id, message}}), `user_infos` ({user_id: info})
+    and `reply_counts` ({_id: count}) for comments written before
+    reply_count was stored on the document.
+    """
+    comment_id = comment['_id']
+    comment['_id'] = str(comment_id)
     comment['article_id'] = str(comment['article_id'])
-    
+
     user_id = comment['user_id']
-    user_info = get_user_info(user_id)
-    comment['user_info'] = user_info
+    comment['user_info'] = user_infos.get(user_id, UNKNOWN_USER_INFO)
     comment['user_id'] = str(user_id)
-    
+
     if 'seen' not in comment:
         comment['seen'] = False
-    
+
     if comment.get('reply_to'):
         reply_to_id = comment['reply_to']
-        comments_collection = get_collection('comments')
-        try:
-            parent_comment = comments_collection.find_one({"_id": reply_to_id})
-            if parent_comment:
-                parent_user_id = parent_comment['user_id']
-                parent_user_info = get_user_info(parent_user_id)
-                
-                comment['reply_to'] = {
-                    "_id": str(reply_to_id),
-                    "message": parent_comment['message'],
-                    "user_id": str(parent_user_id),
-                    "user_info": parent_user_info
-                }
-            else:
-                comment['reply_to'] = str(reply_to_id)
-        except Exception as e:
-            logger.error(f"Error getting parent comment: {str(e)}")
+        parent_comment = parents.get(reply_to_id)
+        if parent_comment:
+            parent_user_id = parent_comment['user_id']
+            comment['reply_to'] = {
+                "_id": str(reply_to_id),
+                "message": parent_comment['message'],
+                "user_id": str(parent_user_id),
+                "user_info": user_infos.get(parent_user_id, UNKNOWN_USER_INFO)
+            }
+        else:
             comment['reply_to'] = str(reply_to_id)
-    
+    if 'reply_count' not in comment and reply_counts is not None:
+        comment['reply_count'] = reply_counts.get(comment_id, 0)
+    if isinstance(comment.get('root_id'), ObjectId):
+        comment['root_id'] = str(comment['root_id'])
+
     if isinstance(comment.get('created_at'), datetime):
         comment['created_at'] = comment['created_at'].isoformat()
-    
+
     return comment
 
+def format_comments(comments, with_reply_counts=False):
+    """Format a list of comments with one parent query and one user query for the whole list."""
+    parents = parent_summaries(comments, comment_repository.get_many(missing_parent_ids(comments)))
+    user_infos = get_users_info(
+        [c['user_id'] for c in comments] + [parent['user_id'] for parent in parents.values()]
+    )
+    reply_counts = None
+    if with_reply_counts:
+        reply_counts = comment_repository.reply_counts([c['_id'] for c in comments if 'reply_count' not in c])
+    return [build_comment(comment, parents, user_infos, reply_counts) for comment in comments]
+
+def format_comment(comment):
+    return format_comments([comment])[0]
+
+def page_size(limit):
+    """Requested page size, defaulting to COMMENTS_PAGE_SIZE and capped at COMMENTS_PAGE_MAX."""
+    if limit is None:
+        return settings.COMMENTS_PAGE_SIZE
+    return max(1, min(int(limit), settings.COMMENTS_PAGE_MAX))
+
+def list_comments_service(article_id, cursor=None, limit=None):
+    """
+    Newest top-level comments of an article, with reply counts.
+    Raises InvalidId for a bad article id and ValueError for a bad cursor or limit.
+    """
+    comments, next_cursor = comment_repository.page_top_level(article_id, page_size(limit), cursor)
+    return {
+        "comments": format_comments(comments, with_reply_counts=True),
+        "next_cursor": next_cursor
+    }
+
+def list_replies_service(comment_id, cursor=None, limit=None):
+    """Replies to one comment, oldest first. Raises InvalidId / ValueError like list_comments_service."""
+    comments, next_cursor = comment_repository.page_replies(comment_id, page_size(limit), cursor)
+    return {
+        "comments": format_comments(comments, with_reply_counts=True),
+        "next_cursor": next_cursor
+    }
+
+def list_thread_service(root_id, cursor=None, limit=None):
+    """
+    A whole thread (the top-level comment and every nested reply), oldest
+    first, from one indexed query on root_id. Raises InvalidId / ValueError
+    like list_comments_service.
+    """
+    comments, next_cursor = comment_repository.page_thread(root_id, page_size(limit), cursor)
+    return {
+        "comments": format_comments(comments, with_reply_counts=True),
+        "next_cursor": next_cursor
+    }
+
 def send_to_group(article_id, message_type, comment_data):
+    """
+    Publish a comment event to the article room. Events are batched per
+    room (see RoomEventBatcher), so keep `comment_data` to ids and the
+    fields that changed.
+    """
     try:
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(
-            f"chat_{article_id}",
-            {
-                "type": "chat_message",
-                "message": {
-                    "type": message_type,
-                    "comment": comment_data
-                }
-            }
-        )
-        logger.info(f"Sent {message_type} signal to group chat_{article_id}")
+        room_event_batcher.publish(article_id, {"type": message_type, "comment": comment_data})
+        logger.info(f"Queued {message_type} signal for group chat_{article_id}")
     except Exception as e:
         logger.error(f"Error sending to WebSocket group: {str(e)}")
 
+def created_event(formatted_comment):
+    """The room event for a new comment: the parent is sent as its id only."""
+    event = dict(formatted_comment)
+    if isinstance(event.get('reply_to'), dict):
+        event['reply_to'] = event['reply_to']['_id']
+    return event
+
 
 def send_notification(user_id, notification_data):
     """Sends a real-time notification to a user."""
@@ -119,6 +209,29 @@ def send_notification(user_id, notification_data):
         logger.error(f"Error sending notification to user {user_id}: {e}")
 
 
+ARTICLE_COLLECTIONS = ('articles_users', 'articles')
+ARTICLE_NOTIFICATION_PROJECTION = {'userId': 1, 'imgCover': 1, 'comment_count': 1}
+
+def update_article_comment_count(article_id, delta):
+    """
+    Atomically add `delta` to the article's comment_count and return the
+    article as it was before (userId, imgCover), with the previous count in
+    'comment_count_before'; None if the article does not exist.
+    Articles written before the counter existed are set by the
+    backfill_comment_count management command.
+    """
+    for name in ARTICLE_COLLECTIONS:
+        article = get_collection(name).find_one_and_update(
+            {"_id": ObjectId(article_id)},
+            {"$inc": {"comment_count": delta}},
+            projection=ARTICLE_NOTIFICATION_PROJECTION
+        )
+        if article is None:
+            continue
+        article['comment_count_before'] = article.pop('comment_count', 0)
+        return article
+    return None
+
 def create_comment_service(data, user):
     try:
         article_id_str = data.get('article_id')
@@ -126,29 +239,48 @@ def create_comment_service(data, user):
         reply_to_str = data.get('reply_to')
 
         now = datetime.utcnow()
+        new_comment_id = ObjectId()
+
+        comments_collection = get_collection('comments')
+
+        # Thread structure: replies inherit root_id from their parent and sit one level deeper
+        parent_comment = None
+        root_id, depth = new_comment_id, 0
+        if reply_to_str:
+            parent_comment = comments_collection.find_one_and_update(
+                {"_id": ObjectId(reply_to_str)},
+                {"$inc": {"reply_count": 1}}
+            )
+            if not parent_comment:
+                raise Exception("Parent comment not found")
+            root_id = parent_comment.get("root_id") or parent_comment["_id"]
+            depth = parent_comment.get("depth", 0) + 1
 
         comment_to_save = {
+            "_id": new_comment_id,
             "article_id": ObjectId(article_id_str),
             "user_id": user.id,
             "message": message,
             "created_at": now,
-            "reply_to": ObjectId(reply_to_str) if reply_to_str else None,
+            "reply_to": parent_comment["_id"] if parent_comment else None,
+            "root_id": root_id,
+            "depth": depth,
+            "reply_count": 0,
             "seen": False
         }
-        
-        comments_collection = get_collection('comments')
-        result = comments_collection.insert_one(comment_to_save)
-        new_comment_id = result.inserted_id
+
+        try:
+            comments_collection.insert_one(comment_to_save)
+        except Exception:
+            if parent_comment:
+                comments_collection.update_one({"_id": parent_comment["_id"]}, {"$inc": {"reply_count": -1}})
+            raise
 
         # Notification Logic
         notifications_collection = get_collection('notifications')
         
-        article = None
-        articles_users_collection = get_collection('articles_users')
-        article = articles_users_collection.find_one({"_id": ObjectId(article_id_str)})
-        if not article:
-             articles_collection = get_collection('articles')
-             article = articles_collection.find_one({"_id": ObjectId(article_id_str)})
+        # One round trip both counts the comment and reads what the notifications need
+        article = update_article_comment_count(article_id_str, 1)
 
         article_img_cover = ""
         if article:
@@ -157,60 +289,54 @@ def create_comment_service(data, user):
             # For now, we'll assume the image URL is absolute or handle it on the client-side.
             article_img_cover = img_cover
 
-        if reply_to_str:
-            parent_comment = comments_collection.find_one({"_id": ObjectId(reply_to_str)})
-            if parent_comment:
-                recipient_id = parent_comment.get('user_id')
-                if recipient_id and recipient_id != user.id:
-                    notification_to_save = {
-                        "user_id": recipient_id,
+        if parent_comment:
+            recipient_id = parent_comment.get('user_id')
+            if recipient_id and recipient_id != user.id:
+                notification_to_save = {
+                    "user_id": recipient_id,
+                    "type": "comment_reply",
+                    "actor_id": user.id,
+                    "target": {
                         "type": "comment_reply",
-                        "actor_id": user.id,
-                        "target": {
-                            "type": "comment_reply",
-                            "replying_to_comment": ObjectId(reply_to_str),
-                            "new_comment": new_comment_id,
-                            "article_id": ObjectId(article_id_str)
-                        },
-                        "created_at": now,
-                        "is_read": False,
-                        "extra_data": {
-                            "comment": message,
-                            "article_img_cover": article_img_cover
-                        }
+                        "replying_to_comment": ObjectId(reply_to_str),
+                        "new_comment": new_comment_id,
+                        "article_id": ObjectId(article_id_str)
+                    },
+                    "created_at": now,
+                    "is_read": False,
+                    "extra_data": {
+                        "comment": message,
+                        "article_img_cover": article_img_cover
                     }
-                    notif_result = notifications_collection.insert_one(notification_to_save)
-                    # WebSocket notification for reply
-                    send_notification(recipient_id, notification_to_save)
-        else:
-            comment_count = comments_collection.count_documents({"article_id": ObjectId(article_id_str)})
-            if comment_count == 1:
-                if article:
-                    recipient_id = article.get('userId')
-                    if recipient_id and recipient_id != user.id:
-                        notification_to_save = {
-                            "user_id": recipient_id,
-                            "type": "comment_create",
-                            "actor_id": user.id,
-                            "target": {
-                                "type": "comment_create",
-                                "id": new_comment_id,
-                                "article_id": ObjectId(article_id_str)
-                            },
-                            "created_at": now,
-                            "is_read": False,
-                            "extra_data": {
-                                "comment": message,
-                                "article_img_cover": article_img_cover
-                            }
-                        }
-                        notif_result = notifications_collection.insert_one(notification_to_save)
-                        # WebSocket notification for first comment
-                        send_notification(recipient_id, notification_to_save)
-
-        new_comment_doc = comments_collection.find_one({"_id": new_comment_id})
-        formatted_comment = format_comment(new_comment_doc)
-        send_to_group(article_id_str, "comment_created", formatted_comment)
+                }
+                notif_result = notifications_collection.insert_one(notification_to_save)
+                # WebSocket notification for reply
+                send_notification(recipient_id, notification_to_save)
+        elif article and article['comment_count_before'] == 0:
+            recipient_id = article.get('userId')
+            if recipient_id and recipient_id != user.id:
+                notification_to_save = {
+                    "user_id": recipient_id,
+                    "type": "comment_create",
+                    "actor_id": user.id,
+                    "target": {
+                        "type": "comment_create",
+                        "id": new_comment_id,
+                        "article_id": ObjectId(article_id_str)
+                    },
+                    "created_at": now,
+                    "is_read": False,
+                    "extra_data": {
+                        "comment": message,
+                        "article_img_cover": article_img_cover
+                    }
+                }
+                notif_result = notifications_collection.insert_one(notification_to_save)
+                # WebSocket notification for first comment
+                send_notification(recipient_id, notification_to_save)
+
+        formatted_comment = format_comment(comment_to_save)
+        send_to_group(article_id_str, "comment_created", created_event(formatted_comment))
         
         return formatted_comment
             
@@ -242,7 +368,10 @@ def update_comment_service(comment_id, data, user):
         formatted_comment = format_comment(updated_comment)
         
         article_id = str(comment['article_id'])
-        send_to_group(article_id, "comment_updated", formatted_comment)
+        send_to_group(article_id, "comment_updated", {
+            "_id": formatted_comment['_id'],
+            "message": formatted_comment['message']
+        })
         
         return formatted_comment
             
@@ -262,12 +391,20 @@ def delete_comment_service(comment_id, user):
         if comment['user_id'] != user.id:
             raise Exception("You don't have permission to delete this comment")
         
-        formatted_comment = format_comment(comment)
-        article_id = formatted_comment['article_id']
-        
-        comments_collection.delete_one({"_id": ObjectId(comment_id)})
-        
-        send_to_group(article_id, "comment_deleted", {"_id": comment_id})
+        article_id = str(comment['article_id'])
+
+        # Cascade: the comment and every reply below it, found through its thread
+        deleted_ids = comment_repository.subtree_ids(comment)
+        result = comments_collection.delete_many({"_id": {"$in": deleted_ids}})
+        if comment.get('reply_to'):
+            comments_collection.update_one({"_id": comment['reply_to']}, {"$inc": {"reply_count": -1}})
+        if result.deleted_count:
+            update_article_comment_count(article_id, -result.deleted_count)
+
+        send_to_group(article_id, "comment_deleted", {
+            "_id": comment_id,
+            "deleted_ids": [str(_id) for _id in deleted_ids]
+        })
         
         return comment_id
             
@@ -276,6 +413,12 @@ def delete_comment_service(comment_id, user):
         raise e
 
 def seen_comments_service(data):
+    """
+    Queue "seen" receipts; they are coalesced per article and written and
+    broadcast as one id list by the flush_seen_receipts beat task. Comment
+    bodies are not re-read. Without Redis the receipts are written and
+    broadcast directly.
+    """
     try:
         article_id = data.get('article_id')
         comment_ids = data.get('comment_ids', [])
@@ -283,31 +426,23 @@ def seen_comments_service(data):
         if not article_id or not comment_ids:
             raise Exception("Missing required fields")
         
-        object_ids = [ObjectId(comment_id) for comment_id in comment_ids]
-        
-        comments_collection = get_collection('comments')
-        
-        result = comments_collection.update_many(
-            {
-                "_id": {"$in": object_ids},
-                "article_id": ObjectId(article_id)
-            },
-            {"$set": {"seen": True}}
-        )
-        
-        updated_comments = list(comments_collection.find({"_id": {"$in": object_ids}}))
-        formatted_comments = [format_comment(comment) for comment in updated_comments]
-        
+        # Validate before queueing so a bad id cannot poison a flush
+        ObjectId(article_id)
+        comment_ids = sorted({str(ObjectId(comment_id)) for comment_id in comment_ids})
+
+        try:
+            seen_receipt_buffer.record(article_id, comment_ids)
+            return {"queued": True, "comment_ids": comment_ids}
+        except Exception as e:
+            logger.error(f"Seen receipt buffer unavailable, writing directly: {str(e)}")
+
+        seen_receipt_buffer.mark_seen({article_id: comment_ids})
         send_to_group(article_id, "comments_seen", {
             "comment_ids": comment_ids,
             "article_id": article_id
         })
-        
-        return {
-            "modified_count": result.modified_count,
-            "comments": formatted_comments
-        }
+        return {"queued": False, "comment_ids": comment_ids}
             
     except Exception as e:
         logger.error(f"Error marking comments as seen: {str(e)}")
-        raise e
\ No newline at end of file
+        raise e
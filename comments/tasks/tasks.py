@@ -0,0 +1,27 @@
+import logging
+from celery import shared_task
+from comments.services.comment_services import send_to_group
+from comments.utils.room_events import room_event_batcher
+from comments.utils.seen_receipts import seen_receipt_buffer
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def flush_seen_receipts():
+    receipts = seen_receipt_buffer.flush()
+    for article_id, comment_ids in receipts.items():
+        send_to_group(article_id, "comments_seen", {
+            "comment_ids": comment_ids,
+            "article_id": article_id
+        })
+    if receipts:
+        logger.info(f"Flushed seen receipts for {len(receipts)} articles")
+    return sum(len(comment_ids) for comment_ids in receipts.values())
+
+
+@shared_task
+def flush_room_events(article_id):
+    events = room_event_batcher.drain(article_id)
+    room_event_batcher.send(article_id, events)
+    return len(events)
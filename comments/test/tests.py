@@ -0,0 +1,44 @@
+from django.test import SimpleTestCase
+
+from iTech import celery_app
+
+from comments.utils.room_events import collapse_events
+
+
+class CollapseRoomEventsTests(SimpleTestCase):
+
+    def test_updates_fold_into_pending_create(self):
+        events = collapse_events([
+            {'type': 'comment_created', 'comment': {'_id': 'a', 'message': 'one', 'user_id': '7'}},
+            {'type': 'comment_updated', 'comment': {'_id': 'a', 'message': 'two'}},
+            {'type': 'comment_updated', 'comment': {'_id': 'b', 'message': 'x'}},
+        ])
+        self.assertEqual(events, [
+            {'type': 'comment_created', 'comment': {'_id': 'a', 'message': 'two', 'user_id': '7'}},
+            {'type': 'comment_updated', 'comment': {'_id': 'b', 'message': 'x'}},
+        ])
+
+    def test_delete_drops_pending_events_of_the_subtree(self):
+        events = collapse_events([
+            {'type': 'comment_created', 'comment': {'_id': 'reply', 'message': 'hi'}},
+            {'type': 'comment_deleted', 'comment': {'_id': 'root', 'deleted_ids': ['root', 'reply']}},
+            {'type': 'comment_updated', 'comment': {'_id': 'root', 'message': 'late'}},
+        ])
+        self.assertEqual(events, [
+            {'type': 'comment_deleted', 'comment': {'_id': 'root', 'deleted_ids': ['root', 'reply']}},
+        ])
+
+    def test_seen_receipts_are_merged(self):
+        events = collapse_events([
+            {'type': 'comments_seen', 'comment': {'comment_ids': ['a', 'b'], 'article_id': 'x'}},
+            {'type': 'comments_seen', 'comment': {'comment_ids': ['b', 'c'], 'article_id': 'x'}},
+        ])
+        self.assertEqual(events, [{'type': 'comments_seen', 'comment': {'comment_ids': ['a', 'b', 'c']}}])
+
+
+class CommentTaskRegistrationTests(SimpleTestCase):
+
+    def test_flush_tasks_are_registered_with_the_worker_app(self):
+        # autodiscover only loads comments.tasks; CommentsConfig.ready() imports the module
+        self.assertIn('comments.tasks.tasks.flush_room_events', celery_app.tasks)
+        self.assertIn('comments.tasks.tasks.flush_seen_receipts', celery_app.tasks)
@@ -0,0 +1,161 @@
+import asyncio
+import json
+import logging
+from typing import Dict, List
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+from iTech import settings
+from config.redis_utils import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+# Sent instead of the events when some were lost; clients reload the first page
+RESYNC_EVENT = {'type': 'resync'}
+
+
+def collapse_events(events: List[Dict]) -> List[Dict]:
+    """
+    Merge a run of room events so each comment appears at most once:
+    updates fold into the pending create/update of the same comment, a
+    delete replaces everything pending for the comments it removes, and
+    seen receipts are unioned into one event. Order of first appearance
+    is kept.
+    """
+    collapsed: Dict = {}
+    seen_ids: List[str] = []
+    for event in events:
+        event_type, comment = event['type'], event['comment']
+        if event_type == 'comments_seen':
+            seen_ids.extend(i for i in comment['comment_ids'] if i not in seen_ids)
+            continue
+        key = comment['_id']
+        if event_type == 'comment_deleted':
+            for deleted_id in comment.get('deleted_ids', [key]):
+                collapsed.pop(deleted_id, None)
+            collapsed[key] = event
+        elif event_type == 'comment_updated' and key in collapsed:
+            pending = collapsed[key]
+            if pending['type'] != 'comment_deleted':
+                collapsed[key] = {'type': pending['type'], 'comment': {**pending['comment'], **comment}}
+        else:
+            collapsed[key] = event
+
+    events = list(collapsed.values())
+    if seen_ids:
+        events.append({'type': 'comments_seen', 'comment': {'comment_ids': seen_ids}})
+    return events
+
+
+class RoomEventBatcher:
+    """
+    Bundles comment events per article room. `publish` appends the event to
+    a Redis list; the first event of a window schedules the
+    comments.tasks.tasks.flush_room_events task COMMENTS_ROOM_BATCH_WINDOW
+    seconds later, which sends the collapsed list to the room as a single
+    `chat_batch` group message. A burst of comments then costs one
+    group_send (and one frame per socket) per window instead of one per
+    event.
+    """
+    events_key = 'comments:room:{article_id}:events'
+    scheduled_key = 'comments:room:{article_id}:scheduled'
+
+    def publish(self, article_id: str, event: Dict):
+        """Queue an event for the room; sends it directly if Redis or Celery is unavailable."""
+        # Imported here: the task module imports the comment services, which import this module
+        from comments.tasks.tasks import flush_room_events
+
+        window = settings.COMMENTS_ROOM_BATCH_WINDOW
+        if window <= 0:
+            self.send(article_id, [event])
+            return
+        try:
+            if self.queue(article_id, event, window):
+                flush_room_events.apply_async(args=[article_id], countdown=window)
+        except Exception as e:
+            logger.error(f"Room batching unavailable, sending directly: {str(e)}")
+            self.send(article_id, [event])
+
+    def queue(self, article_id: str, event: Dict, window: float) -> bool:
+        """Append the event to the room's list; True if it opened a window and a flush must be scheduled."""
+        pipe = get_redis_client().pipeline(transaction=False)
+        pipe.rpush(self.events_key.format(article_id=article_id), json.dumps(event))
+        pipe.ltrim(self.events_key.format(article_id=article_id), -settings.COMMENTS_ROOM_BATCH_MAX, -1)
+        # Expires on its own if the task is lost, so the room cannot stall
+        pipe.set(self.scheduled_key.format(article_id=article_id), 1, nx=True, px=int(window * 10000))
+        _, _, first_in_window = pipe.execute()
+        return bool(first_in_window)
+
+    def drain(self, article_id: str) -> List[Dict]:
+        """Take the room's pending events; the next publish opens a new window."""
+        pipe = get_redis_client().pipeline(transaction=True)
+        pipe.delete(self.scheduled_key.format(article_id=article_id))
+        pipe.lrange(self.events_key.format(article_id=article_id), 0, -1)
+        pipe.delete(self.events_key.format(article_id=article_id))
+        _, payloads, _ = pipe.execute()
+        if len(payloads) >= settings.COMMENTS_ROOM_BATCH_MAX:
+            # The list was trimmed and older events are gone
+            return [RESYNC_EVENT]
+        return collapse_events([json.loads(payload) for payload in payloads])
+
+    @staticmethod
+    def send(article_id: str, events: List[Dict]):
+        if not events:
+            return
+        async_to_sync(get_channel_layer().group_send)(
+            f"chat_{article_id}",
+            {"type": "chat_batch", "events": events}
+        )
+
+
+room_event_batcher = RoomEventBatcher()
+
+
+class RoomEventOutbox:
+    """
+    Consumer mixin that writes chat_batch events to the socket from one
+    writer task. Events arriving while a send is in flight are collapsed
+    into the pending list, so a slow socket falls behind by one batch
+    rather than one frame per event; past COMMENTS_SOCKET_MAX_PENDING it is
+    told to resync. The consumer starts `write_events` after accepting and
+    cancels `writer` on disconnect.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Room events not yet written to this socket; collapsed while a send is in flight
+        self.pending_events = []
+        self.needs_resync = False
+        self.events_ready = asyncio.Event()
+        self.writer = None
+
+    async def chat_batch(self, event):
+        """
+        Handle a batch of room events (see RoomEventBatcher).
+        Events are only queued here; write_events sends them, so a slow
+        socket collapses pending updates instead of backing up the layer.
+        """
+        events = event["events"]
+        if RESYNC_EVENT in events:
+            self.needs_resync = True
+            events = [e for e in events if e != RESYNC_EVENT]
+        self.pending_events = collapse_events(self.pending_events + events)
+        if len(self.pending_events) > settings.COMMENTS_SOCKET_MAX_PENDING:
+            # Too far behind to catch up event by event
+            self.pending_events = []
+            self.needs_resync = True
+        self.events_ready.set()
+
+    async def write_events(self):
+        while True:
+            await self.events_ready.wait()
+            self.events_ready.clear()
+            if self.needs_resync:
+                self.needs_resync = False
+                self.pending_events = []
+                await self.send(text_data=json.dumps({"type": "resync"}))
+                continue
+            events, self.pending_events = self.pending_events, []
+            if events:
+                await self.send(text_data=json.dumps({"type": "comments_batch", "events": events}))
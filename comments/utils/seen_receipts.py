@@ -0,0 +1,88 @@
+import logging
+from typing import Dict, List
+
+from bson import ObjectId
+from pymongo import UpdateMany
+
+from config.mongo_utils import get_collection
+from config.redis_utils import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class SeenReceiptBuffer:
+    """
+    Coalesces "seen" receipts for comments in Redis. Each article has a set
+    of pending comment ids, so repeated receipts from a scrolling client
+    (or from several readers of the same article) collapse into one entry
+    per comment until the next flush.
+
+    `flush` marks every pending comment seen with a single bulk_write (one
+    update per article) and returns the ids per article for broadcasting;
+    it runs from the comments.tasks.tasks.flush_seen_receipts beat task.
+    """
+    pending_key = 'comments:seen:pending'
+    article_key = 'comments:seen:article:{article_id}'
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def record(self, article_id: str, comment_ids: List[str]):
+        """Queue receipts; raises if Redis is unavailable so the caller can write directly."""
+        pipe = get_redis_client().pipeline(transaction=False)
+        pipe.sadd(self.article_key.format(article_id=article_id), *comment_ids)
+        pipe.sadd(self.pending_key, article_id)
+        pipe.execute()
+
+    def mark_seen(self, receipts: Dict[str, List[str]]) -> int:
+        """Mark {article_id: [comment_id, ...]} seen in one bulk write. Returns the modified count."""
+        operations = [
+            UpdateMany(
+                {
+                    '_id': {'$in': [ObjectId(comment_id) for comment_id in comment_ids]},
+                    'article_id': ObjectId(article_id),
+                    'seen': {'$ne': True}
+                },
+                {'$set': {'seen': True}}
+            )
+            for article_id, comment_ids in receipts.items()
+        ]
+        if not operations:
+            return 0
+        return self.collection.bulk_write(operations, ordered=False).modified_count
+
+    def flush(self) -> Dict[str, List[str]]:
+        """Write all pending receipts; returns {article_id: [comment_id, ...]} that were flushed."""
+        redis_client = get_redis_client()
+
+        pipe = redis_client.pipeline(transaction=True)
+        pipe.smembers(self.pending_key)
+        pipe.delete(self.pending_key)
+        article_ids, _ = pipe.execute()
+        if not article_ids:
+            return {}
+        article_ids = [article_id.decode('utf-8') for article_id in article_ids]
+
+        pipe = redis_client.pipeline(transaction=True)
+        for article_id in article_ids:
+            key = self.article_key.format(article_id=article_id)
+            pipe.smembers(key)
+            pipe.delete(key)
+        replies = pipe.execute()
+
+        receipts = {}
+        for article_id, comment_ids in zip(article_ids, replies[::2]):
+            if comment_ids:
+                receipts[article_id] = sorted(comment_id.decode('utf-8') for comment_id in comment_ids)
+
+        try:
+            self.mark_seen(receipts)
+        except Exception:
+            # Requeue so the next run retries them
+            for article_id, comment_ids in receipts.items():
+                self.record(article_id, comment_ids)
+            raise
+        return receipts
+
+
+seen_receipt_buffer = SeenReceiptBuffer(get_collection('comments'))
@@ -2,6 +2,7 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
+from bson.errors import InvalidId
 
 from ..serializers.comment_serializers import CommentSerializer, SeenCommentsSerializer
 from ..services.comment_services import (
@@ -9,6 +10,9 @@ from ..services.comment_services import (
     update_comment_service,
     delete_comment_service,
     seen_comments_service,
+    list_comments_service,
+    list_replies_service,
+    list_thread_service,
 )
 
 class CreateCommentView(APIView):
@@ -63,4 +67,52 @@ class SeenCommentsView(APIView):
                 return Response(result, status=status.HTTP_200_OK)
             except Exception as e:
                 return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ListCommentsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        article_id = request.query_params.get('article_id')
+        if not article_id:
+            return Response({"error": "article_id is required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            page = list_comments_service(
+                article_id, request.query_params.get('cursor'), request.query_params.get('limit')
+            )
+            return Response(page, status=status.HTTP_200_OK)
+        except (InvalidId, ValueError) as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ListRepliesView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, comment_id, *args, **kwargs):
+        try:
+            page = list_replies_service(
+                comment_id, request.query_params.get('cursor'), request.query_params.get('limit')
+            )
+            return Response(page, status=status.HTTP_200_OK)
+        except (InvalidId, ValueError) as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class CommentThreadView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, root_id, *args, **kwargs):
+        try:
+            page = list_thread_service(
+                root_id, request.query_params.get('cursor'), request.query_params.get('limit')
+            )
+            return Response(page, status=status.HTTP_200_OK)
+        except (InvalidId, ValueError) as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
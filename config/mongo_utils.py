@@ -3,7 +3,12 @@ MongoDB Utility Functions for the itech project.
 This module provides helper functions to interact with MongoDB.
 """
 
+import asyncio
+import base64
+import datetime
+import weakref
 import pymongo
+from bson import ObjectId
 from django.conf import settings
 import logging
 
@@ -48,16 +53,14 @@ def get_database(db_name=None):
         pymongo.database.Database: A MongoDB database instance.
     """
     client = get_mongo_client()
-    
-    if db_name is None:
-        # Extract database name from the MongoDB URI
-        uri_parts = settings.MONGODB_URI.split('/')
-        if len(uri_parts) > 3:
-            db_name = uri_parts[3].split('?')[0]  # Remove query parameters if present
-        else:
-            db_name = 'itech'  # Default database name
-    
-    return client[db_name]
+    return client[db_name or _default_database_name()]
+
+def _default_database_name():
+    """Database name from the MongoDB URI."""
+    uri_parts = settings.MONGODB_URI.split('/')
+    if len(uri_parts) > 3:
+        return uri_parts[3].split('?')[0]  # Remove query parameters if present
+    return 'itech'  # Default database name
 
 def get_collection(collection_name, db_name=None):
     """
@@ -140,6 +143,67 @@ def delete_document(collection_name, query, db_name=None):
     result = collection.delete_one(query)
     return result.deleted_count
 
+# An AsyncMongoClient must only be used on the event loop it runs on, so the
+# shared async client is kept per loop (in practice: one per ASGI worker)
+_async_mongo_clients = weakref.WeakKeyDictionary()
+
+def get_async_mongo_client():
+    """
+    Returns the process-wide pymongo.AsyncMongoClient for the running event loop.
+    Consumers share it (and its connection pool) instead of opening a client per socket.
+    Must be called from a coroutine.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_mongo_clients.get(loop)
+    if client is None:
+        client = pymongo.AsyncMongoClient(settings.MONGODB_URI, directConnection=True)
+        _async_mongo_clients[loop] = client
+        logger.info("Async MongoDB client created")
+    return client
+
+def get_async_database(db_name=None):
+    """Async counterpart of get_database."""
+    return get_async_mongo_client()[db_name or _default_database_name()]
+
+def get_async_collection(collection_name, db_name=None):
+    """Async counterpart of get_collection."""
+    return get_async_database(db_name)[collection_name]
+
+def encode_cursor(document):
+    """Opaque keyset cursor for the (created_at, _id) position of `document`."""
+    raw = f"{document['created_at'].isoformat()}|{document['_id']}"
+    return base64.urlsafe_b64encode(raw.encode('ascii')).decode('ascii')
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError for malformed cursors."""
+    try:
+        created_at, object_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('ascii').split('|')
+        return datetime.datetime.fromisoformat(created_at), ObjectId(object_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def keyset_filter(cursor, descending=True):
+    """
+    Query clause selecting documents after `cursor` in (created_at, _id)
+    order, newest first when `descending`. Empty when there is no cursor;
+    raises ValueError for an invalid one.
+    """
+    if not cursor:
+        return {}
+    created_at, object_id = decode_cursor(cursor)
+    op = '$lt' if descending else '$gt'
+    return {'$or': [
+        {'created_at': {op: created_at}},
+        {'created_at': created_at, '_id': {op: object_id}}
+    ]}
+
+def split_page(documents, limit):
+    """Trim a limit + 1 fetch to `limit`; returns (page, cursor for the next page or None)."""
+    if len(documents) > limit:
+        documents = documents[:limit]
+        return documents, encode_cursor(documents[-1])
+    return documents, None
+
 # تابع برای بستن اتصال در زمان خاموش شدن سرور
 def close_mongo_connection():
     """Close the MongoDB connection when the server shuts down."""
@@ -147,4 +211,11 @@ def close_mongo_connection():
     if _mongo_client is not None:
         _mongo_client.close()
         _mongo_client = None
-        logger.info("MongoDB connection closed") 
\ No newline at end of file
+        logger.info("MongoDB connection closed")
+
+async def close_async_mongo_connection():
+    """Close the async client of the running event loop."""
+    client = _async_mongo_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
+        logger.info("Async MongoDB connection closed") 
\ No newline at end of file
@@ -0,0 +1,49 @@
+"""
+Redis Utility Functions for the itech project.
+This module provides a shared Redis client for caches and probabilistic
+structures that live outside the Channels layer.
+"""
+
+import redis
+from django.conf import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# A single global Redis client; redis-py keeps its own connection pool
+_redis_client = None
+
+def get_redis_client():
+    """
+    Returns a Redis client instance connected to the Redis server.
+    Uses a global client instance for connection pooling.
+
+    Returns:
+        redis.Redis: A Redis client instance.
+    """
+    global _redis_client
+
+    if _redis_client is not None:
+        return _redis_client
+
+    try:
+        _redis_client = redis.Redis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=settings.REDIS_CACHE_DB,
+            socket_timeout=2,
+            socket_connect_timeout=2,
+        )
+        logger.info("Redis client initialised")
+        return _redis_client
+    except Exception as e:
+        logger.error(f"Error creating Redis client: {str(e)}")
+        raise
+
+def close_redis_connection():
+    """Close the Redis connection pool when the server shuts down."""
+    global _redis_client
+    if _redis_client is not None:
+        _redis_client.close()
+        _redis_client = None
+        logger.info("Redis connection closed")
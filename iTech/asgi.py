@@ -21,6 +21,10 @@ import iTech.routing
 # Initialize Django ASGI application
 django_asgi_app = get_asgi_application()
 
+# Rebuild the crawler known-link filter from MongoDB; lookups fall back to the link index meanwhile
+from articles.utils.link_filter import known_link_filter
+known_link_filter.rebuild_in_background()
+
 # Get the ASGI application
 application = ProtocolTypeRouter({
     "http": django_asgi_app,  # Use the standard Django ASGI app for HTTP
@@ -92,12 +92,17 @@ if config('DATABASE_ENGINE', default='') == 'django.db.backends.postgresql':
 # MongoDB (for non-Django models)
 MONGODB_URI = config('MONGODB_URI', default='mongodb://localhost:27017/itech')
 
+# Redis
+REDIS_HOST = config('REDIS_HOST', default='localhost')
+REDIS_PORT = config('REDIS_PORT', default=6379, cast=int)
+REDIS_CACHE_DB = config('REDIS_CACHE_DB', default=1, cast=int)
+
 # Channel Layers
 CHANNEL_LAYERS = {
     'default': {
         'BACKEND': 'channels_redis.core.RedisChannelLayer',
         'CONFIG': {
-            'hosts': [(config('REDIS_HOST', default='localhost'), int(config('REDIS_PORT', default=6379)))],
+            'hosts': [(REDIS_HOST, REDIS_PORT)],
         },
     },
 }
@@ -154,6 +159,18 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'ai.tasks.tasks.run_user_embedding',
         'schedule': crontab(minute=0, hour='*/6'),  # هر ۶ ساعت در دقیقه صفر
     },
+    'flush-search-history': {
+        'task': 'search.tasks.tasks.flush_search_history',
+        'schedule': config('SEARCH_HISTORY_FLUSH_INTERVAL', default=10.0, cast=float),
+    },
+    'flush-comment-seen-receipts': {
+        'task': 'comments.tasks.tasks.flush_seen_receipts',
+        'schedule': config('COMMENTS_SEEN_FLUSH_INTERVAL', default=2.0, cast=float),
+    },
+    'dispatch-article-fan-outs': {
+        'task': 'articles.tasks.tasks.dispatch_article_fan_outs',
+        'schedule': config('ARTICLE_FANOUT_DISPATCH_INTERVAL', default=1.0, cast=float),
+    },
 }
 # Uncomment for django-celery-beat (recommended for production)
 # CELERYBEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
@@ -209,4 +226,75 @@ LOGGING = {
 
 # App-specific (e.g., from your env)
 BASE_URL = config('BASE_URL', default='http://localhost:8001')
-EMBEDDING_SERVER_URL = config('EMBEDDING_SERVER_URL')
\ No newline at end of file
+EMBEDDING_SERVER_URL = config('EMBEDDING_SERVER_URL')
+# Crawler ingestion
+INGEST_BATCH_SIZE = config('INGEST_BATCH_SIZE', default=500, cast=int)
+INGEST_EMBED_BATCH_SIZE = config('INGEST_EMBED_BATCH_SIZE', default=32, cast=int)
+KNOWN_LINKS_FILTER_CAPACITY = config('KNOWN_LINKS_FILTER_CAPACITY', default=1000000, cast=int)
+KNOWN_LINKS_FILTER_ERROR_RATE = config('KNOWN_LINKS_FILTER_ERROR_RATE', default=0.01, cast=float)
+# Links stored after the filter was built are checked in Mongo; rebuild once it is this old
+KNOWN_LINKS_FILTER_MAX_AGE_HOURS = config('KNOWN_LINKS_FILTER_MAX_AGE_HOURS', default=24, cast=float)
+NEAR_DUPLICATE_MAX_DISTANCE = config('NEAR_DUPLICATE_MAX_DISTANCE', default=6, cast=int)
+# Chunked embedding of long article bodies (window/overlap in approximate tokens)
+EMBED_CHUNK_TOKENS = config('EMBED_CHUNK_TOKENS', default=256, cast=int)
+EMBED_CHUNK_OVERLAP = config('EMBED_CHUNK_OVERLAP', default=32, cast=int)
+EMBED_MAX_CHUNKS = config('EMBED_MAX_CHUNKS', default=64, cast=int)
+EMBED_CHUNK_BATCH_SIZE = config('EMBED_CHUNK_BATCH_SIZE', default=16, cast=int)
+EMBED_CHUNK_WORKERS = config('EMBED_CHUNK_WORKERS', default=4, cast=int)
+EMBED_CHUNK_TIMEOUT = config('EMBED_CHUNK_TIMEOUT', default=20, cast=int)
+EMBED_STORE_PASSAGES = config('EMBED_STORE_PASSAGES', default=False, cast=bool)
+# Buffered search history (flushed by search.tasks.tasks.flush_search_history)
+SEARCH_HISTORY_FLUSH_BATCH = config('SEARCH_HISTORY_FLUSH_BATCH', default=500, cast=int)
+SEARCH_HISTORY_BUFFER_MAX = config('SEARCH_HISTORY_BUFFER_MAX', default=100000, cast=int)
+# User typeahead (search/services/typeahead_services.py)
+USER_TYPEAHEAD_LIMIT = config('USER_TYPEAHEAD_LIMIT', default=8, cast=int)
+USER_TYPEAHEAD_CACHE_TTL = config('USER_TYPEAHEAD_CACHE_TTL', default=60, cast=int)
+# Semantic search result cache (keyed by result generation + normalized query)
+SEARCH_RESULT_CACHE_TTL = config('SEARCH_RESULT_CACHE_TTL', default=600, cast=int)
+# Article vector indexes follow a Redis change log instead of rebuilding on every write:
+# each process polls it at most every SEARCH_INDEX_REFRESH_INTERVAL seconds and
+# rebuilds only when entries it never applied were trimmed (SEARCH_INDEX_CHANGES_MAX kept)
+SEARCH_INDEX_REFRESH_INTERVAL = config('SEARCH_INDEX_REFRESH_INTERVAL', default=1.0, cast=float)
+SEARCH_INDEX_CHANGES_MAX = config('SEARCH_INDEX_CHANGES_MAX', default=100000, cast=int)
+SEARCH_INDEX_CHANGES_BATCH = config('SEARCH_INDEX_CHANGES_BATCH', default=1000, cast=int)
+# Search history retention
+SEARCH_HISTORY_MAX_PER_USER = config('SEARCH_HISTORY_MAX_PER_USER', default=200, cast=int)
+SEARCH_HISTORY_TTL_DAYS = config('SEARCH_HISTORY_TTL_DAYS', default=30, cast=int)
+# Popular-query suggestions (search/utils/suggestions.py)
+SEARCH_SUGGEST_HALF_LIFE_HOURS = config('SEARCH_SUGGEST_HALF_LIFE_HOURS', default=72, cast=float)
+SEARCH_SUGGEST_MAX_PREFIX = config('SEARCH_SUGGEST_MAX_PREFIX', default=20, cast=int)
+SEARCH_SUGGEST_KEEP = config('SEARCH_SUGGEST_KEEP', default=100, cast=int)
+# A query is suggested only while its decayed search count is at least SEARCH_SUGGEST_MIN_COUNT
+# (a search made now counts 1, one made a half-life ago 0.5) and SEARCH_SUGGEST_MIN_USERS
+# distinct users have searched for it
+SEARCH_SUGGEST_MIN_COUNT = config('SEARCH_SUGGEST_MIN_COUNT', default=2, cast=float)
+SEARCH_SUGGEST_MIN_USERS = config('SEARCH_SUGGEST_MIN_USERS', default=3, cast=int)
+# Hybrid article search (search/services/search_services.py)
+SEARCH_EMBED_TIMEOUT = config('SEARCH_EMBED_TIMEOUT', default=3.0, cast=float)
+SEARCH_LEXICAL_WEIGHT = config('SEARCH_LEXICAL_WEIGHT', default=0.3, cast=float)
+# Sharded vector search (search/utils/shards.py); 0 keeps the index in-process.
+# Workers are started with `python manage.py run_search_shards`.
+SEARCH_SHARDS = config('SEARCH_SHARDS', default=0, cast=int)
+SEARCH_SHARD_SOCKET_DIR = config('SEARCH_SHARD_SOCKET_DIR', default='/tmp/itech-search')
+SEARCH_SHARD_TIMEOUT = config('SEARCH_SHARD_TIMEOUT', default=2.0, cast=float)
+# Comment pagination (initial socket payload, load_comments / load_replies, REST list)
+COMMENTS_PAGE_SIZE = config('COMMENTS_PAGE_SIZE', default=20, cast=int)
+COMMENTS_PAGE_MAX = config('COMMENTS_PAGE_MAX', default=100, cast=int)
+# Comment room fan-out: events are bundled per room for COMMENTS_ROOM_BATCH_WINDOW
+# seconds (0 sends each event at once); a socket with more than
+# COMMENTS_SOCKET_MAX_PENDING unsent events is told to resync instead.
+COMMENTS_ROOM_BATCH_WINDOW = config('COMMENTS_ROOM_BATCH_WINDOW', default=0.25, cast=float)
+COMMENTS_ROOM_BATCH_MAX = config('COMMENTS_ROOM_BATCH_MAX', default=1000, cast=int)
+COMMENTS_SOCKET_MAX_PENDING = config('COMMENTS_SOCKET_MAX_PENDING', default=200, cast=int)
+# Notification inbox pagination (socket and notifications/ REST endpoint)
+NOTIFICATIONS_PAGE_SIZE = config('NOTIFICATIONS_PAGE_SIZE', default=20, cast=int)
+NOTIFICATIONS_PAGE_MAX = config('NOTIFICATIONS_PAGE_MAX', default=100, cast=int)
+# New-article notification fan-out (articles.tasks.tasks.fan_out_article_notifications)
+ARTICLE_FANOUT_CHUNK_SIZE = config('ARTICLE_FANOUT_CHUNK_SIZE', default=1000, cast=int)
+# Fan-outs queued per run of the dispatch-article-fan-outs beat task
+ARTICLE_FANOUT_DISPATCH_BATCH = config('ARTICLE_FANOUT_DISPATCH_BATCH', default=100, cast=int)
+# Authors with at least this many followers get one author_activity record per
+# article, merged into followers' feeds at read time, instead of per-follower notifications
+NOTIFICATIONS_FANOUT_READ_THRESHOLD = config('NOTIFICATIONS_FANOUT_READ_THRESHOLD', default=10000, cast=int)
+# Shared secret the crawler sends as X-Ingest-Token to articles/ingest/ (empty: staff only)
+INGEST_API_TOKEN = config('INGEST_API_TOKEN', default='')
@@ -11,6 +11,7 @@ urlpatterns = [
     path('profiles/', include('profiles.api.urls')),
     path('articles/', include('articles.api.urls')),
     path('comments/', include('comments.api.urls')),
+    path('notifications/', include('notifications.api.urls')),
     path('following/', include('following.api.urls')),
     path('feedback/', include('feedback.api.urls')),
     path('report/', include('report.api.urls')),
@@ -0,0 +1,6 @@
+from django.urls import path
+from ..views.notification_views import NotificationListView
+
+urlpatterns = [
+    path('', NotificationListView.as_view(), name='notification-list'),
+]
@@ -3,14 +3,17 @@ from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 import logging
 import datetime
-from bson import ObjectId
 
-from config.mongo_utils import get_collection
-from django.contrib.auth.models import User
-from profiles.models import Profile
+from iTech import settings
+from notifications.repositories import async_notification_repository
+from notifications.services.notification_services import (
+    actor_ids,
+    enrich_notification,
+    enrich_notifications,
+    get_actors,
+)
 
 logger = logging.getLogger(__name__)
-notifications_collection = get_collection("notifications")
 
 
 class NotificationConsumer(AsyncWebsocketConsumer):
@@ -61,6 +64,8 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             
             if message_type == 'get_notifications':
                 await self.send_initial_notifications()
+            elif message_type == 'load_notifications':
+                await self.send_notifications_page("notifications_page", data.get('cursor'))
             elif message_type == 'mark_read':
                 notification_id = data.get('notification_id')
                 if notification_id:
@@ -75,35 +80,41 @@ class NotificationConsumer(AsyncWebsocketConsumer):
 
     async def send_initial_notifications(self):
         """
-        Fetches all notifications for the user from MongoDB, enriches them,
-        and sends them as a single initial payload.
+        Sends the newest page of the user's notifications, enriched with
+        their actors in one query. Older pages are requested with
+        {"type": "load_notifications", "cursor": next_cursor}.
         """
         try:
-            user_notifications = await self._get_user_notifications_from_db(self.user.id)
-            enriched_notifications = []
-            for notif in user_notifications:
-                enriched_data = await self._enrich_notification(notif)
-                if enriched_data:
-                    enriched_notifications.append(enriched_data)
-            
-            initial_payload = {
-                "type": "notifications_list",
-                "notifications": enriched_notifications,
-                "created_at": datetime.datetime.now().isoformat()
-            }
-
-            await self.send(text_data=json.dumps(initial_payload))
+            enriched_notifications = await self.send_notifications_page("notifications_list")
             logger.info(f"Sent {len(enriched_notifications)} initial notifications to {self.user.username}")
 
         except Exception as e:
             logger.error(f"Error sending initial notifications to {self.user.username}: {e}", exc_info=True)
 
+    async def send_notifications_page(self, message_type, cursor=None):
+        try:
+            user_notifications, next_cursor = await async_notification_repository.page_for_user(
+                self.user.id, settings.NOTIFICATIONS_PAGE_SIZE, cursor
+            )
+        except ValueError:
+            await self.send(text_data=json.dumps({"type": "error", "message": "Invalid cursor"}))
+            return []
+        enriched_notifications = await self._enrich_notifications(user_notifications)
+
+        await self.send(text_data=json.dumps({
+            "type": message_type,
+            "notifications": enriched_notifications,
+            "next_cursor": next_cursor,
+            "created_at": datetime.datetime.now().isoformat()
+        }))
+        return enriched_notifications
+
     async def mark_notification_as_read(self, notification_id):
         """
         Mark a specific notification as read
         """
         try:
-            await self._mark_notification_read_in_db(notification_id)
+            await async_notification_repository.mark_read(self.user.id, notification_id)
             
             # Send confirmation back to client
             response = {
@@ -122,7 +133,7 @@ class NotificationConsumer(AsyncWebsocketConsumer):
         Mark all notifications as read for the user
         """
         try:
-            await self._mark_all_notifications_read_in_db(self.user.id)
+            await async_notification_repository.mark_all_read(self.user.id)
             
             # Send confirmation back to client
             response = {
@@ -136,111 +147,22 @@ class NotificationConsumer(AsyncWebsocketConsumer):
         except Exception as e:
             logger.error(f"Error marking all notifications as read: {e}", exc_info=True)
 
-    def _serialize_target(self, target):
-        """
-        Serialize target field, handling both ObjectId and complex objects.
-        """
-        if target is None:
-            return None
-        
-        if isinstance(target, dict):
-            # برای نوتیفیکیشن‌های like که target یک object است
-            serialized_target = {}
-            for key, value in target.items():
-                if isinstance(value, ObjectId):
-                    serialized_target[key] = str(value)
-                else:
-                    serialized_target[key] = value
-            return serialized_target
-        elif isinstance(target, ObjectId):
-            # برای نوتیفیکیشن‌های ساده که target یک ObjectId است
-            return str(target)
-        else:
-            # برای سایر انواع
-            return target
+    async def _enrich_notifications(self, notifications):
+        """Enrich a list of notifications, loading all actors in one query."""
+        actors = await self._get_actors(actor_ids(notifications))
+        return enrich_notifications(notifications, actors)
 
-    async def _enrich_notification(self, notification):
+    async def _enrich_notification(self, notification, actors=None):
         """
         Enriches a notification with actor's username and profile image.
         """
-        actor_id = notification.get("actor_id")
-        if not actor_id:
-            return None
-
-        actor_user = await self._get_user_instance(actor_id)
-        actor_profile = await self._get_profile_instance(actor_id)
-        
-        actor_username = actor_user.username if actor_user else "Unknown User"
-        actor_profile_img = actor_profile.profile_picture.url if actor_profile and actor_profile.profile_picture else None
-
-        created_at_dt = notification.get("created_at")
-        created_at_iso = created_at_dt.isoformat() if isinstance(created_at_dt, datetime.datetime) else str(created_at_dt)
-
-        # Serialize target field properly
-        target_serialized = self._serialize_target(notification.get("target"))
-
-        # Reconstruct the payload to match the desired format
-        return {
-            "notification_id": str(notification.get("_id")),
-            "user_id": notification.get("user_id"),
-            "type": notification.get("type"),
-            "actor_id": actor_id,
-            "actor_username": actor_username,
-            "actor_profile_img": actor_profile_img,
-            "target_id": target_serialized,  # استفاده از target serialize شده
-            "created_at": created_at_iso,
-            "read": notification.get("is_read", False),
-            "is_mutual_follow": notification.get("is_mutual_follow", False),
-            "extra_data": notification.get("extra_data", {})
-        }
-
-    @database_sync_to_async
-    def _get_user_notifications_from_db(self, user_id):
-        return list(notifications_collection.find({"user_id": user_id}).sort("created_at", -1))
+        if actors is None:
+            actors = await self._get_actors(actor_ids([notification]))
+        return enrich_notification(notification, actors)
 
     @database_sync_to_async
-    def _get_user_instance(self, user_id):
-        try:
-            return User.objects.get(id=user_id)
-        except User.DoesNotExist:
-            return None
-
-    @database_sync_to_async
-    def _get_profile_instance(self, user_id):
-        try:
-            return Profile.objects.select_related('user').get(user_id=user_id)
-        except Profile.DoesNotExist:
-            return None
-
-    @database_sync_to_async
-    def _mark_notification_read_in_db(self, notification_id):
-        """
-        Mark a notification as read in MongoDB
-        """
-        try:
-            result = notifications_collection.update_one(
-                {"_id": ObjectId(notification_id)},
-                {"$set": {"is_read": True}}
-            )
-            return result.modified_count > 0
-        except Exception as e:
-            logger.error(f"Error updating notification in DB: {e}")
-            return False
-
-    @database_sync_to_async
-    def _mark_all_notifications_read_in_db(self, user_id):
-        """
-        Mark all notifications as read for a user in MongoDB
-        """
-        try:
-            result = notifications_collection.update_many(
-                {"user_id": user_id, "is_read": False},
-                {"$set": {"is_read": True}}
-            )
-            return result.modified_count
-        except Exception as e:
-            logger.error(f"Error updating notifications in DB: {e}")
-            return 0
+    def _get_actors(self, user_ids):
+        return get_actors(user_ids)
 
     async def send_notification(self, event):
         """
@@ -5,13 +5,11 @@ import logging
 import datetime
 from bson import ObjectId
 
-from config.mongo_utils import get_collection
 from django.contrib.auth.models import User
-from profiles.models import Profile
+from notifications.repositories import async_notification_repository
 from following.models import Follow
 
 logger = logging.getLogger(__name__)
-notifications_collection = get_collection("notifications")
 
 
 class GroupNotificationConsumer(AsyncWebsocketConsumer):
@@ -29,8 +27,9 @@ class GroupNotificationConsumer(AsyncWebsocketConsumer):
         await self.accept()
         logger.info(f"User {self.user.username} connected to the main article feed.")
         
-        # Get all authors the user is following
-        self.followed_authors_ids = await self.get_followed_authors(self.user.id)
+        # Get all authors the user is following, with when each follow began
+        self.followed_since = await self.get_followed_authors(self.user.id)
+        self.followed_authors_ids = list(self.followed_since)
         
         # Subscribe to the feed of each followed author
         for author_id in self.followed_authors_ids:
@@ -57,16 +56,11 @@ class GroupNotificationConsumer(AsyncWebsocketConsumer):
         if not self.followed_authors_ids:
             return
 
-        initial_notifications = await self._get_initial_notifications_from_db(
+        initial_notifications = await async_notification_repository.list_feed(
             follower_id=self.user.id,
-            author_ids=self.followed_authors_ids
+            followed_since=self.followed_since
         )
-        
-        enriched_notifications = []
-        for notif in initial_notifications:
-            enriched_data = await self._enrich_notification(notif)
-            if enriched_data:
-                enriched_notifications.append(enriched_data)
+        enriched_notifications = await self._enrich_notifications(initial_notifications)
 
         initial_payload = {
             "type": "initial_article_feed",
@@ -108,7 +102,13 @@ class GroupNotificationConsumer(AsyncWebsocketConsumer):
                 serialized[key] = value
         return serialized
 
-    async def _enrich_notification(self, notification):
+    async def _enrich_notifications(self, notifications):
+        """Enrich a list of notifications, loading all actors in one query."""
+        actors = await self._get_actors({n.get("actor_id") for n in notifications if n.get("actor_id")})
+        enriched = [await self._enrich_notification(notif, actors) for notif in notifications]
+        return [data for data in enriched if data]
+
+    async def _enrich_notification(self, notification, actors=None):
         """
         Enriches a notification from the DB with details like actor username/profile.
         """
@@ -116,11 +116,9 @@ class GroupNotificationConsumer(AsyncWebsocketConsumer):
         if not actor_id:
             return None
 
-        actor_user = await self._get_user_instance(actor_id)
-        actor_profile = await self._get_profile_instance(actor_id)
-        
-        actor_username = actor_user.username if actor_user else "Unknown User"
-        actor_profile_img = actor_profile.profile_picture.url if actor_profile and actor_profile.profile_picture else None
+        if actors is None:
+            actors = await self._get_actors([actor_id])
+        actor_username, actor_profile_img = actors.get(actor_id, ("Unknown User", None))
 
         created_at_dt = notification.get("created_at")
         created_at_iso = created_at_dt.isoformat() if isinstance(created_at_dt, datetime.datetime) else str(created_at_dt)
@@ -138,29 +136,16 @@ class GroupNotificationConsumer(AsyncWebsocketConsumer):
             "extra_data": notification.get("extra_data", {})
         }
 
-    @database_sync_to_async
-    def _get_initial_notifications_from_db(self, follower_id, author_ids):
-        return list(notifications_collection.find({
-            "type": "new_article",
-            "user_id": follower_id,
-            "actor_id": {"$in": author_ids} # Find articles from all followed authors
-        }).sort("created_at", -1).limit(50))
-
     @database_sync_to_async
     def get_followed_authors(self, user_id):
-        """Returns a list of IDs of users that the given user_id is following."""
-        return list(Follow.objects.filter(follower_id=user_id).values_list('followed_id', flat=True))
+        """Returns {followed user id: follow created_at} for the users that user_id is following."""
+        return dict(Follow.objects.filter(follower_id=user_id).values_list('followed_id', 'created_at'))
 
     @database_sync_to_async
-    def _get_user_instance(self, user_id):
-        try:
-            return User.objects.get(id=user_id)
-        except User.DoesNotExist:
-            return None
-
-    @database_sync_to_async
-    def _get_profile_instance(self, user_id):
-        try:
-            return Profile.objects.select_related('user').get(user_id=user_id)
-        except Profile.DoesNotExist:
-            return None
+    def _get_actors(self, user_ids):
+        """{user_id: (username, profile picture url)} in one query."""
+        actors = {}
+        for user in User.objects.filter(id__in=user_ids).select_related('profile'):
+            profile = getattr(user, 'profile', None)
+            actors[user.id] = (user.username, profile.profile_picture.url if profile and profile.profile_picture else None)
+        return actors
@@ -0,0 +1,236 @@
+import asyncio
+import datetime
+import heapq
+import logging
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+from channels.db import database_sync_to_async
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from config.mongo_utils import get_collection, get_async_collection, keyset_filter, split_page
+from following.models import Follow
+
+logger = logging.getLogger(__name__)
+
+INBOX_INDEX = [('user_id', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)]
+ACTIVITY_INDEX = [('author_id', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)]
+# One 'new_article' notification per follower and article, so fan-out retries cannot duplicate
+NEW_ARTICLE_INDEX = [('user_id', ASCENDING), ('target.article_id', ASCENDING)]
+NEWEST_FIRST = [('created_at', DESCENDING), ('_id', DESCENDING)]
+# Activity ids a follower marked read one by one; older ones are covered by read_before
+ACTIVITY_READ_IDS_MAX = 1000
+
+
+def inbox_query(user_id: int, cursor: Optional[str] = None) -> Dict:
+    """Notifications of `user_id` older than `cursor`; raises ValueError for a bad cursor."""
+    return {'user_id': user_id, **keyset_filter(cursor)}
+
+
+class NotificationRepository:
+    """Notification reads for the REST services (blocking pymongo)."""
+
+    def __init__(self, collection):
+        self.collection = collection
+        try:
+            self.collection.create_index(INBOX_INDEX, name='user_id_1_created_at_-1__id_-1')
+            self.collection.create_index(
+                NEW_ARTICLE_INDEX,
+                name='user_id_1_target.article_id_1_new_article',
+                unique=True,
+                partialFilterExpression={'type': 'new_article'}
+            )
+        except Exception as e:
+            logger.error(f"Failed to ensure notification indexes: {str(e)}")
+
+    def page_for_user(self, user_id: int, limit: int, cursor: Optional[str] = None):
+        notifications = list(self.collection.find(inbox_query(user_id, cursor)).sort(NEWEST_FIRST).limit(limit + 1))
+        return split_page(notifications, limit)
+
+    def add_new_article_notifications(self, notifications: List[Dict]) -> int:
+        """
+        Insert 'new_article' notifications unless the follower already has
+        one for that article; safe to repeat for a retried or redelivered
+        chunk. Returns how many were inserted.
+        """
+        operations = [
+            UpdateOne(
+                {
+                    'user_id': notification['user_id'],
+                    'type': 'new_article',
+                    'target.type': 'new_article',
+                    'target.article_id': notification['target']['article_id']
+                },
+                {'$setOnInsert': {
+                    key: value for key, value in notification.items() if key not in ('user_id', 'type', 'target')
+                }},
+                upsert=True
+            )
+            for notification in notifications
+        ]
+        if not operations:
+            return 0
+        try:
+            return self.collection.bulk_write(operations, ordered=False).upserted_count
+        except BulkWriteError as e:
+            # Two writers upserting the same follower at once: the unique index rejects the second
+            if any(error.get('code') != 11000 for error in e.details.get('writeErrors', [])):
+                raise
+            return e.details.get('nUpserted', 0)
+
+
+def activity_is_read(activity_id: ObjectId, read_state: Optional[Dict]) -> bool:
+    """
+    Whether a follower has read an author_activity record. `read_state` is
+    their author_activity_reads document: mark_all_read moves the
+    read_before watermark (an ObjectId, so it orders with activity ids
+    whatever the clocks' time zones), mark_read adds single ids.
+    """
+    if not read_state:
+        return False
+    read_before = read_state.get('read_before')
+    return (read_before is not None and activity_id <= read_before) or activity_id in read_state.get('read_ids', [])
+
+
+def activity_query(followed_since: Dict[int, datetime.datetime], author_ids: List[int]) -> Dict:
+    """
+    author_activity records of `author_ids` each written since the follower
+    began following that author; one clause per author, so pass only the
+    followed authors that have activity records.
+    """
+    return {'$or': [{'author_id': author_id, 'created_at': {'$gte': followed_since[author_id]}} for author_id in author_ids]}
+
+
+def activity_as_notification(activity: Dict, follower_id: int, read_state: Optional[Dict] = None) -> Dict:
+    """An author_activity record in the shape of that follower's inbox notification."""
+    return {
+        '_id': activity['_id'],
+        'user_id': follower_id,
+        'type': activity['type'],
+        'actor_id': activity['author_id'],
+        'target': activity['target'],
+        'created_at': activity['created_at'],
+        'is_read': activity_is_read(activity['_id'], read_state),
+        'extra_data': activity.get('extra_data', {})
+    }
+
+
+class AuthorActivityRepository:
+    """
+    Fan-out-on-read for authors with at least NOTIFICATIONS_FANOUT_READ_THRESHOLD
+    followers: one record per article in `author_activity` instead of one
+    inbox notification per follower. Followers' feeds merge these records
+    in when they are read (see AsyncNotificationRepository.list_feed).
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+        try:
+            self.collection.create_index(ACTIVITY_INDEX, name='author_id_1_created_at_-1__id_-1')
+        except Exception as e:
+            logger.error(f"Failed to ensure author activity indexes: {str(e)}")
+
+    def record(self, author_id: int, activity_type: str, target: Dict, created_at, extra_data: Dict) -> ObjectId:
+        return self.collection.insert_one({
+            'author_id': author_id,
+            'type': activity_type,
+            'target': target,
+            'created_at': created_at,
+            'extra_data': extra_data
+        }).inserted_id
+
+
+class AsyncNotificationRepository:
+    """Non-blocking notification reads and read-state updates for Channels consumers."""
+
+    @staticmethod
+    def _collection():
+        return get_async_collection('notifications')
+
+    async def page_for_user(self, user_id: int, limit: int, cursor: Optional[str] = None):
+        """One page of the inbox, newest first, and the cursor of the next page."""
+        cursor = self._collection().find(inbox_query(user_id, cursor)).sort(NEWEST_FIRST).limit(limit + 1)
+        return split_page(await cursor.to_list(None), limit)
+
+    @staticmethod
+    def _activity_reads():
+        return get_async_collection('author_activity_reads')
+
+    async def list_feed(self, follower_id: int, followed_since: Dict[int, datetime.datetime], limit: int = 50) -> List[Dict]:
+        """
+        'new_article' notifications of `follower_id` from the authors in
+        `followed_since` ({author_id: Follow.created_at}), newest first: the
+        follower's own inbox entries merged with the author_activity records
+        of high-follower authors written since the follow began, with the
+        follower's read state.
+        """
+        if not followed_since:
+            return []
+        inbox = self._collection().find({
+            'type': 'new_article',
+            'user_id': follower_id,
+            'actor_id': {'$in': list(followed_since)}
+        }).sort(NEWEST_FIRST).limit(limit)
+        # Only the few high-follower authors have activity records; one covered index walk finds them
+        activity_authors = await get_async_collection('author_activity').distinct(
+            'author_id', {'author_id': {'$in': list(followed_since)}}
+        )
+        if not activity_authors:
+            return await inbox.to_list(None)
+        activity = get_async_collection('author_activity').find(
+            activity_query(followed_since, activity_authors)
+        ).sort(NEWEST_FIRST).limit(limit)
+
+        notifications, activities, read_state = await asyncio.gather(
+            inbox.to_list(None), activity.to_list(None), self._activity_reads().find_one({'_id': follower_id})
+        )
+        merged = notifications + [activity_as_notification(record, follower_id, read_state) for record in activities]
+        return heapq.nlargest(limit, merged, key=lambda n: (n['created_at'], n['_id']))
+
+    async def mark_read(self, user_id: int, notification_id: str) -> bool:
+        """Mark one of the user's inbox notifications, or an author_activity record of their feed, as read."""
+        notification_id = ObjectId(notification_id)
+        result = await self._collection().update_one(
+            {'_id': notification_id, 'user_id': user_id},
+            {'$set': {'is_read': True}}
+        )
+        if result.matched_count:
+            return result.modified_count > 0
+
+        activity = await get_async_collection('author_activity').find_one(
+            {'_id': notification_id}, {'author_id': 1, 'created_at': 1}
+        )
+        # Only records that are in the user's feed: authors they follow, written since the follow began
+        if not activity or not await self._follows(user_id, activity['author_id'], activity['created_at']):
+            return False
+        await self._activity_reads().update_one(
+            {'_id': user_id},
+            {'$push': {'read_ids': {'$each': [notification_id], '$slice': -ACTIVITY_READ_IDS_MAX}}},
+            upsert=True
+        )
+        return True
+
+    @staticmethod
+    @database_sync_to_async
+    def _follows(user_id: int, author_id: int, since: datetime.datetime) -> bool:
+        return Follow.objects.filter(follower_id=user_id, followed_id=author_id, created_at__lte=since).exists()
+
+    async def mark_all_read(self, user_id: int) -> int:
+        """Mark the user's inbox read and move their author_activity watermark to now."""
+        result = await self._collection().update_many(
+            {'user_id': user_id, 'is_read': False},
+            {'$set': {'is_read': True}}
+        )
+        # Every id marked one by one so far is older than the new watermark
+        await self._activity_reads().update_one(
+            {'_id': user_id},
+            {'$max': {'read_before': ObjectId()}, '$set': {'read_ids': []}},
+            upsert=True
+        )
+        return result.modified_count
+
+
+notification_repository = NotificationRepository(get_collection('notifications'))
+author_activity_repository = AuthorActivityRepository(get_collection('author_activity'))
+async_notification_repository = AsyncNotificationRepository()
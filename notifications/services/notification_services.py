@@ -0,0 +1,90 @@
+import datetime
+import logging
+
+from bson import ObjectId
+from django.contrib.auth.models import User
+
+from iTech import settings
+from notifications.repositories import notification_repository
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN_ACTOR = ("Unknown User", None)
+
+
+def get_actors(user_ids):
+    """{user_id: (username, profile picture url)} in one query."""
+    actors = {}
+    for user in User.objects.filter(id__in=set(user_ids)).select_related('profile'):
+        profile = getattr(user, 'profile', None)
+        actors[user.id] = (user.username, profile.profile_picture.url if profile and profile.profile_picture else None)
+    return actors
+
+
+def serialize_target(target):
+    """
+    Serialize target field, handling both ObjectId and complex objects.
+    """
+    if isinstance(target, dict):
+        # برای نوتیفیکیشن‌های like که target یک object است
+        return {key: serialize_target(value) for key, value in target.items()}
+    if isinstance(target, ObjectId):
+        # برای نوتیفیکیشن‌های ساده که target یک ObjectId است
+        return str(target)
+    return target
+
+
+def enrich_notification(notification, actors):
+    """
+    Client payload for a notification with the actor's username and
+    profile image from `actors` (see get_actors); None without an actor.
+    """
+    actor_id = notification.get("actor_id")
+    if not actor_id:
+        return None
+    actor_username, actor_profile_img = actors.get(actor_id, UNKNOWN_ACTOR)
+
+    created_at_dt = notification.get("created_at")
+    created_at_iso = created_at_dt.isoformat() if isinstance(created_at_dt, datetime.datetime) else str(created_at_dt)
+
+    return {
+        "notification_id": str(notification.get("_id")),
+        "user_id": notification.get("user_id"),
+        "type": notification.get("type"),
+        "actor_id": actor_id,
+        "actor_username": actor_username,
+        "actor_profile_img": actor_profile_img,
+        "target_id": serialize_target(notification.get("target")),
+        "created_at": created_at_iso,
+        "read": notification.get("is_read", False),
+        "is_mutual_follow": notification.get("is_mutual_follow", False),
+        "extra_data": notification.get("extra_data", {})
+    }
+
+
+def actor_ids(notifications):
+    return {n.get("actor_id") for n in notifications if n.get("actor_id")}
+
+
+def enrich_notifications(notifications, actors):
+    enriched = (enrich_notification(notification, actors) for notification in notifications)
+    return [data for data in enriched if data]
+
+
+def page_size(limit):
+    """Requested page size, defaulting to NOTIFICATIONS_PAGE_SIZE and capped at NOTIFICATIONS_PAGE_MAX."""
+    if limit is None:
+        return settings.NOTIFICATIONS_PAGE_SIZE
+    return max(1, min(int(limit), settings.NOTIFICATIONS_PAGE_MAX))
+
+
+def list_notifications_service(user_id, cursor=None, limit=None):
+    """
+    One page of the user's inbox, newest first, with actors loaded in one
+    query. Raises ValueError for a bad cursor or limit.
+    """
+    notifications, next_cursor = notification_repository.page_for_user(user_id, page_size(limit), cursor)
+    return {
+        "notifications": enrich_notifications(notifications, get_actors(actor_ids(notifications))),
+        "next_cursor": next_cursor
+    }
@@ -0,0 +1,131 @@
+import datetime
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from bson import ObjectId
+from django.test import SimpleTestCase
+from pymongo.errors import BulkWriteError
+
+from notifications.repositories import (
+    ACTIVITY_READ_IDS_MAX,
+    AsyncNotificationRepository,
+    NotificationRepository,
+    activity_is_read,
+    activity_query,
+)
+
+
+class NewArticleNotificationTests(SimpleTestCase):
+
+    def setUp(self):
+        self.collection = mock.Mock()
+        self.repository = NotificationRepository(self.collection)
+        self.article_id = ObjectId()
+        self.notifications = [
+            {'user_id': follower_id, 'type': 'new_article', 'actor_id': 7,
+             'target': {'type': 'new_article', 'article_id': self.article_id}, 'is_read': False}
+            for follower_id in (10, 11)
+        ]
+
+    def test_notifications_are_upserted_once_per_follower_and_article(self):
+        self.collection.bulk_write.return_value.upserted_count = 2
+        self.assertEqual(self.repository.add_new_article_notifications(self.notifications), 2)
+        operations = self.collection.bulk_write.call_args[0][0]
+        self.assertEqual(operations[0]._filter, {
+            'user_id': 10, 'type': 'new_article', 'target.type': 'new_article', 'target.article_id': self.article_id
+        })
+        self.assertEqual(operations[0]._doc, {'$setOnInsert': {'actor_id': 7, 'is_read': False}})
+        self.assertTrue(operations[0]._upsert)
+
+    def test_racing_duplicates_are_tolerated(self):
+        self.collection.bulk_write.side_effect = BulkWriteError({
+            'writeErrors': [{'index': 1, 'code': 11000, 'errmsg': 'duplicate key'}], 'nUpserted': 1
+        })
+        self.assertEqual(self.repository.add_new_article_notifications(self.notifications), 1)
+
+    def test_other_write_errors_are_raised(self):
+        self.collection.bulk_write.side_effect = BulkWriteError({
+            'writeErrors': [{'index': 0, 'code': 121, 'errmsg': 'validation failed'}], 'nUpserted': 0
+        })
+        with self.assertRaises(BulkWriteError):
+            self.repository.add_new_article_notifications(self.notifications)
+
+
+def cursor_of(documents):
+    cursor = mock.Mock()
+    cursor.sort.return_value.limit.return_value.to_list = mock.AsyncMock(return_value=documents)
+    return cursor
+
+
+class FollowerFeedTests(SimpleTestCase):
+
+    def setUp(self):
+        self.collections = {name: mock.Mock() for name in ('notifications', 'author_activity', 'author_activity_reads')}
+        patcher = mock.patch('notifications.repositories.get_async_collection', side_effect=self.collections.get)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.repository = AsyncNotificationRepository()
+        self.followed_at = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+
+    def activity(self, author_id, days):
+        return {'_id': ObjectId(), 'author_id': author_id, 'type': 'new_article',
+                'target': {'type': 'new_article', 'article_id': ObjectId()},
+                'created_at': self.followed_at + datetime.timedelta(days=days)}
+
+    def test_activity_from_before_each_follow_is_excluded(self):
+        followed_since = {7: self.followed_at, 8: self.followed_at - datetime.timedelta(days=30), 9: self.followed_at}
+        self.assertEqual(activity_query(followed_since, [7, 8]), {'$or': [
+            {'author_id': 7, 'created_at': {'$gte': self.followed_at}},
+            {'author_id': 8, 'created_at': {'$gte': self.followed_at - datetime.timedelta(days=30)}},
+        ]})
+
+    def test_feed_queries_activity_only_of_authors_that_have_some(self):
+        record = self.activity(7, 1)
+        inbox_notification = {'_id': ObjectId(), 'user_id': 3, 'is_read': False, 'created_at': self.followed_at}
+        self.collections['notifications'].find.return_value = cursor_of([inbox_notification])
+        self.collections['author_activity'].distinct = mock.AsyncMock(return_value=[7])
+        self.collections['author_activity'].find.return_value = cursor_of([record])
+        self.collections['author_activity_reads'].find_one = mock.AsyncMock(return_value={'read_ids': [record['_id']]})
+
+        feed = async_to_sync(self.repository.list_feed)(3, {7: self.followed_at, 8: self.followed_at})
+
+        self.collections['author_activity'].find.assert_called_once_with(
+            {'$or': [{'author_id': 7, 'created_at': {'$gte': self.followed_at}}]}
+        )
+        self.assertEqual([(n['_id'], n['is_read']) for n in feed],
+                         [(record['_id'], True), (inbox_notification['_id'], False)])
+
+    def test_feed_without_activity_authors_skips_the_activity_query(self):
+        self.collections['notifications'].find.return_value = cursor_of([])
+        self.collections['author_activity'].distinct = mock.AsyncMock(return_value=[])
+        self.assertEqual(async_to_sync(self.repository.list_feed)(3, {8: self.followed_at}), [])
+        self.collections['author_activity'].find.assert_not_called()
+
+    def test_read_before_watermark_and_read_ids_slice_both_mark_activity_read(self):
+        older, marked, newer = ObjectId(), ObjectId(), ObjectId()
+        read_state = {'read_before': older, 'read_ids': [marked]}
+        self.assertTrue(activity_is_read(older, read_state))
+        self.assertTrue(activity_is_read(marked, read_state))
+        self.assertFalse(activity_is_read(newer, read_state))
+        self.assertFalse(activity_is_read(older, None))
+
+    def mark_read(self, activity, follows):
+        self.collections['notifications'].update_one = mock.AsyncMock(return_value=mock.Mock(matched_count=0))
+        self.collections['author_activity'].find_one = mock.AsyncMock(return_value=activity)
+        self.collections['author_activity_reads'].update_one = mock.AsyncMock()
+        with mock.patch.object(AsyncNotificationRepository, '_follows', mock.AsyncMock(return_value=follows)) as check:
+            marked = async_to_sync(self.repository.mark_read)(3, str(activity['_id']))
+        return marked, check, self.collections['author_activity_reads'].update_one
+
+    def test_mark_read_falls_back_to_followed_author_activity(self):
+        activity = self.activity(7, 1)
+        marked, check, reads = self.mark_read(activity, follows=True)
+        self.assertTrue(marked)
+        check.assert_awaited_once_with(3, 7, activity['created_at'])
+        self.assertEqual(reads.call_args[0][1]['$push']['read_ids'],
+                         {'$each': [activity['_id']], '$slice': -ACTIVITY_READ_IDS_MAX})
+
+    def test_mark_read_ignores_activity_of_authors_not_followed(self):
+        marked, _, reads = self.mark_read(self.activity(7, 1), follows=False)
+        self.assertFalse(marked)
+        reads.assert_not_called()
@@ -0,0 +1,25 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+
+from ..services.notification_services import list_notifications_service
+
+
+class NotificationListView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        """
+        صندوق اعلان‌های کاربر، جدیدترین اول.
+        صفحه‌بندی keyset: پارامتر limit (حداکثر NOTIFICATIONS_PAGE_MAX) و cursor که از next_cursor پاسخ قبلی می‌آید.
+        """
+        try:
+            page = list_notifications_service(
+                request.user.id, request.query_params.get('cursor'), request.query_params.get('limit')
+            )
+            return Response(page, status=status.HTTP_200_OK)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
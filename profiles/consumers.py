@@ -1,10 +1,11 @@
 from channels.generic.websocket import AsyncWebsocketConsumer
+import asyncio
 import json
 from .models import Profile
-from asgiref.sync import sync_to_async
 from django.db.models import Count
 from following.models import Follow
 from django.contrib.auth.models import User
+from articles.repositories import article_repository
 import logging
 
 # تنظیم لاگر
@@ -61,9 +62,12 @@ class ChengProfilesConsumer(AsyncWebsocketConsumer):
             profile = await self.get_user_profile(self.user_id)
             if profile:
                 # دریافت تعداد مقالات، فالوئرها و فالوئینگ‌ها
-                article_count = await self.get_user_article_count(self.user_id)
-                follower_count = await self.get_follower_count(self.user_id)
-                following_count = await self.get_following_count(self.user_id)
+                # شمارش مقالات (مونگو) هم‌زمان با شمارش‌های فالو (ORM) انجام می‌شود
+                article_count, follower_count, following_count = await asyncio.gather(
+                    self.get_user_article_count(self.user_id),
+                    self.get_follower_count(self.user_id),
+                    self.get_following_count(self.user_id)
+                )
                 
                 logger.info(f"WebSocket: Fetched profile data for user {self.user_id} - articles: {article_count}, followers: {follower_count}, following: {following_count}")
                 
@@ -110,11 +114,8 @@ class ChengProfilesConsumer(AsyncWebsocketConsumer):
     async def get_user_article_count(user_id):
         """دریافت تعداد مقالات کاربر به‌صورت async"""
         try:
-            from config.mongo_utils import get_collection
-            articles_users_collection = get_collection('articles_users')
-            # استفاده از count_documents برای شمارش مقالات کاربر
-            count = await sync_to_async(articles_users_collection.count_documents)({"userId": user_id})
-            return count
+            # شمارش مستقیم با درایور async مونگو، بدون رفت‌وبرگشت به thread pool
+            return await article_repository.count_by_user(user_id)
         except Exception as e:
             logger.error(f"WebSocket: Error counting user articles: {e}")
             return 0
@@ -123,7 +124,7 @@ class ChengProfilesConsumer(AsyncWebsocketConsumer):
     async def get_follower_count(user_id):
         """دریافت تعداد فالوئرها به‌صورت async"""
         try:
-            count = await sync_to_async(Follow.objects.filter(followed_id=user_id).count)()
+            count = await Follow.objects.filter(followed_id=user_id).acount()
             return count
         except Exception as e:
             logger.error(f"WebSocket: Error counting followers: {e}")
@@ -133,7 +134,7 @@ class ChengProfilesConsumer(AsyncWebsocketConsumer):
     async def get_following_count(user_id):
         """دریافت تعداد فالوئینگ‌ها به‌صورت async"""
         try:
-            count = await sync_to_async(Follow.objects.filter(follower_id=user_id).count)()
+            count = await Follow.objects.filter(follower_id=user_id).acount()
             return count
         except Exception as e:
             logger.error(f"WebSocket: Error counting following: {e}")
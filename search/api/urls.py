@@ -1,7 +1,10 @@
 from django.urls import path
-from ..views.search import SearchArticlesView, UserSearchHistoryView
+from ..views.search import SearchArticlesView, AsyncSearchArticlesView, UserSearchHistoryView, UserTypeaheadView, QuerySuggestionsView
 
 urlpatterns = [
     path('search/', SearchArticlesView.as_view(), name='api-search'),
+    path('search/async/', AsyncSearchArticlesView.as_view(), name='api-search-async'),
+    path('search/users/', UserTypeaheadView.as_view(), name='api-search-users'),
+    path('search/suggest/', QuerySuggestionsView.as_view(), name='api-search-suggest'),
     path('search-history/', UserSearchHistoryView.as_view(), name='api-search-history'),
 ]
@@ -0,0 +1,53 @@
+import multiprocessing
+
+import django
+from django.core.management.base import BaseCommand
+
+from iTech import settings
+from search.utils.shards import ShardServer, ShardedVectorIndex
+from search.utils.vector_index import INDEX_CLASSES
+
+
+def serve_shard(number: int, count: int, address: str):
+    # Spawned workers start from a fresh interpreter
+    django.setup()
+    indexes = {name: index_class(shard=(number, count)) for name, index_class in INDEX_CLASSES.items()}
+    ShardServer(indexes, address, settings.SECRET_KEY.encode('utf-8')).serve_forever()
+
+
+class Command(BaseCommand):
+    help = "Serve the article vector indexes as SEARCH_SHARDS worker processes on Unix sockets"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shards', type=int, default=settings.SEARCH_SHARDS,
+                            help="Total number of shards (defaults to SEARCH_SHARDS)")
+        parser.add_argument('--shard', type=int, default=None,
+                            help="Serve only this shard in the current process (e.g. one supervisor program per shard)")
+        parser.add_argument('--socket-dir', default=settings.SEARCH_SHARD_SOCKET_DIR)
+
+    def handle(self, *args, **options):
+        count = options['shards']
+        if count < 1:
+            self.stderr.write("Set SEARCH_SHARDS or pass --shards N (N >= 1)")
+            return
+        addresses = ShardedVectorIndex.socket_paths(options['socket_dir'], count)
+
+        if options['shard'] is not None:
+            serve_shard(options['shard'], count, addresses[options['shard']])
+            return
+
+        # Spawned, not forked: Mongo and Redis clients must not be shared with the parent
+        context = multiprocessing.get_context('spawn')
+        processes = [
+            context.Process(target=serve_shard, args=(number, count, addresses[number]), daemon=True)
+            for number in range(count)
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(f"Serving {count} search shards from {options['socket_dir']}")
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
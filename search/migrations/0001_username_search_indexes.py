@@ -0,0 +1,43 @@
+from django.db import migrations
+
+# Django compiles username__icontains / __istartswith on PostgreSQL to
+# UPPER("auth_user"."username"::text) LIKE UPPER(...), so both indexes are
+# built on that expression. The trigram index serves substring matches of
+# three or more characters; the text_pattern_ops index serves prefixes.
+FORWARD_SQL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS auth_user_username_upper_trgm '
+    'ON auth_user USING gin (UPPER(username::text) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS auth_user_username_upper_prefix '
+    'ON auth_user (UPPER(username::text) text_pattern_ops)',
+]
+
+REVERSE_SQL = [
+    'DROP INDEX IF EXISTS auth_user_username_upper_prefix',
+    'DROP INDEX IF EXISTS auth_user_username_upper_trgm',
+]
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for statement in FORWARD_SQL:
+        schema_editor.execute(statement)
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for statement in REVERSE_SQL:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
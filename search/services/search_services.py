@@ -0,0 +1,242 @@
+import asyncio
+import datetime
+import logging
+import os
+from typing import Dict, List, Optional
+
+import requests
+from asgiref.sync import sync_to_async
+from bson import ObjectId
+
+from articles.utils.article_utils import (
+    get_articles_counts, get_users_profile_data, get_followed_user_ids
+)
+from search.services.typeahead_services import user_typeahead_service
+from iTech import settings
+from search.utils.lexical_index import lexical_article_search
+from search.utils.result_cache import normalize_query, search_result_cache
+from search.utils.vector_index import article_vector_index, get_index_generation
+
+logger = logging.getLogger(__name__)
+base_url = os.getenv("BASE_URL")
+embed_api_url = os.getenv("EMBEDDING_SERVER_URL")
+
+DEFAULT_PROFILE_PICTURE = '/media/profile_pics/default.png'
+
+
+class SearchError(Exception):
+    """Search cannot produce article results (embedding service down, nothing indexed)."""
+
+
+class SearchService:
+    """
+    Hybrid search over crawler and user articles, followed by one batched
+    hydration pass.
+
+    A text-index lookup runs first. An exact title match is answered from it
+    without embedding the query; otherwise the lexical hits are re-ranked by
+    vector similarity and fused with it (`lexical_weight`), and the
+    full-corpus vector search only runs when they are too few to fill the
+    candidate set. If the embedding server fails or exceeds
+    SEARCH_EMBED_TIMEOUT, lexical hits are returned on their own.
+    """
+    candidate_count = 20
+    result_count = 10
+    min_similarity = 0.3
+
+    def search_users(self, query: str, limit: int = 5) -> List[Dict]:
+        """Users matching `query`, served by the indexed and cached typeahead lookup."""
+        return user_typeahead_service.search(query, limit=limit)
+
+    def embed_query(self, query: str, timeout: float = 60) -> List[float]:
+        try:
+            response = requests.post(
+                embed_api_url,
+                headers={'Content-Type': 'application/json'},
+                json={'texts': [query]},
+                timeout=timeout
+            )
+            response.raise_for_status()
+            return response.json()['embeddings'][0]
+        except Exception as e:
+            logger.error(f"Failed to get search embedding: {str(e)}")
+            raise SearchError(f"Failed to get embedding: {str(e)}")
+
+    def ranked_hits(self, query: str, category: Optional[str] = None,
+                    since: Optional[datetime.datetime] = None) -> Dict:
+        """
+        Query embedding (None when the query was not embedded) and generic
+        ranking for `query`, served from the result cache when the index
+        generation has not changed. `category` and `since` are applied in
+        both the text and the vector stage.
+        Returns {'embedding', 'hits', 'cache_hit'}; raises SearchError.
+        """
+        filters = {'category': category, 'since': since} if category or since else None
+        cached = search_result_cache.get(get_index_generation(), query, filters)
+        if cached is not None:
+            return {**cached, 'cache_hit': True}
+
+        lexical_hits = lexical_article_search.search(query, self.candidate_count, category, since)
+        normalized = normalize_query(query)
+        if lexical_hits and normalize_query(lexical_hits[0]['title'] or '') == normalized:
+            # Exact title match: no need to wait for the embedding server
+            hits = self._fuse(lexical_hits, {}, [])
+            search_result_cache.set(get_index_generation(), query, None, hits, filters)
+            return {'embedding': None, 'hits': hits, 'cache_hit': False}
+
+        try:
+            embedding = self.embed_query(query, timeout=settings.SEARCH_EMBED_TIMEOUT)
+        except SearchError:
+            if not lexical_hits:
+                raise
+            # Degraded: lexical ranking only, and not cached so the next request retries semantic search
+            return {'embedding': None, 'hits': self._fuse(lexical_hits, {}, []), 'cache_hit': False}
+
+        # The snapshot's own generation, so a ranking it computed before catching up is never read
+        generation = article_vector_index.refresh()
+        similarities = article_vector_index.similarities(embedding, [hit['article_id'] for hit in lexical_hits])
+        vector_hits = []
+        if len(lexical_hits) < self.candidate_count:
+            generation, vector_hits = self.rank_articles(embedding, category, since)
+            if vector_hits is None and not lexical_hits:
+                raise SearchError("No valid embeddings found")
+
+        hits = self._fuse(lexical_hits, similarities, vector_hits or [])
+        search_result_cache.set(generation, query, embedding, hits, filters)
+        return {'embedding': embedding, 'hits': hits, 'cache_hit': False}
+
+    def _fuse(self, lexical_hits: List[Dict], similarities: Dict[str, float], vector_hits: List[Dict]) -> List[Dict]:
+        """
+        Merge text and vector hits into one candidate list ordered by
+        relevance = lexical_weight * normalized text score + (1 - lexical_weight) * similarity.
+        """
+        lexical_weight = settings.SEARCH_LEXICAL_WEIGHT
+        max_lexical = max([hit['lexical_score'] for hit in lexical_hits] or [1.0])
+        semantic = bool(similarities or vector_hits)
+
+        candidates = {}
+        for hit in vector_hits:
+            candidates[hit['article_id']] = {**hit, 'lexical': 0.0}
+        for hit in lexical_hits:
+            summary = {key: value for key, value in hit.items() if key != 'lexical_score'}
+            candidates.setdefault(hit['article_id'], {
+                **summary, 'similarity': similarities.get(hit['article_id'], 0.0)
+            })['lexical'] = hit['lexical_score'] / max_lexical
+
+        for hit in candidates.values():
+            if semantic:
+                hit['relevance'] = lexical_weight * hit['lexical'] + (1 - lexical_weight) * hit['similarity']
+            else:
+                hit['relevance'] = hit['lexical']
+
+        hits = sorted(candidates.values(), key=lambda hit: hit['relevance'], reverse=True)
+        return hits[:self.candidate_count]
+
+    def rank_articles(self, query_embedding, category: Optional[str] = None,
+                      since: Optional[datetime.datetime] = None):
+        """
+        Generic (user-independent) ranking of articles for `query_embedding`.
+        Returns (index generation, hit summaries), or (generation, None) if
+        no article has an embedding yet.
+        """
+        return article_vector_index.search(
+            query_embedding, self.candidate_count, self.min_similarity, category=category, since=since
+        )
+
+    def search_articles(self, query_embedding, user, category: Optional[str] = None,
+                        since: Optional[datetime.datetime] = None) -> List[Dict]:
+        """Rank articles by similarity to `query_embedding` and return the top hydrated results."""
+        _, hits = self.rank_articles(query_embedding, category, since)
+        if hits is None:
+            return None
+        return self.hydrate_hits(hits, user)
+
+    def hydrate_hits(self, hits: List[Dict], user) -> List[Dict]:
+        """
+        Apply per-user scoring to ranked hit summaries and return the top
+        results. Counts, authors and follow state are fetched for all hits at
+        once: one aggregation, one user/profile query and one Follow IN query.
+        """
+        if not hits:
+            return []
+
+        author_ids = self._author_ids(hits)
+        counts = get_articles_counts([ObjectId(hit['article_id']) for hit in hits])
+        authors, followed_ids = self._load_authors(author_ids, user)
+        return self._score_hits(hits, counts, authors, followed_ids)
+
+    async def ahydrate_hits(self, hits: List[Dict], user) -> List[Dict]:
+        """
+        Async hydrate_hits: the Mongo counts aggregation runs on a worker
+        thread while the ORM lookups run on Django's sync thread, concurrently.
+        """
+        if not hits:
+            return []
+
+        author_ids = self._author_ids(hits)
+        counts, (authors, followed_ids) = await asyncio.gather(
+            asyncio.to_thread(get_articles_counts, [ObjectId(hit['article_id']) for hit in hits]),
+            sync_to_async(self._load_authors)(author_ids, user)
+        )
+        return self._score_hits(hits, counts, authors, followed_ids)
+
+    @staticmethod
+    def _author_ids(hits: List[Dict]) -> List:
+        return [hit['userId'] for hit in hits if hit.get('userId')]
+
+    @staticmethod
+    def _load_authors(author_ids: List, user):
+        return get_users_profile_data(author_ids), get_followed_user_ids(user, author_ids)
+
+    def _score_hits(self, hits: List[Dict], counts: Dict, authors: Dict, followed_ids) -> List[Dict]:
+        max_popularity = max(
+            [1] + [c['likes_count'] + c['comments_count'] for c in counts.values()]
+        )
+        now = datetime.datetime.now()
+
+        results = []
+        for hit in hits:
+            article_id = hit['article_id']
+            similarity = hit['similarity']
+            # Fused lexical+semantic relevance; plain similarity for hits ranked by vector search alone
+            relevance = hit.get('relevance', similarity)
+            article_counts = counts[article_id]
+            popularity = article_counts['likes_count'] + article_counts['comments_count']
+
+            created_at = datetime.datetime.fromisoformat(hit['createdAt']) if hit.get('createdAt') else None
+            recency = (now - created_at).days if created_at else 0
+
+            author_id = hit.get('userId')
+            try:
+                author_id = int(author_id) if author_id else None
+            except (TypeError, ValueError):
+                author_id = None
+            is_followed = author_id in followed_ids
+
+            # امتیاز ترکیبی
+            score = (0.5 * relevance) + (0.2 * (100 if is_followed else 0)) - (0.2 * recency / 365) + (0.1 * popularity / max_popularity)
+
+            if author_id:
+                author = authors.get(author_id, {'username': '', 'profilePicture': f'{base_url}'})
+                username, profile_picture = author['username'], author['profilePicture']
+            else:
+                # اگر مقاله توسط AI نوشته شده
+                username, profile_picture = 'AI', f'{base_url}{DEFAULT_PROFILE_PICTURE}'
+
+            results.append({
+                'type': 'article',
+                'article_id': article_id,
+                'title': hit.get('title'),
+                'category': hit.get('category'),
+                'imgCover': f'{base_url}{hit.get("imgCover") or ""}',
+                'createdAt': hit.get('createdAt'),
+                'score': score,
+                'similarity': similarity,
+                'relevance': relevance,
+                'username': username,
+                'profilePicture': profile_picture,
+                **article_counts
+            })
+
+        results.sort(key=lambda x: x['score'], reverse=True)
+        return results[:self.result_count]
@@ -0,0 +1,139 @@
+import json
+import logging
+import os
+from typing import Dict, List, Optional
+
+from django.contrib.auth.models import User
+
+from iTech import settings
+from config.redis_utils import get_redis_client
+
+logger = logging.getLogger(__name__)
+base_url = os.getenv("BASE_URL")
+
+DEFAULT_PROFILE_PICTURE = '/media/profile_pics/default.png'
+
+
+class UserTypeaheadService:
+    """
+    Username search for search-as-you-type.
+
+    Prefix matches come first and use the UPPER(username) text_pattern_ops
+    index; from `trigram_min_length` characters on, substring matches fill the
+    rest through the pg_trgm index (see search/migrations/0001). Profiles are
+    joined in the same query.
+
+    Results are cached per normalized query in Redis. When a cached shorter
+    prefix returned fewer than `max_limit` matches it already holds every
+    match a longer query can have, so the next keystroke is served by
+    filtering it without touching the database.
+    """
+    key_prefix = 'search:typeahead:users:'
+    trigram_min_length = 3
+    max_query_length = 150
+
+    def __init__(self):
+        self.cache_ttl = settings.USER_TYPEAHEAD_CACHE_TTL
+        self.max_limit = settings.USER_TYPEAHEAD_LIMIT
+
+    @classmethod
+    def normalize(cls, query: str) -> str:
+        return (query or '').strip().lower()[:cls.max_query_length]
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Dict]:
+        query = self.normalize(query)
+        limit = min(limit or self.max_limit, self.max_limit)
+        if not query:
+            return []
+
+        entry = self._cached(query)
+        if entry is None:
+            entry = self._query_database(query)
+            self._store(query, entry)
+        return entry['results'][:limit]
+
+    def _cached(self, query: str) -> Optional[Dict]:
+        try:
+            redis_client = get_redis_client()
+            pipe = redis_client.pipeline(transaction=False)
+            # The query itself, then its shorter prefixes, longest first
+            prefixes = [query[:length] for length in range(len(query), 0, -1)]
+            for prefix in prefixes:
+                pipe.get(self.key_prefix + prefix)
+            payloads = pipe.execute()
+        except Exception as e:
+            logger.error(f"Typeahead cache unavailable: {str(e)}")
+            return None
+
+        substring = len(query) >= self.trigram_min_length
+        for prefix, payload in zip(prefixes, payloads):
+            if payload is None:
+                continue
+            entry = json.loads(payload)
+            if prefix == query:
+                return entry
+            # A shorter prefix answers this query only if it holds every match this query can have
+            if entry['complete'] or (not substring and entry['prefix_complete']):
+                narrowed = self._narrow(entry['results'], query, substring)
+                self._store(query, narrowed)
+                return narrowed
+        return None
+
+    @staticmethod
+    def _narrow(results: List[Dict], query: str, substring: bool) -> Dict:
+        prefix_hits = []
+        contains_hits = []
+        for result in results:
+            username = result['username'].lower()
+            if username.startswith(query):
+                prefix_hits.append(result)
+            elif substring and query in username:
+                contains_hits.append(result)
+        return {'results': prefix_hits + contains_hits, 'prefix_complete': True, 'complete': substring}
+
+    def _store(self, query: str, entry: Dict):
+        try:
+            get_redis_client().set(self.key_prefix + query, json.dumps(entry), ex=self.cache_ttl)
+        except Exception as e:
+            logger.error(f"Failed to cache typeahead results: {str(e)}")
+
+    def _query_database(self, query: str) -> Dict:
+        users = list(
+            User.objects.filter(username__istartswith=query)
+            .select_related('profile')
+            .order_by('username')[:self.max_limit]
+        )
+        prefix_complete = len(users) < self.max_limit
+        complete = False
+
+        # Substring matches only from three characters on, where trigrams apply
+        if prefix_complete and len(query) >= self.trigram_min_length:
+            users.extend(
+                User.objects.filter(username__icontains=query)
+                .exclude(username__istartswith=query)
+                .select_related('profile')
+                .order_by('username')[:self.max_limit - len(users)]
+            )
+            complete = len(users) < self.max_limit
+
+        return {
+            'results': [self._format(user) for user in users],
+            'prefix_complete': prefix_complete,
+            'complete': complete
+        }
+
+    @staticmethod
+    def _format(user) -> Dict:
+        profile = getattr(user, 'profile', None)
+        profile_picture = profile.profile_picture.url if profile and profile.profile_picture else DEFAULT_PROFILE_PICTURE
+        return {
+            'type': 'user',
+            'id': str(user.id),
+            'username': user.username,
+            'profile_picture': f'{base_url}{profile_picture}',
+            'first_name': profile.first_name if profile else '',
+            'last_name': profile.last_name if profile else ''
+        }
+
+
+user_typeahead_service = UserTypeaheadService()
@@ -0,0 +1,13 @@
+import logging
+from celery import shared_task
+from search.utils.history import search_history_buffer
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def flush_search_history():
+    written = search_history_buffer.flush()
+    if written:
+        logger.info(f"Flushed {written} buffered searches")
+    return written
@@ -1,3 +1,126 @@
-from django.test import TestCase
+import datetime
+from unittest import mock
 
-# Create your tests here.
+from bson import ObjectId
+from django.test import SimpleTestCase
+
+from config.mongo_utils import encode_cursor, decode_cursor
+from search.services.search_services import SearchService
+from search.services.typeahead_services import UserTypeaheadService
+from search.utils.history import encode_embedding, decode_embedding
+from search.utils.result_cache import normalize_query
+from search.utils.vector_index import ArticleVectorIndex
+
+
+class SearchHistoryEmbeddingTests(SimpleTestCase):
+
+    def test_compact_round_trip(self):
+        embedding = [0.125, -0.5, 0.333, 0.0]
+        encoded = encode_embedding(embedding)
+        self.assertEqual(len(encoded), 2 * len(embedding))
+        for original, decoded in zip(embedding, decode_embedding(encoded)):
+            self.assertAlmostEqual(original, decoded, places=3)
+
+    def test_legacy_arrays_are_still_read(self):
+        self.assertEqual(decode_embedding([0.1, 0.2]), [0.1, 0.2])
+        self.assertEqual(decode_embedding(None), [])
+
+    def test_history_cursor_round_trip(self):
+        document = {'_id': ObjectId(), 'created_at': datetime.datetime(2025, 5, 1, 12, 30, 15, 250000)}
+        self.assertEqual(decode_cursor(encode_cursor(document)), (document['created_at'], document['_id']))
+        with self.assertRaises(ValueError):
+            decode_cursor('not-a-cursor')
+
+
+class UserTypeaheadNarrowTests(SimpleTestCase):
+
+    def test_cached_prefix_is_narrowed_prefix_first(self):
+        cached = [{'username': name} for name in ('alice', 'alina', 'malik', 'bob_ali')]
+        entry = UserTypeaheadService._narrow(cached, 'ali', substring=True)
+        self.assertEqual([r['username'] for r in entry['results']], ['alice', 'alina', 'malik', 'bob_ali'])
+        entry = UserTypeaheadService._narrow(cached, 'al', substring=False)
+        self.assertEqual([r['username'] for r in entry['results']], ['alice', 'alina'])
+        self.assertFalse(entry['complete'])
+
+
+class SearchResultCacheKeyTests(SimpleTestCase):
+
+    def test_equivalent_queries_share_a_key(self):
+        self.assertEqual(normalize_query("  Deep   LEARNING "), normalize_query("deep learning"))
+        self.assertEqual(normalize_query("ＧＰＵ"), "gpu")
+
+
+class ArticleVectorIndexFilterTests(SimpleTestCase):
+
+    def test_category_and_since_filters_are_applied_in_the_index(self):
+        start = datetime.datetime(2025, 1, 1)
+        articles = [
+            {'_id': ObjectId(), 'text_embedding': [1.0, 0.1 * i], 'category': 'ai' if i % 2 else 'web',
+             'createdAt': start + datetime.timedelta(days=i)}
+            for i in range(6)
+        ]
+        collection = mock.Mock()
+        collection.find.return_value = articles
+        index = ArticleVectorIndex()
+        index.collection_names = ('articles',)
+        with mock.patch('search.utils.vector_index.get_collection', return_value=collection), \
+                mock.patch('search.utils.vector_index.index_log_position', return_value=(1, 0)):
+            _, hits = index.search([1.0, 0.0], 10, 0.0, category='ai', since=start + datetime.timedelta(days=2))
+            self.assertEqual({hit['article_id'] for hit in hits}, {str(articles[3]['_id']), str(articles[5]['_id'])})
+            self.assertEqual(index.search([1.0, 0.0], 10, 0.0, category='missing')[1], [])
+
+    def test_aware_since_matches_naive_utc_created_at(self):
+        created = datetime.datetime(2025, 1, 1, 12, 0)
+        articles = [{'_id': ObjectId(), 'text_embedding': [1.0, 0.0], 'category': 'ai',
+                     'createdAt': created + datetime.timedelta(hours=hours)} for hours in (0, 2)]
+        collection = mock.Mock()
+        collection.find.return_value = articles
+        index = ArticleVectorIndex()
+        index.collection_names = ('articles',)
+        # 13:00 UTC written as 16:30 in Tehran
+        since = datetime.datetime(2025, 1, 1, 16, 30, tzinfo=datetime.timezone(datetime.timedelta(hours=3, minutes=30)))
+        with mock.patch('search.utils.vector_index.get_collection', return_value=collection), \
+                mock.patch('search.utils.vector_index.index_log_position', return_value=(1, 0)):
+            _, hits = index.search([1.0, 0.0], 10, 0.0, category='ai', since=since)
+        self.assertEqual([hit['article_id'] for hit in hits], [str(articles[1]['_id'])])
+
+    @mock.patch('django.conf.settings.SEARCH_INDEX_REFRESH_INTERVAL', 0)
+    def test_logged_changes_are_applied_without_a_rebuild(self):
+        old, removed = ({'_id': ObjectId(), 'text_embedding': [1.0, 0.0], 'category': 'ai',
+                         'createdAt': datetime.datetime(2025, 1, 1)} for _ in range(2))
+        added = {'_id': ObjectId(), 'text_embedding': [0.0, 1.0], 'category': 'web',
+                 'createdAt': datetime.datetime(2025, 1, 2)}
+        collection = mock.Mock()
+        collection.find.return_value = [old, removed]
+        index = ArticleVectorIndex()
+        index.collection_names = ('articles',)
+        changes = (1, 1, [(1, 'articles', str(removed['_id'])), (2, 'articles', str(added['_id']))])
+        with mock.patch('search.utils.vector_index.get_collection', return_value=collection), \
+                mock.patch('search.utils.vector_index.index_log_position', return_value=(1, 0)), \
+                mock.patch('search.utils.vector_index.read_index_changes', return_value=changes):
+            built = index.refresh()
+            collection.find.return_value = [added]
+            generation, hits = index.search([0.0, 1.0], 10, -1.0)
+        self.assertEqual([hit['article_id'] for hit in hits], [str(added['_id']), str(old['_id'])])
+        self.assertEqual(index._snapshot.sequence, 2)
+        # Applied writes retire cached rankings, not only deletes
+        self.assertEqual((built, generation), ('1.0', '1.2'))
+
+
+class HybridFusionTests(SimpleTestCase):
+
+    @mock.patch('iTech.settings.SEARCH_LEXICAL_WEIGHT', 0.5)
+    def test_lexical_and_vector_hits_are_fused(self):
+        lexical = [{'article_id': 'a', 'title': 'A', 'lexical_score': 4.0},
+                   {'article_id': 'b', 'title': 'B', 'lexical_score': 2.0}]
+        vector = [{'article_id': 'c', 'title': 'C', 'similarity': 0.9},
+                  {'article_id': 'b', 'title': 'B', 'similarity': 0.8}]
+        hits = SearchService()._fuse(lexical, {'a': 0.2, 'b': 0.8}, vector)
+        self.assertEqual([hit['article_id'] for hit in hits], ['b', 'a', 'c'])
+        self.assertAlmostEqual(hits[0]['relevance'], 0.5 * 0.5 + 0.5 * 0.8)
+
+    def test_lexical_only_ranking_without_embedding(self):
+        lexical = [{'article_id': 'a', 'title': 'A', 'lexical_score': 1.0},
+                   {'article_id': 'b', 'title': 'B', 'lexical_score': 3.0}]
+        hits = SearchService()._fuse(lexical, {}, [])
+        self.assertEqual([(hit['article_id'], hit['relevance']) for hit in hits], [('b', 1.0), ('a', 1.0 / 3)])
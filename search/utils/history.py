@@ -0,0 +1,214 @@
+import base64
+import datetime
+import json
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+from bson import Binary
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+from iTech import settings
+from config.mongo_utils import get_collection, encode_cursor, keyset_filter
+from config.redis_utils import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+# Query embeddings are stored as little-endian float16 bytes: a quarter of
+# the size of a BSON array of doubles, and precise enough for the user
+# profile averaging that reads them back.
+EMBEDDING_DTYPE = np.dtype('<f2')
+
+
+def encode_embedding(embedding) -> Optional[Binary]:
+    if embedding is None or len(embedding) == 0:
+        return None
+    return Binary(np.asarray(embedding, dtype=EMBEDDING_DTYPE).tobytes())
+
+
+def decode_embedding(value) -> List[float]:
+    """Read a stored query embedding; accepts both the compact binary form and legacy float arrays."""
+    if value is None:
+        return []
+    if isinstance(value, (bytes, Binary)):
+        return np.frombuffer(bytes(value), dtype=EMBEDDING_DTYPE).astype(np.float32).tolist()
+    return list(value)
+
+
+class SearchHistoryBuffer:
+    """
+    Buffers search-history records in a Redis list so the search request
+    never waits on Mongo. `flush` moves them into the `search` collection in
+    batches; it runs from the search.tasks.tasks.flush_search_history beat task.
+
+    The collection stays bounded: each flush trims the affected users to
+    their SEARCH_HISTORY_MAX_PER_USER most recent searches, and a TTL index
+    drops anything older than SEARCH_HISTORY_TTL_DAYS.
+    """
+    key = 'search:history:buffer'
+
+    def __init__(self, collection):
+        self.collection = collection
+        self._indexes_ready = False
+        self._ensure_indexes()
+
+    def _ensure_indexes(self):
+        if self._indexes_ready:
+            return
+        try:
+            self.collection.create_index(
+                [('user_id', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)],
+                name='user_id_1_created_at_-1__id_-1'
+            )
+            ttl = settings.SEARCH_HISTORY_TTL_DAYS * 24 * 3600
+            try:
+                self.collection.create_index('created_at', name='created_at_ttl', expireAfterSeconds=ttl)
+            except OperationFailure:
+                # An index on created_at already exists (e.g. without TTL or with another TTL); convert it in place
+                index_name = next(
+                    (name for name, spec in self.collection.index_information().items()
+                     if spec['key'] == [('created_at', 1)]),
+                    None
+                )
+                self.collection.database.command(
+                    'collMod', self.collection.name, index={'name': index_name, 'expireAfterSeconds': ttl}
+                )
+            self._indexes_ready = True
+        except Exception as e:
+            logger.error(f"Failed to ensure search history indexes: {str(e)}")
+
+    def record(self, user_id, query: str, embedding):
+        """Queue one search; falls back to a direct insert if Redis is unavailable."""
+        created_at = datetime.datetime.now()
+        encoded = encode_embedding(embedding)
+        try:
+            payload = json.dumps({
+                'query': query,
+                'user_id': str(user_id),
+                'created_at': created_at.isoformat(),
+                'embedding': base64.b64encode(bytes(encoded)).decode('ascii') if encoded else None
+            })
+            pipe = get_redis_client().pipeline(transaction=False)
+            pipe.rpush(self.key, payload)
+            # Bound the buffer if the flush task is not running; oldest entries go first
+            pipe.ltrim(self.key, -settings.SEARCH_HISTORY_BUFFER_MAX, -1)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Search history buffer unavailable, writing directly: {str(e)}")
+            # Same retention as flushed records: the TTL index (retried if it could not be
+            # created at startup) and the per-user cap
+            self._ensure_indexes()
+            self.collection.insert_one({
+                'query': query,
+                'embedding': encoded,
+                'user_id': str(user_id),
+                'created_at': created_at
+            })
+            self.enforce_cap({str(user_id)})
+
+    @staticmethod
+    def _to_document(payload: bytes) -> Dict:
+        record = json.loads(payload)
+        embedding = record.get('embedding')
+        return {
+            'query': record['query'],
+            'embedding': Binary(base64.b64decode(embedding)) if embedding else None,
+            'user_id': record['user_id'],
+            'created_at': datetime.datetime.fromisoformat(record['created_at'])
+        }
+
+    def flush(self, batch_size: int = None) -> int:
+        """Move buffered searches to Mongo in batches of `batch_size`. Returns the number written."""
+        # Imported here: suggestions -> result_cache -> history would be circular at module level
+        from search.utils.suggestions import query_suggestions
+
+        batch_size = batch_size or settings.SEARCH_HISTORY_FLUSH_BATCH
+        redis_client = get_redis_client()
+        written = 0
+
+        while True:
+            pipe = redis_client.pipeline(transaction=True)
+            pipe.lrange(self.key, 0, batch_size - 1)
+            pipe.ltrim(self.key, batch_size, -1)
+            payloads, _ = pipe.execute()
+            if not payloads:
+                break
+
+            documents = []
+            for payload in payloads:
+                try:
+                    documents.append(self._to_document(payload))
+                except (ValueError, KeyError) as e:
+                    logger.error(f"Dropping malformed search history record: {str(e)}")
+
+            try:
+                if documents:
+                    self.collection.insert_many(documents, ordered=False)
+            except Exception:
+                # Put the batch back at the head so the next run retries it
+                redis_client.lpush(self.key, *reversed(payloads))
+                raise
+
+            written += len(documents)
+            self.enforce_cap({document['user_id'] for document in documents})
+            try:
+                query_suggestions.record_many(documents)
+            except Exception as e:
+                logger.error(f"Failed to update query suggestions: {str(e)}")
+            if len(payloads) < batch_size:
+                break
+
+        return written
+
+    def enforce_cap(self, user_ids):
+        """Keep only the SEARCH_HISTORY_MAX_PER_USER most recent searches of each user in `user_ids`."""
+        cap = settings.SEARCH_HISTORY_MAX_PER_USER
+        for user_id in user_ids:
+            # The oldest entry that is still kept; everything behind it goes
+            boundary = list(
+                self.collection.find({'user_id': user_id}, {'created_at': 1})
+                .sort([('created_at', DESCENDING), ('_id', DESCENDING)])
+                .skip(cap - 1)
+                .limit(1)
+            )
+            if not boundary:
+                continue
+            boundary = boundary[0]
+            self.collection.delete_many({
+                'user_id': user_id,
+                '$or': [
+                    {'created_at': {'$lt': boundary['created_at']}},
+                    {'created_at': boundary['created_at'], '_id': {'$lt': boundary['_id']}}
+                ]
+            })
+
+    def page(self, user_id, limit: int, cursor: Optional[str] = None) -> Dict:
+        """
+        One page of a user's history, newest first, using keyset pagination on
+        (created_at, _id). Raises ValueError for an invalid cursor.
+        """
+        query = {'user_id': str(user_id), **keyset_filter(cursor)}
+
+        documents = list(
+            self.collection.find(query, {'_id': 1, 'query': 1, 'created_at': 1})
+            .sort([('created_at', DESCENDING), ('_id', DESCENDING)])
+            .limit(limit + 1)
+        )
+        has_more = len(documents) > limit
+        documents = documents[:limit]
+
+        return {
+            'results': [
+                {
+                    'id': str(document['_id']),
+                    'query': document['query'],
+                    'created_at': document['created_at'].isoformat() if document.get('created_at') else None
+                }
+                for document in documents
+            ],
+            'next_cursor': encode_cursor(documents[-1]) if has_more else None
+        }
+
+
+search_history_buffer = SearchHistoryBuffer(get_collection('search'))
@@ -0,0 +1,91 @@
+import datetime
+import logging
+from typing import Dict, List, Optional
+
+from pymongo import TEXT
+from pymongo.errors import OperationFailure
+
+from config.mongo_utils import get_collection
+
+logger = logging.getLogger(__name__)
+
+
+class LexicalArticleSearch:
+    """
+    Keyword search over article titles and cleaned text through a MongoDB
+    text index on each article collection (title weighted above body).
+
+    The index uses the 'none' language: no stemming or stop words, which
+    keeps Persian and English terms matching as typed. Hits use the same
+    summary shape as ArticleVectorIndex, with the raw text score in
+    'lexical_score'.
+    """
+    collection_names = ('articles', 'articles_users')
+    index_name = 'title_text_cleaned_text_text'
+    weights = {'title': 10, 'cleaned_text': 1}
+    projection = {'title': 1, 'category': 1, 'imgCover': 1, 'createdAt': 1, 'userId': 1}
+
+    def __init__(self):
+        self._ensure_indexes()
+
+    def _ensure_indexes(self):
+        for name in self.collection_names:
+            try:
+                get_collection(name).create_index(
+                    [('title', TEXT), ('cleaned_text', TEXT)],
+                    name=self.index_name,
+                    weights=self.weights,
+                    default_language='none'
+                )
+            except OperationFailure as e:
+                # A collection can only have one text index; keep an existing one
+                logger.error(f"Failed to create text index on {name}: {str(e)}")
+            except Exception as e:
+                logger.error(f"Failed to ensure text index on {name}: {str(e)}")
+
+    @staticmethod
+    def _terms(query: str) -> str:
+        # Quotes and a leading '-' are $text phrase/negation syntax; search plain terms only
+        return ' '.join(term.lstrip('-') for term in query.replace('"', ' ').split())
+
+    def search(self, query: str, limit: int, category: Optional[str] = None,
+               since: Optional[datetime.datetime] = None) -> List[Dict]:
+        """Best text-score matches across both collections, highest score first."""
+        terms = self._terms(query)
+        if not terms:
+            return []
+
+        mongo_query = {'$text': {'$search': terms}}
+        if category:
+            mongo_query['category'] = category
+        if since:
+            mongo_query['createdAt'] = {'$gte': since}
+        projection = {**self.projection, 'lexical_score': {'$meta': 'textScore'}}
+
+        hits = []
+        for name in self.collection_names:
+            try:
+                cursor = (
+                    get_collection(name).find(mongo_query, projection)
+                    .sort([('lexical_score', {'$meta': 'textScore'})])
+                    .limit(limit)
+                )
+                for article in cursor:
+                    created_at = article.get('createdAt')
+                    hits.append({
+                        'article_id': str(article['_id']),
+                        'title': article.get('title'),
+                        'category': article.get('category'),
+                        'imgCover': article.get('imgCover', ''),
+                        'createdAt': created_at.isoformat() if isinstance(created_at, datetime.datetime) else None,
+                        'userId': article.get('userId'),
+                        'lexical_score': article['lexical_score']
+                    })
+            except Exception as e:
+                logger.error(f"Lexical search failed on {name}: {str(e)}")
+
+        hits.sort(key=lambda hit: hit['lexical_score'], reverse=True)
+        return hits[:limit]
+
+
+lexical_article_search = LexicalArticleSearch()
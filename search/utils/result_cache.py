@@ -0,0 +1,75 @@
+import base64
+import hashlib
+import json
+import logging
+import unicodedata
+from typing import Dict, List, Optional
+
+from iTech import settings
+from config.redis_utils import get_redis_client
+from search.utils.history import encode_embedding, decode_embedding
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query: str) -> str:
+    """Canonical form used for cache keys: NFKC, case-folded, single spaces."""
+    return ' '.join(unicodedata.normalize('NFKC', query or '').casefold().split())
+
+
+class SearchResultCache:
+    """
+    Ranked article hits per (index generation, normalized query, filters).
+
+    Entries hold the query embedding and the generic ranking only (article
+    summaries and similarities); per-user signals such as the follow boost
+    and fresh counts are applied when the entry is read. The generation
+    (see vector_index.cache_generation) moves on every logged article
+    write and delete, which changes every key, so a new or edited article
+    is ranked by the next search instead of after SEARCH_RESULT_CACHE_TTL.
+    """
+    key_prefix = 'search:results:'
+
+    def __init__(self):
+        self.ttl = settings.SEARCH_RESULT_CACHE_TTL
+
+    def _key(self, generation: str, query: str, filters: Optional[Dict]) -> str:
+        scope = normalize_query(query)
+        if filters:
+            scope += '\x00' + json.dumps(filters, sort_keys=True, default=str)
+        digest = hashlib.sha1(scope.encode('utf-8')).hexdigest()
+        return f'{self.key_prefix}{generation}:{digest}'
+
+    def get(self, generation: Optional[str], query: str, filters: Optional[Dict] = None) -> Optional[Dict]:
+        if generation is None:
+            return None
+        try:
+            payload = get_redis_client().get(self._key(generation, query, filters))
+        except Exception as e:
+            logger.error(f"Search result cache unavailable: {str(e)}")
+            return None
+        if not payload:
+            return None
+        entry = json.loads(payload)
+        entry['embedding'] = decode_embedding(base64.b64decode(entry['embedding'])) if entry['embedding'] else None
+        return entry
+
+    def set(self, generation: Optional[str], query: str, embedding: Optional[List[float]], hits: List[Dict],
+            filters: Optional[Dict] = None):
+        if generation is None:
+            return
+        try:
+            get_redis_client().set(
+                self._key(generation, query, filters),
+                json.dumps({
+                    # float16, like stored search history, to keep entries small
+                    'embedding': base64.b64encode(bytes(encode_embedding(embedding))).decode('ascii') if embedding else None,
+                    'hits': hits
+                }),
+                ex=self.ttl
+            )
+        except Exception as e:
+            logger.error(f"Failed to cache search results: {str(e)}")
+
+
+search_result_cache = SearchResultCache()
@@ -0,0 +1,160 @@
+import heapq
+import logging
+import os
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class ShardServer:
+    """
+    Serves one shard of each vector index to ShardedVectorIndex clients over a
+    Unix socket (multiprocessing.connection, authenticated with `authkey`).
+
+    Requests are (method, index name, args, kwargs) tuples and replies are
+    ('ok', result) or ('error', message). Every client connection gets its
+    own thread; FAISS releases the GIL while searching.
+    """
+    methods = ('search', 'similarities', 'refresh')
+
+    def __init__(self, indexes: Dict, address: str, authkey: bytes):
+        self.indexes = indexes
+        self.address = address
+        self.authkey = authkey
+
+    def serve_forever(self):
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+        os.makedirs(os.path.dirname(self.address), exist_ok=True)
+
+        # Build before accepting requests, then keep each index current off the
+        # request path: rebuilds and change-log reads never delay a reply
+        for index in self.indexes.values():
+            index.refresh_in_background()
+
+        with Listener(self.address, family='AF_UNIX', authkey=self.authkey) as listener:
+            logger.info(f"Search shard listening on {self.address}")
+            while True:
+                try:
+                    connection = listener.accept()
+                except Exception as e:
+                    # Failed handshake (wrong authkey, client gone); keep serving
+                    logger.error(f"Search shard rejected a connection: {str(e)}")
+                    continue
+                threading.Thread(target=self._handle, args=(connection,), daemon=True).start()
+
+    def _handle(self, connection):
+        with connection:
+            while True:
+                try:
+                    method, name, args, kwargs = connection.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    if method not in self.methods:
+                        raise ValueError(f"Unknown method {method}")
+                    connection.send(('ok', getattr(self.indexes[name], method)(*args, **kwargs)))
+                except Exception as e:
+                    logger.error(f"Search shard request failed: {str(e)}")
+                    connection.send(('error', f"{type(e).__name__}: {str(e)}"))
+
+
+class ShardedVectorIndex:
+    """
+    Client with the ArticleVectorIndex interface that scatters each call to
+    every shard worker and merges the replies: top-k by similarity for
+    `search`, the union for `similarities`.
+
+    Each calling thread keeps one connection per shard; a request is sent to
+    all shards before any reply is read, so shards work in parallel. A shard
+    that fails or exceeds `timeout` is left out of the merge, and the result
+    is then reported with generation None so it is not cached.
+    """
+
+    def __init__(self, name: str, addresses: List[str], authkey: bytes, timeout: float = 2.0):
+        self.name = name
+        self.addresses = addresses
+        self.authkey = authkey
+        self.timeout = timeout
+        self._local = threading.local()
+
+    @staticmethod
+    def socket_paths(socket_dir: str, shard_count: int) -> List[str]:
+        return [os.path.join(socket_dir, f'search-shard-{number}.sock') for number in range(shard_count)]
+
+    def _connection(self, shard: int):
+        connections = getattr(self._local, 'connections', None)
+        if connections is None:
+            connections = self._local.connections = {}
+        if shard not in connections:
+            connections[shard] = Client(self.addresses[shard], family='AF_UNIX', authkey=self.authkey)
+        return connections[shard]
+
+    def _drop(self, shard: int):
+        connection = self._local.connections.pop(shard, None)
+        if connection is not None:
+            connection.close()
+
+    def _scatter(self, method: str, *args, **kwargs) -> Tuple[List, bool]:
+        """Replies of the shards that answered, and whether every shard did."""
+        request = (method, self.name, args, kwargs)
+        sent = []
+        for shard in range(len(self.addresses)):
+            try:
+                self._connection(shard).send(request)
+                sent.append(shard)
+            except Exception as e:
+                logger.error(f"Search shard {shard} unavailable: {str(e)}")
+                self._drop(shard)
+
+        replies = []
+        deadline = time.monotonic() + self.timeout
+        for shard in sent:
+            connection = self._local.connections[shard]
+            try:
+                if not connection.poll(max(deadline - time.monotonic(), 0)):
+                    raise TimeoutError(f"no reply within {self.timeout}s")
+                status, result = connection.recv()
+            except Exception as e:
+                logger.error(f"Search shard {shard} failed: {str(e)}")
+                # A late reply would be read by the next request; reconnect instead
+                self._drop(shard)
+                continue
+            if status != 'ok':
+                logger.error(f"Search shard {shard} error: {result}")
+                continue
+            replies.append(result)
+        return replies, len(replies) == len(self.addresses)
+
+    def refresh(self) -> Optional[str]:
+        replies, complete = self._scatter('refresh')
+        generations = set(replies)
+        return generations.pop() if complete and len(generations) == 1 else None
+
+    def search(self, query_embedding, k: int, min_similarity: float, category: Optional[str] = None,
+               since=None) -> Tuple[Optional[str], Optional[List[Dict]]]:
+        replies, complete = self._scatter(
+            'search', np.asarray(query_embedding, dtype=np.float32), k, min_similarity,
+            category=category, since=since
+        )
+        shard_hits = [hits for _, hits in replies if hits is not None]
+        if not shard_hits:
+            return None, None
+
+        # Shards rebuild independently; only a consistent, complete answer carries a generation
+        generations = {generation for generation, _ in replies}
+        generation = generations.pop() if complete and len(generations) == 1 else None
+        hits = heapq.nlargest(k, (hit for hits in shard_hits for hit in hits), key=lambda hit: hit['similarity'])
+        return generation, hits
+
+    def similarities(self, query_embedding, article_ids: List[str]) -> Dict[str, float]:
+        replies, _ = self._scatter('similarities', np.asarray(query_embedding, dtype=np.float32), article_ids)
+        merged = {}
+        for reply in replies:
+            merged.update(reply)
+        return merged
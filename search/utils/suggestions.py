@@ -0,0 +1,194 @@
+import datetime
+import json
+import logging
+import time
+import uuid
+from typing import Dict, Iterable, List
+
+from iTech import settings
+from config.redis_utils import get_redis_client
+from search.utils.result_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+# Deletes the lock only if it still holds our token; an expired lock may belong to another worker by now
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class QuerySuggestions:
+    """
+    Time-decayed popular queries in Redis sorted sets, one per query prefix.
+
+    Counts use forward decay: a search at time t adds 2 ** ((t - landmark) / half_life)
+    to its query, so older searches weigh relatively less without ever
+    rewriting existing scores. Once the landmark is `rebase_after_half_lives`
+    half-lives old, every set is scaled down in place and the landmark moves
+    forward, which keeps scores in a safe float range.
+
+    Each prefix set keeps its top `keep` queries, so a suggestion is a single
+    ZREVRANGE on a small set. A query is only suggested once it reaches
+    SEARCH_SUGGEST_MIN_COUNT decayed searches by SEARCH_SUGGEST_MIN_USERS
+    distinct users (a HyperLogLog per query), so one user's rare or private
+    searches never show up in anybody's typeahead.
+
+    Updates are serialized by a token lock; a batch that finds it taken is
+    parked in `pending_key` and applied by the next update instead of waiting.
+    """
+    key_prefix = 'search:suggest:p:'
+    users_key_prefix = 'search:suggest:u:'
+    landmark_key = 'search:suggest:landmark'
+    lock_key = 'search:suggest:lock'
+    pending_key = 'search:suggest:pending'
+    max_query_length = 100
+    max_pending = 100000
+    rebase_after_half_lives = 32
+    # Distinct-user counts only need to cover the period in which a query still ranks
+    users_ttl_half_lives = 4
+
+    def __init__(self):
+        self.half_life = settings.SEARCH_SUGGEST_HALF_LIFE_HOURS * 3600
+        self.max_prefix = settings.SEARCH_SUGGEST_MAX_PREFIX
+        self.keep = settings.SEARCH_SUGGEST_KEEP
+        self.min_count = settings.SEARCH_SUGGEST_MIN_COUNT
+        self.min_users = settings.SEARCH_SUGGEST_MIN_USERS
+
+    def _prefixes(self, query: str) -> List[str]:
+        return [query[:length] for length in range(1, min(len(query), self.max_prefix) + 1)]
+
+    def _landmark(self, redis_client) -> float:
+        landmark = redis_client.get(self.landmark_key)
+        if landmark is None:
+            landmark = time.time()
+            if not redis_client.set(self.landmark_key, landmark, nx=True):
+                landmark = redis_client.get(self.landmark_key)
+        return float(landmark)
+
+    def record_many(self, searches: Iterable[Dict]):
+        """
+        Add searches ({'query', 'created_at', 'user_id'}) to the prefix sets.
+        Runs from the history flush task; never blocks on the lock.
+        """
+        redis_client = get_redis_client()
+        token = uuid.uuid4().hex
+        if not redis_client.set(self.lock_key, token, nx=True, ex=60):
+            # Another worker is updating or rebasing; it (or the next flush) applies these
+            self._park(redis_client, searches)
+            return
+
+        try:
+            landmark = self._landmark(redis_client)
+            if time.time() - landmark > self.rebase_after_half_lives * self.half_life:
+                landmark = self._rebase(redis_client, landmark)
+            self._apply(redis_client, list(searches) + self._take_parked(redis_client), landmark)
+        finally:
+            redis_client.register_script(_RELEASE_LOCK_SCRIPT)(keys=[self.lock_key], args=[token])
+
+    def _park(self, redis_client, searches: Iterable[Dict]):
+        payloads = [
+            json.dumps({
+                'query': search['query'],
+                'created_at': search['created_at'].isoformat(),
+                'user_id': search.get('user_id')
+            })
+            for search in searches
+        ]
+        if not payloads:
+            return
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.rpush(self.pending_key, *payloads)
+        pipe.ltrim(self.pending_key, -self.max_pending, -1)
+        pipe.execute()
+
+    def _take_parked(self, redis_client) -> List[Dict]:
+        pipe = redis_client.pipeline(transaction=True)
+        pipe.lrange(self.pending_key, 0, -1)
+        pipe.delete(self.pending_key)
+        payloads, _ = pipe.execute()
+        searches = []
+        for payload in payloads:
+            search = json.loads(payload)
+            search['created_at'] = datetime.datetime.fromisoformat(search['created_at'])
+            searches.append(search)
+        return searches
+
+    def _apply(self, redis_client, searches: List[Dict], landmark: float):
+        increments = {}
+        users = {}
+        for search in searches:
+            query = normalize_query(search['query'])
+            if not query or len(query) > self.max_query_length:
+                continue
+            weight = 2 ** ((search['created_at'].timestamp() - landmark) / self.half_life)
+            increments[query] = increments.get(query, 0.0) + weight
+            if search.get('user_id') is not None:
+                users.setdefault(query, set()).add(str(search['user_id']))
+
+        touched = set()
+        pipe = redis_client.pipeline(transaction=False)
+        for query, weight in increments.items():
+            for prefix in self._prefixes(query):
+                pipe.zincrby(self.key_prefix + prefix, weight, query)
+                touched.add(self.key_prefix + prefix)
+        for key in touched:
+            pipe.zremrangebyrank(key, 0, -(self.keep + 1))
+        for query, user_ids in users.items():
+            pipe.pfadd(self.users_key_prefix + query, *user_ids)
+            pipe.expire(self.users_key_prefix + query, int(self.users_ttl_half_lives * self.half_life))
+        pipe.execute()
+
+    def _rebase(self, redis_client, landmark: float) -> float:
+        """Scale every prefix set to a new landmark (caller holds the lock)."""
+        new_landmark = time.time()
+        factor = 2 ** ((landmark - new_landmark) / self.half_life)
+        scaled = 0
+        pipe = redis_client.pipeline(transaction=False)
+        for key in redis_client.scan_iter(match=self.key_prefix + '*', count=1000):
+            pipe.zunionstore(key, {key: factor})
+            scaled += 1
+            if scaled % 1000 == 0:
+                pipe.execute()
+        pipe.set(self.landmark_key, new_landmark)
+        pipe.execute()
+        logger.info(f"Rebased {scaled} query suggestion sets")
+        return new_landmark
+
+    def suggest(self, prefix: str, limit: int = 8) -> List[str]:
+        """Most popular recent queries starting with `prefix` that enough distinct users searched for."""
+        prefix = normalize_query(prefix)
+        if not prefix:
+            return []
+
+        redis_client = get_redis_client()
+        landmark = redis_client.get(self.landmark_key)
+        if landmark is None:
+            return []
+        # SEARCH_SUGGEST_MIN_COUNT searches made now, on the landmark's scale
+        min_score = self.min_count * 2 ** ((time.time() - float(landmark)) / self.half_life)
+
+        key = self.key_prefix + prefix[:self.max_prefix]
+        candidates = [
+            candidate.decode('utf-8')
+            for candidate in redis_client.zrevrangebyscore(key, '+inf', min_score)
+        ]
+        if len(prefix) > self.max_prefix:
+            # Longer than the indexed prefixes: filter the longest indexed set
+            candidates = [candidate for candidate in candidates if candidate.startswith(prefix)]
+        if not candidates:
+            return []
+
+        pipe = redis_client.pipeline(transaction=False)
+        for candidate in candidates:
+            pipe.pfcount(self.users_key_prefix + candidate)
+        user_counts = pipe.execute()
+        return [
+            candidate for candidate, users in zip(candidates, user_counts)
+            if users >= self.min_users
+        ][:limit]
+
+
+query_suggestions = QuerySuggestions()
@@ -0,0 +1,586 @@
+import bisect
+import datetime
+import logging
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import faiss
+import numpy as np
+from bson import ObjectId
+from django.conf import settings
+
+from config.mongo_utils import get_collection
+from config.redis_utils import get_redis_client
+from search.utils.shards import ShardedVectorIndex
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = 'search:index:generation'
+CHANGES_KEY = 'search:index:changes'
+CHANGES_SEQUENCE_KEY = 'search:index:changes:sequence'
+
+# Logs one change under the next sequence number as its stream id, so readers
+# can tell consecutive entries from a gap left by trimming.
+_RECORD_CHANGE_SCRIPT = """
+local sequence = redis.call('INCR', KEYS[2])
+redis.call('XADD', KEYS[1], 'MAXLEN', '~', ARGV[1], sequence .. '-0', 'collection', ARGV[2], 'article_id', ARGV[3])
+return sequence
+"""
+
+
+def cache_generation(generation: int, sequence: int) -> str:
+    """
+    Result-cache generation for an index state: the delete generation and
+    the last applied change, so every logged write retires cached rankings.
+    """
+    return f'{generation}.{sequence}'
+
+
+def get_index_generation() -> Optional[str]:
+    """
+    Result-cache generation of the latest logged index state, or None if
+    Redis is unreachable. Entries are written under the generation of the
+    snapshot that ranked them, so one computed by a snapshot that has not
+    applied every logged change yet is never read.
+    """
+    position = index_log_position()
+    return cache_generation(*position) if position is not None else None
+
+
+def bump_index_generation():
+    """
+    Start a new delete generation. Called when articles are removed, since
+    a ranking may list them; additions and re-embeds move the result-cache
+    generation through the change sequence (record_index_changes).
+    """
+    try:
+        get_redis_client().incr(GENERATION_KEY)
+    except Exception as e:
+        logger.error(f"Failed to bump search index generation: {str(e)}")
+
+
+def record_index_changes(collection_name: str, article_ids: List):
+    """
+    Log that these articles were added, re-embedded or removed. Every index
+    process re-reads just them from Mongo on its next refresh.
+    """
+    if not article_ids:
+        return
+    try:
+        redis_client = get_redis_client()
+        script = redis_client.register_script(_RECORD_CHANGE_SCRIPT)
+        pipe = redis_client.pipeline(transaction=False)
+        for article_id in article_ids:
+            script(
+                keys=[CHANGES_KEY, CHANGES_SEQUENCE_KEY],
+                args=[settings.SEARCH_INDEX_CHANGES_MAX, collection_name, str(article_id)],
+                client=pipe
+            )
+        pipe.execute()
+    except Exception as e:
+        logger.error(f"Failed to record search index changes: {str(e)}")
+
+
+def index_log_position() -> Optional[Tuple[int, int]]:
+    """(delete generation, last change sequence), or None if Redis is unreachable."""
+    try:
+        pipe = get_redis_client().pipeline(transaction=False)
+        pipe.get(GENERATION_KEY)
+        pipe.get(CHANGES_SEQUENCE_KEY)
+        generation, sequence = pipe.execute()
+        return int(generation or 0), int(sequence or 0)
+    except Exception as e:
+        logger.error(f"Failed to read search index change log: {str(e)}")
+        return None
+
+
+def _sequence(stream_id: bytes) -> int:
+    return int(stream_id.split(b'-', 1)[0])
+
+
+def read_index_changes(after: int, limit: int) -> Optional[Tuple[int, Optional[int], List[Tuple[int, str, str]]]]:
+    """
+    (delete generation, first sequence still logged, [(sequence,
+    collection, article id)] after `after`), or None if Redis is unreachable.
+    """
+    try:
+        pipe = get_redis_client().pipeline(transaction=False)
+        pipe.get(GENERATION_KEY)
+        pipe.xrange(CHANGES_KEY, count=1)
+        pipe.xrange(CHANGES_KEY, min=f'{after + 1}-0', count=limit)
+        generation, first, entries = pipe.execute()
+    except Exception as e:
+        logger.error(f"Failed to read search index change log: {str(e)}")
+        return None
+    return (
+        int(generation or 0),
+        _sequence(first[0][0]) if first else None,
+        [
+            (_sequence(stream_id), fields[b'collection'].decode('utf-8'), fields[b'article_id'].decode('utf-8'))
+            for stream_id, fields in entries
+        ]
+    )
+
+
+def _serialize_datetime(value):
+    return value.isoformat() if isinstance(value, datetime.datetime) else None
+
+
+def as_utc(value: datetime.datetime) -> datetime.datetime:
+    """Aware UTC datetime; naive values (how pymongo returns stored dates) are taken as UTC."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=datetime.timezone.utc)
+    return value.astimezone(datetime.timezone.utc)
+
+
+def _timestamp(value) -> float:
+    return as_utc(value).timestamp() if isinstance(value, datetime.datetime) else float('-inf')
+
+
+def shard_of(article_id: str, shard_count: int) -> int:
+    """Stable shard number of an article (crc32, identical in every process)."""
+    return zlib.crc32(article_id.encode('ascii')) % shard_count
+
+
+def parse_since(value: Optional[str]) -> Optional[datetime.datetime]:
+    """Parse a `since` query parameter (ISO date or datetime, UTC unless it has an offset); raises ValueError when malformed."""
+    if not value:
+        return None
+    return as_utc(datetime.datetime.fromisoformat(value))
+
+
+class _ReadWriteLock:
+    """Any number of concurrent searches, or one thread changing the FAISS indexes."""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writing = False
+
+    @contextmanager
+    def reading(self):
+        with self._condition:
+            while self._writing:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def writing(self):
+        with self._condition:
+            while self._writing:
+                self._condition.wait()
+            # Set before waiting so new searches queue behind the writer
+            self._writing = True
+            while self._readers:
+                self._condition.wait()
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
+
+
+class _Snapshot:
+    """
+    One loaded index. Every article gets a FAISS id in created-at order and
+    all vectors live in a single IndexIDMap2, so a `since` filter is an id
+    range; each category is a bitmap over those ids, searched with
+    faiss.IDSelectorBitmap instead of a copy of its vectors. Changes are
+    applied in place: a re-embedded article keeps its id, a new one takes
+    the next id.
+    """
+
+    def __init__(self, generation: Optional[int], sequence: int):
+        self.generation = generation
+        self.sequence = sequence
+        self.index: Optional[faiss.IndexIDMap2] = None
+        self.summaries: Dict[int, Dict] = {}
+        self.ids: Dict[str, int] = {}
+        # By FAISS id; kept non-decreasing for the id-range filter, with the real
+        # created-at time in `created` (an article stored late is clamped forward)
+        self.timestamps: List[float] = []
+        self.created: Dict[int, float] = {}
+        self.categories: Dict[str, np.ndarray] = {}
+        self.category_sizes: Dict[str, int] = {}
+
+    @property
+    def cache_generation(self) -> Optional[str]:
+        """Result-cache generation this snapshot answers for; None when built without Redis."""
+        if self.generation is None:
+            return None
+        return cache_generation(self.generation, self.sequence)
+
+    def _set_category(self, category: Optional[str], faiss_id: int, member: bool):
+        if category is None:
+            return
+        bitmap = self.categories.get(category)
+        if bitmap is None or len(bitmap) <= faiss_id >> 3:
+            # Grown ahead of the ids so appends rarely reallocate
+            grown = np.zeros(max(len(self.timestamps) >> 3, faiss_id >> 3) + 1024, dtype=np.uint8)
+            if bitmap is not None:
+                grown[:len(bitmap)] = bitmap
+            bitmap = self.categories[category] = grown
+        if member:
+            bitmap[faiss_id >> 3] |= np.uint8(1 << (faiss_id & 7))
+            self.category_sizes[category] = self.category_sizes.get(category, 0) + 1
+        else:
+            bitmap[faiss_id >> 3] &= np.uint8(~(1 << (faiss_id & 7)) & 0xFF)
+            self.category_sizes[category] -= 1
+
+    def add(self, records: List[Tuple[float, np.ndarray, Dict]]):
+        """Index (created-at timestamp, vector, summary) records, oldest first."""
+        vectors, ids = [], []
+        for timestamp, vector, summary in records:
+            if self.index is None:
+                self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(vector.shape[0]))
+            elif vector.shape[0] != self.index.d:
+                continue
+            faiss_id = self.ids.get(summary['article_id'])
+            if faiss_id is None:
+                faiss_id = self.ids[summary['article_id']] = len(self.timestamps)
+                self.timestamps.append(max(timestamp, self.timestamps[-1]) if self.timestamps else timestamp)
+            self.summaries[faiss_id] = summary
+            self.created[faiss_id] = timestamp
+            self._set_category(summary['category'], faiss_id, True)
+            vectors.append(vector)
+            ids.append(faiss_id)
+
+        if vectors:
+            matrix = np.vstack(vectors)
+            faiss.normalize_L2(matrix)
+            self.index.add_with_ids(matrix, np.array(ids, dtype=np.int64))
+
+    def remove(self, article_ids):
+        """Drop these articles; their ids are reused if they come back."""
+        ids = []
+        for article_id in article_ids:
+            faiss_id = self.ids.get(article_id)
+            if faiss_id is None or faiss_id not in self.summaries:
+                continue
+            summary = self.summaries.pop(faiss_id)
+            self._set_category(summary['category'], faiss_id, False)
+            ids.append(faiss_id)
+        if ids:
+            self.index.remove_ids(faiss.IDSelectorBatch(np.array(ids, dtype=np.int64)))
+
+
+class ArticleVectorIndex:
+    """
+    In-process FAISS inner-product index over the text embeddings of crawler
+    and user articles. It is built once; after that every refresh (at most
+    every `refresh_interval` seconds) applies the record_index_changes() log
+    entries written since, re-reading only those articles. A full rebuild
+    happens again only if entries this process never saw were trimmed from
+    the log, or every `fallback_refresh_seconds` while Redis is unreachable.
+
+    Vectors are stored once, oldest first: a `category` filter is a bitmap
+    selector over the article ids and a `since` filter an id range
+    (faiss.IDSelectorRange), combined with faiss.IDSelectorAnd. Dates are
+    compared in UTC, with stored naive dates taken as UTC.
+
+    Hits are returned as small JSON-serializable summaries so they can be
+    cached and hydrated without re-reading the articles.
+
+    With `shard=(number, count)` the index holds only the articles whose
+    shard_of() is `number`; shard workers (search/utils/shards.py) serve one
+    such index each.
+    """
+    collection_names = ('articles', 'articles_users')
+    query = {'text_embedding': {'$exists': True, '$ne': []}}
+    projection = {'text_embedding': 1, 'title': 1, 'category': 1, 'imgCover': 1, 'createdAt': 1, 'userId': 1}
+    fallback_refresh_seconds = 60
+    shard_fetch_batch = 1000
+
+    def __init__(self, shard: Optional[Tuple[int, int]] = None):
+        self.shard = shard
+        # One thread builds or applies changes at a time; searches only wait for the short apply step
+        self._lock = threading.Lock()
+        self._rw_lock = _ReadWriteLock()
+        self._snapshot: Optional[_Snapshot] = None
+        self._checked_at = 0.0
+        self._built_at = 0.0
+        self._rebuild_guard = threading.Lock()
+        self._rebuilding = False
+        self._background_refresh = False
+
+    def _vector(self, article) -> Optional[np.ndarray]:
+        return np.asarray(article['text_embedding'], dtype=np.float32)
+
+    def _in_shard(self, article_id: str) -> bool:
+        return self.shard is None or shard_of(article_id, self.shard[1]) == self.shard[0]
+
+    def _articles(self, name: str, article_ids: Optional[List[str]] = None) -> Iterator[Dict]:
+        collection = get_collection(name)
+        if article_ids is not None:
+            # Changed articles: already filtered to this shard by the caller
+            for start in range(0, len(article_ids), self.shard_fetch_batch):
+                batch = [ObjectId(article_id) for article_id in article_ids[start:start + self.shard_fetch_batch]]
+                yield from collection.find({**self.query, '_id': {'$in': batch}}, self.projection)
+            return
+        if self.shard is None:
+            yield from collection.find(self.query, self.projection)
+            return
+
+        # Select this shard's ids first so only its embeddings are transferred
+        shard_ids = [
+            str(article['_id']) for article in collection.find(self.query, {'_id': 1})
+            if self._in_shard(str(article['_id']))
+        ]
+        yield from self._articles(name, shard_ids)
+
+    def _load_records(self, ids_by_collection: Optional[Dict[str, List[str]]] = None
+                      ) -> Iterator[Tuple[float, np.ndarray, Dict]]:
+        """(created-at timestamp, vector, summary) for every article this index holds, or only the given ones."""
+        for name in self.collection_names:
+            article_ids = None if ids_by_collection is None else ids_by_collection.get(name)
+            if ids_by_collection is not None and not article_ids:
+                continue
+            for article in self._articles(name, article_ids):
+                embedding = self._vector(article)
+                if embedding is None:
+                    continue
+                yield _timestamp(article.get('createdAt')), embedding, {
+                    'article_id': str(article['_id']),
+                    'title': article.get('title'),
+                    'category': article.get('category'),
+                    'imgCover': article.get('imgCover', ''),
+                    'createdAt': _serialize_datetime(article.get('createdAt')),
+                    'userId': article.get('userId')
+                }
+
+    def _build(self, generation: int, sequence: int) -> _Snapshot:
+        started = time.perf_counter()
+        snapshot = _Snapshot(generation, sequence)
+        snapshot.add(sorted(self._load_records(), key=lambda record: record[0]))
+        self._built_at = time.monotonic()
+        logger.info(
+            "event=search_index_built index=%s shard=%s sequence=%s articles=%d categories=%d build_ms=%.1f",
+            type(self).__name__, self.shard, sequence, len(snapshot.summaries), len(snapshot.categories),
+            (time.perf_counter() - started) * 1000
+        )
+        return snapshot
+
+    def _apply(self, entries: List[Tuple[int, str, str]]):
+        """Re-read the articles named by change-log entries and swap them into the snapshot."""
+        ids_by_collection: Dict[str, List[str]] = {}
+        for _, name, article_id in entries:
+            if name in self.collection_names and self._in_shard(article_id):
+                ids_by_collection.setdefault(name, []).append(article_id)
+        changed = {article_id for article_ids in ids_by_collection.values() for article_id in article_ids}
+        # Mongo is read before taking the write lock so searches only wait for FAISS
+        records = sorted(self._load_records(ids_by_collection), key=lambda record: record[0]) if changed else []
+        with self._rw_lock.writing():
+            self._snapshot.remove(changed)
+            self._snapshot.add(records)
+            self._snapshot.sequence = entries[-1][0]
+
+    def refresh(self) -> Optional[str]:
+        """
+        Bring the snapshot up to date. Returns the result-cache generation it
+        belongs to. Only the very first build blocks callers; while another
+        thread applies changes or a full rebuild runs, the current snapshot
+        keeps serving.
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._checked_at < settings.SEARCH_INDEX_REFRESH_INTERVAL:
+            return snapshot.cache_generation
+
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = self._build(*(index_log_position() or (None, 0)))
+                    self._checked_at = time.monotonic()
+                return self._snapshot.cache_generation
+
+        if not self._lock.acquire(blocking=False):
+            return snapshot.cache_generation
+        try:
+            self._checked_at = time.monotonic()
+            while True:
+                changes = read_index_changes(self._snapshot.sequence, settings.SEARCH_INDEX_CHANGES_BATCH)
+                if changes is None:
+                    if time.monotonic() - self._built_at > self.fallback_refresh_seconds:
+                        self.rebuild_in_background()
+                    return self._snapshot.cache_generation
+                generation, first, entries = changes
+                if first is not None and first > self._snapshot.sequence + 1:
+                    # Entries this process never applied were trimmed from the log
+                    self.rebuild_in_background()
+                    return self._snapshot.cache_generation
+                self._snapshot.generation = generation
+                if entries:
+                    self._apply(entries)
+                if len(entries) < settings.SEARCH_INDEX_CHANGES_BATCH:
+                    return self._snapshot.cache_generation
+        finally:
+            self._lock.release()
+
+    def rebuild_in_background(self):
+        """
+        Build a fresh snapshot on a daemon thread and swap it in when done;
+        the old one serves until then. Log entries newer than the new
+        snapshot are applied by the next refresh.
+        """
+        with self._rebuild_guard:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+
+        def run():
+            try:
+                snapshot = self._build(*(index_log_position() or (None, 0)))
+                with self._lock:
+                    self._snapshot = snapshot
+            except Exception as e:
+                logger.error(f"Search index rebuild failed: {str(e)}")
+            finally:
+                self._rebuilding = False
+
+        threading.Thread(target=run, name=f'{type(self).__name__}-rebuild', daemon=True).start()
+
+    def refresh_in_background(self):
+        """
+        Keep the index current from a daemon thread, so searches never pay for
+        a change-log poll or Mongo read (shard workers, where a slow reply
+        drops the shard from the merge).
+        """
+        self.refresh()
+        self._background_refresh = True
+
+        def run():
+            while True:
+                time.sleep(settings.SEARCH_INDEX_REFRESH_INTERVAL)
+                try:
+                    self.refresh()
+                except Exception as e:
+                    logger.error(f"Search index refresh failed: {str(e)}")
+
+        threading.Thread(target=run, name=f'{type(self).__name__}-refresh', daemon=True).start()
+
+    def _maybe_refresh(self):
+        if not self._background_refresh:
+            self.refresh()
+
+    def search(self, query_embedding, k: int, min_similarity: float,
+               category: Optional[str] = None,
+               since: Optional[datetime.datetime] = None) -> Tuple[Optional[str], Optional[List[Dict]]]:
+        """
+        Return (generation, hits) with hits sorted by similarity; hits is None
+        when nothing is indexed. `category` restricts the search to that
+        category and `since` to articles created at or after it.
+        """
+        self._maybe_refresh()
+        query = np.asarray([query_embedding], dtype=np.float32)
+        faiss.normalize_L2(query)
+        with self._rw_lock.reading():
+            snapshot = self._snapshot
+            if not snapshot.summaries:
+                return snapshot.cache_generation, None
+
+            candidates = len(snapshot.summaries)
+            selectors = []
+            if category is not None:
+                candidates = snapshot.category_sizes.get(category, 0)
+                if not candidates:
+                    return snapshot.cache_generation, []
+                bitmap = snapshot.categories[category]
+                selectors.append(faiss.IDSelectorBitmap(len(bitmap), faiss.swig_ptr(bitmap)))
+
+            since_timestamp = _timestamp(since) if since else None
+            if since:
+                first = bisect.bisect_left(snapshot.timestamps, since_timestamp)
+                if first >= len(snapshot.timestamps):
+                    return snapshot.cache_generation, []
+                if first > 0:
+                    selectors.append(faiss.IDSelectorRange(first, len(snapshot.timestamps)))
+
+            params = None
+            if selectors:
+                selector = selectors[0] if len(selectors) == 1 else faiss.IDSelectorAnd(*selectors)
+                params = faiss.SearchParameters(sel=selector)
+
+            distances, indices = snapshot.index.search(query, min(k, candidates), params=params)
+            hits = [
+                {**snapshot.summaries[faiss_id], 'similarity': float(similarity)}
+                for faiss_id, similarity in zip(indices[0], distances[0])
+                if faiss_id >= 0 and similarity >= min_similarity
+                and (since_timestamp is None or snapshot.created[faiss_id] >= since_timestamp)
+            ]
+            return snapshot.cache_generation, hits
+
+    def similarities(self, query_embedding, article_ids: List[str]) -> Dict[str, float]:
+        """Similarity of `query_embedding` to each indexed article in `article_ids` (re-ranking a candidate set)."""
+        self._maybe_refresh()
+        with self._rw_lock.reading():
+            snapshot = self._snapshot
+            indexed = [
+                (article_id, snapshot.ids[article_id]) for article_id in article_ids
+                if snapshot.ids.get(article_id) in snapshot.summaries
+            ]
+            if not indexed:
+                return {}
+            vectors = snapshot.index.reconstruct_batch(
+                np.array([faiss_id for _, faiss_id in indexed], dtype=np.int64)
+            )
+
+        query = np.asarray([query_embedding], dtype=np.float32)
+        faiss.normalize_L2(query)
+        scores = vectors @ query[0]
+        return {article_id: float(score) for (article_id, _), score in zip(indexed, scores)}
+
+
+class RecommendationVectorIndex(ArticleVectorIndex):
+    """
+    Index for profile-based recommendations: crawler articles only, each
+    represented by the 50/50 mix of its title and text embeddings (both
+    snake_case and legacy camelCase fields are read).
+    """
+    collection_names = ('articles',)
+    query = {
+        '$or': [
+            {'title_embedding': {'$exists': True}, 'text_embedding': {'$exists': True}},
+            {'titleEmbedding': {'$exists': True}, 'textEmbedding': {'$exists': True}}
+        ]
+    }
+    projection = {
+        'title_embedding': 1, 'text_embedding': 1, 'titleEmbedding': 1, 'textEmbedding': 1,
+        'title': 1, 'category': 1, 'imgCover': 1, 'createdAt': 1, 'userId': 1
+    }
+
+    def _vector(self, article) -> Optional[np.ndarray]:
+        title_embedding = article.get('title_embedding') or article.get('titleEmbedding')
+        text_embedding = article.get('text_embedding') or article.get('textEmbedding')
+        if not title_embedding or not text_embedding or len(title_embedding) != len(text_embedding):
+            return None
+        return (0.5 * np.asarray(title_embedding, dtype=np.float32)
+                + 0.5 * np.asarray(text_embedding, dtype=np.float32))
+
+
+INDEX_CLASSES = {'articles': ArticleVectorIndex, 'recommendations': RecommendationVectorIndex}
+
+
+def _make_index(name: str):
+    """The in-process index, or a scatter-gather client when SEARCH_SHARDS workers serve it."""
+    if settings.SEARCH_SHARDS:
+        return ShardedVectorIndex(
+            name,
+            ShardedVectorIndex.socket_paths(settings.SEARCH_SHARD_SOCKET_DIR, settings.SEARCH_SHARDS),
+            settings.SECRET_KEY.encode('utf-8'),
+            timeout=settings.SEARCH_SHARD_TIMEOUT
+        )
+    return INDEX_CLASSES[name]()
+
+
+article_vector_index = _make_index('articles')
+recommendation_vector_index = _make_index('recommendations')
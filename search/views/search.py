@@ -2,212 +2,58 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
-from config.mongo_utils import get_collection
-from bson import ObjectId
-import datetime
-import requests
-from scipy.spatial.distance import cosine
-import numpy as np
-from following.models import Follow
-import faiss
-from django.contrib.auth.models import User
-from profiles.models import Profile
-import os
-
-embed_api_url = os.getenv("EMBEDDING_SERVER_URL")
-base_url = os.getenv("BASE_URL")
+from django.http import JsonResponse
+from django.views import View
+from asgiref.sync import sync_to_async
+import asyncio
+import logging
+import time
+from search.services.search_services import SearchService, SearchError
+from search.services.typeahead_services import user_typeahead_service
+from search.utils.history import search_history_buffer
+from search.utils.suggestions import query_suggestions
+from search.utils.vector_index import parse_since
+from iTech import settings
+
+logger = logging.getLogger(__name__)
+search_service = SearchService()
 
 class SearchArticlesView(APIView):
     permission_classes = [IsAuthenticated]
 
-    def normalize_embedding(self, embedding):
-        emb = np.array(embedding, dtype=np.float32)
-        norm = np.linalg.norm(emb)
-        print(f"[DEBUG] Embedding norm before normalization: {norm}")
-        if norm == 0:
-            return emb
-        return emb / norm
-
     def get(self, request):
         search_text = request.query_params.get('q', '')
-        print(f"[LOG] Received search query: '{search_text}'")
 
         if not search_text:
             return Response({"error": "Search text is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # فیلتر دسته‌بندی و تاریخ داخل ایندکس برداری اعمال می‌شود
+        category = request.query_params.get('category') or None
+        try:
+            since = parse_since(request.query_params.get('since'))
+        except ValueError:
+            return Response({"error": "since must be an ISO date or datetime"}, status=status.HTTP_400_BAD_REQUEST)
+
+        started = time.perf_counter()
             
         # جستجوی کاربران بر اساس نام کاربری
-        users = User.objects.filter(username__icontains=search_text)[:5]
-        user_results = []
-        for user in users:
-            try:
-                profile = Profile.objects.get(user=user)
-                profile_picture = profile.profile_picture.url if profile.profile_picture else '/media/profile_pics/default.png'
-            except Profile.DoesNotExist:
-                profile_picture = '/media/profile_pics/default.png'
-                
-            user_results.append({
-                'type': 'user',
-                'id': str(user.id),
-                'username': user.username,
-                'profile_picture': f'{base_url}{profile_picture}',
-                'first_name': profile.first_name,
-                'last_name': profile.last_name
-            })
+        user_results = search_service.search_users(search_text)
 
         cleaned_text = search_text.strip()
-        print(f"[LOG] Cleaned search text: '{cleaned_text}'")
 
-        # دریافت embedding
+        # نتایج رتبه‌بندی‌شده‌ی کوئری‌های پرتکرار از کش خوانده می‌شوند (بدون embedding و جستجوی برداری)
         try:
-            print(f"[LOG] Sending POST request to embedding service with text: {cleaned_text}")
-            text_response = requests.post(
-                embed_api_url,
-                headers={'Content-Type': 'application/json'},
-                json={'texts': [cleaned_text]},
-                timeout=60
-            )
-            text_response.raise_for_status()
-            response_json = text_response.json()
-            print(f"[LOG] Embedding service response: {response_json}")
-            search_embedding = response_json['embeddings'][0]
-            
-            # ذخیره کوئری و embedding آن در کالکشن search
-            search_collection = get_collection('search')
-            search_document = {
-                'query': cleaned_text,
-                'embedding': search_embedding,  # ذخیره به صورت آرایه
-                'user_id': str(request.user.id),
-                'created_at': datetime.datetime.now()
-            }
-            search_id = search_collection.insert_one(search_document).inserted_id
-            print(f"[LOG] Search query saved with ID: {search_id}")
-            
-        except Exception as e:
-            print(f"[ERROR] Failed to get embedding or save search: {str(e)}")
-            return Response({"error": f"Failed to get embedding: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-        search_embedding_norm = self.normalize_embedding(search_embedding)
-
-        # لود مقالات و انبدیگ‌ها
-        article_collection = get_collection('articles')
-        user_article_collection = get_collection('articles_users')
-        like_collection = get_collection('likes')
-        comment_collection = get_collection('comments')
-        reads_collection = get_collection('articleReads')  # اضافه کردن کالکشن خوانده‌ها
-
-        articles = list(article_collection.find()) + list(user_article_collection.find())
-        print(f"[LOG] Total articles fetched: {len(articles)}")
-
-        # آماده‌سازی برای FAISS
-        embeddings = []
-        article_ids = []
-        for article in articles:
-            text_emb = article.get('text_embedding')
-            if text_emb:
-                embeddings.append(self.normalize_embedding(text_emb))
-                article_ids.append(str(article['_id']))
-
-        if not embeddings:
-            return Response({"error": "No valid embeddings found"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-        embeddings = np.array(embeddings).astype('float32')
-        dimension = embeddings.shape[1]
-        index = faiss.IndexFlatIP(dimension)
-        index.add(embeddings)
-
-        # سرچ با FAISS
-        search_embedding_norm = np.array([search_embedding_norm]).astype('float32')
-        distances, indices = index.search(search_embedding_norm, k=20)
-
-        results = []
-        max_popularity = 1
-        for i, idx in enumerate(indices[0]):
-            article = articles[idx]
-            article_id = str(article['_id'])
-            similarity = distances[0][i]
-
-            if similarity < 0.3:  # آستانه کاهش‌یافته
-                continue
-
-            author_id = article.get('author_id')
-            likes = like_collection.count_documents({'article_id': ObjectId(article_id)})
-            comments = comment_collection.count_documents({'article_id': ObjectId(article_id)})
-            popularity = likes + comments
-            max_popularity = max(max_popularity, popularity)
-
-            created_at = article.get('created_at', datetime.datetime.min)
-            recency = (datetime.datetime.now() - created_at).days
-
-            is_followed = False
-            if author_id:
-                try:
-                    is_followed = Follow.objects.filter(follower=request.user, followed_id=author_id).exists()
-                except (ValueError, TypeError):
-                    is_followed = False
-
-            # امتیاز ترکیبی
-            score = (0.5 * similarity) + (0.2 * (100 if is_followed else 0)) - (0.2 * recency / 365) + (0.1 * popularity / max_popularity)
-
-            # دریافت اطلاعات نویسنده
-            user_id = article.get('userId') or article.get('author_id')
-            username = ''
-            profile_picture = ''
-            
-            # اگر نویسنده کاربر است (نه AI)
-            if user_id:
-                try:
-                    user = User.objects.get(id=user_id)
-                    username = user.username
-                    
-                    # دریافت عکس پروفایل
-                    try:
-                        profile = Profile.objects.get(user=user)
-                        if profile.profile_picture:
-                            profile_picture = profile.profile_picture.url
-                    except Profile.DoesNotExist:
-                        pass
-                except User.DoesNotExist:
-                    pass
-            else:
-                # اگر مقاله توسط AI نوشته شده
-                username = 'AI'
-                profile_picture = '/media/profile_pics/default.png'
-            
-            # شمارش لایک‌ها، کامنت‌ها و خوانده‌ها
-            # برای کامنت‌ها، هر سه حالت ممکن را بررسی می‌کنیم
-            count_str = comment_collection.count_documents({'article_id': str(article_id)})
-            count_obj = 0
-            try:
-                count_obj = comment_collection.count_documents({'article_id': ObjectId(article_id)})
-            except Exception:
-                pass
-            count_camel_obj = comment_collection.count_documents({'articleId': ObjectId(article_id)})
-            comments_count = count_str + count_obj + count_camel_obj
-            
-            # شمارش لایک‌ها
-            likes_count = like_collection.count_documents({'articleId': ObjectId(article_id)})
-            
-            # شمارش خوانده‌ها
-            reads_count = reads_collection.count_documents({'articleId': ObjectId(article_id)})
-            
-            results.append({
-                'type': 'article',
-                'article_id': article_id,
-                'title': article.get('title'),
-                'category': article.get('category'),
-                'imgCover': f'{base_url}{article.get("imgCover", "")}',
-                'createdAt': article.get('createdAt').isoformat() if article.get('createdAt') else None,
-                'score': score,
-                'similarity': similarity,
-                'username': username,
-                'profilePicture': f'{base_url}{profile_picture}',
-                'likes_count': likes_count,
-                'comments_count': comments_count,
-                'reads_count': reads_count
-            })
-        # مرتب‌سازی نتایج مقالات بر اساس امتیاز
-        results.sort(key=lambda x: x['score'], reverse=True)
-        article_results = results[:10]
+            ranked = search_service.ranked_hits(cleaned_text, category, since)
+        except SearchError as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        search_embedding, hits = ranked['embedding'], ranked['hits']
+        ranked_at = time.perf_counter()
+
+        # ذخیره کوئری در بافر تاریخچه؛ نوشتن در MongoDB توسط تسک Celery به صورت دسته‌ای انجام می‌شود
+        search_history_buffer.record(request.user.id, cleaned_text, search_embedding)
+
+        # امتیازهای وابسته به کاربر (فالو) و شمارش‌ها هنگام خواندن و به صورت دسته‌ای اعمال می‌شوند
+        article_results = search_service.hydrate_hits(hits, request.user)
         
         # ترکیب نتایج کاربران و مقالات
         combined_results = {
@@ -216,40 +62,136 @@ class SearchArticlesView(APIView):
             'total_users': len(user_results),
             'total_articles': len(article_results)
         }
-        
-        print(f"[LOG] Returning {len(article_results)} articles and {len(user_results)} users after filtering and sorting")
+
+        finished = time.perf_counter()
+        logger.info(
+            "event=search user_id=%s query_chars=%d cache_hit=%s users=%d articles=%d rank_ms=%.1f hydrate_ms=%.1f total_ms=%.1f",
+            request.user.id, len(cleaned_text), ranked['cache_hit'], len(user_results), len(article_results),
+            (ranked_at - started) * 1000, (finished - ranked_at) * 1000, (finished - started) * 1000
+        )
         return Response(combined_results, status=status.HTTP_200_OK)
 
 
+class AsyncSearchArticlesView(View):
+    """
+    Async version of SearchArticlesView for ASGI (Daphne). The username lookup
+    runs concurrently with embedding + ranking, and the hydration lookups run
+    concurrently with each other, so latency follows the slowest dependency.
+    Blocking clients (requests, pymongo, redis) run on worker threads and ORM
+    calls on Django's sync thread; nothing blocks the event loop.
+    """
+
+    async def get(self, request):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return JsonResponse({"detail": "Authentication credentials were not provided."}, status=status.HTTP_403_FORBIDDEN)
+
+        search_text = request.GET.get('q', '')
+        if not search_text:
+            return JsonResponse({"error": "Search text is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        category = request.GET.get('category') or None
+        try:
+            since = parse_since(request.GET.get('since'))
+        except ValueError:
+            return JsonResponse({"error": "since must be an ISO date or datetime"}, status=status.HTTP_400_BAD_REQUEST)
+
+        started = time.perf_counter()
+        cleaned_text = search_text.strip()
+
+        user_results, ranked = await asyncio.gather(
+            sync_to_async(search_service.search_users)(search_text),
+            asyncio.to_thread(search_service.ranked_hits, cleaned_text, category, since),
+            return_exceptions=True
+        )
+        if isinstance(ranked, SearchError):
+            return JsonResponse({"error": str(ranked)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        for result in (user_results, ranked):
+            if isinstance(result, BaseException):
+                raise result
+        ranked_at = time.perf_counter()
+
+        article_results, _ = await asyncio.gather(
+            search_service.ahydrate_hits(ranked['hits'], user),
+            asyncio.to_thread(search_history_buffer.record, user.id, cleaned_text, ranked['embedding'])
+        )
+
+        finished = time.perf_counter()
+        logger.info(
+            "event=search mode=async user_id=%s query_chars=%d cache_hit=%s users=%d articles=%d rank_ms=%.1f hydrate_ms=%.1f total_ms=%.1f",
+            user.id, len(cleaned_text), ranked['cache_hit'], len(user_results), len(article_results),
+            (ranked_at - started) * 1000, (finished - ranked_at) * 1000, (finished - started) * 1000
+        )
+        return JsonResponse({
+            'users': user_results,
+            'articles': article_results,
+            'total_users': len(user_results),
+            'total_articles': len(article_results)
+        }, status=status.HTTP_200_OK)
+
+
+class UserTypeaheadView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """پیشنهاد کاربران هنگام تایپ بر اساس پیشوند/بخشی از نام کاربری"""
+        query = request.query_params.get('q', '')
+        try:
+            limit = int(request.query_params.get('limit', 8))
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        users = user_typeahead_service.search(query, limit=max(limit, 1))
+        return Response({'users': users, 'total_users': len(users)}, status=status.HTTP_200_OK)
+
+
+class QuerySuggestionsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """پیشنهاد کوئری‌های پرطرفدار اخیر که با پیشوند q شروع می‌شوند"""
+        prefix = request.query_params.get('q', '')
+        try:
+            limit = min(max(int(request.query_params.get('limit', 8)), 1), 20)
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            suggestions = query_suggestions.suggest(prefix, limit)
+        except Exception as e:
+            logger.error(f"Failed to load query suggestions: {str(e)}")
+            suggestions = []
+        return Response({'suggestions': suggestions}, status=status.HTTP_200_OK)
+
+
 class UserSearchHistoryView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        """بازیابی تاریخچه جستجوهای کاربر از کالکشن search در MongoDB"""
+        """
+        بازیابی تاریخچه جستجوهای کاربر از کالکشن search در MongoDB، جدیدترین اول.
+        پاسخ مثل قبل یک لیست است. صفحه‌بندی keyset اختیاری است: پارامتر limit (پیش‌فرض و حداکثر
+        برابر سقف تاریخچه‌ی هر کاربر، پس کلاینت‌های قدیمی کل تاریخچه را می‌گیرند) و cursor که از
+        هدر X-Next-Cursor پاسخ قبلی می‌آید.
+        """
+        max_limit = settings.SEARCH_HISTORY_MAX_PER_USER
         try:
-            # دریافت کالکشن search
-            search_collection = get_collection('search')
-            
-            # جستجوی تمام رکوردهای مربوط به کاربر فعلی
-            user_searches = search_collection.find(
-                {'user_id': str(request.user.id)},
-                {'_id': 1, 'query': 1, 'created_at': 1}
-            ).sort('created_at', -1)  # مرتب‌سازی بر اساس زمان (جدیدترین اول)
-            
-            # تبدیل نتایج به لیست و فرمت‌دهی
-            search_history = []
-            for search in user_searches:
-                search_history.append({
-                    'id': str(search['_id']),
-                    'query': search['query'],
-                    'created_at': search['created_at'].isoformat() if search.get('created_at') else None
-                })
-            
-            return Response(search_history, status=status.HTTP_200_OK)
-            
+            limit = min(max(int(request.query_params.get('limit', max_limit)), 1), max_limit)
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            page = search_history_buffer.page(request.user.id, limit, request.query_params.get('cursor'))
+            response = Response(page['results'], status=status.HTTP_200_OK)
+            if page['next_cursor']:
+                response['X-Next-Cursor'] = page['next_cursor']
+            return response
+
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
-            print(f"[ERROR] Failed to retrieve search history: {str(e)}")
+            logger.error(f"Failed to retrieve search history: {str(e)}")
             return Response(
                 {"error": f"Failed to retrieve search history: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+            )